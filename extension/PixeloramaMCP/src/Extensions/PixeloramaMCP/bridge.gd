@@ -3,20 +3,44 @@ extends Node
 const DEFAULT_HOST := "127.0.0.1"
 const DEFAULT_PORT := 8123
 const BRIDGE_PROTOCOL_VERSION := "2024-11-05"
+# Per-frame budget for handling queued requests. Pipelined clients (tiled
+# region transfer) keep several requests queued; the rest waits for the next
+# frame instead of stalling the editor.
+const MAX_TICK_USEC := 8000
+# Methods that never change the project; every other method bumps the
+# revision reported by bridge.revision.
+const READ_ONLY_METHODS := {
+	"ping": true, "version": true, "bridge.info": true, "bridge.revision": true,
+	"project.info": true, "project.memory_stats": true, "project.export": true,
+	"project.export.animated": true, "project.export.spritesheet": true,
+	"layer.list": true, "layer.get_props": true, "frame.list": true, "frame.snapshot": true,
+	"frame.hashes": true, "pixel.get": true, "pixel.get_region": true, "canvas.snapshot": true,
+	"palette.list": true, "palette.get": true, "palette.export": true,
+	"selection.export_mask": true, "animation.tags.list": true, "animation.fps.get": true,
+	"tilemap.tileset.list": true, "tilemap.cell.get": true, "tilemap.cells.get_region": true,
+	"effect.layer.list": true, "effect.shader.list": true, "effect.shader.inspect": true,
+	"effect.shader.schema": true, "brush.list": true, "three_d.object.list": true,
+}
 
 var _server := TCPServer.new()
 var _peers := {}  # id -> StreamPeerTCP
 var _buffers := {}  # id -> PackedByteArray
+var _arrived := {}  # id -> ticks (usec) when the buffer last went from empty to non-empty
 var _api: Node = null
 var _token := ""
 var _extension_version := ""
 var _dispatch_table: Dictionary = {}
+var _revision := 0  # mutating requests handled so far
 
 const Parsers = preload("helpers/parsers.gd")
 const Shaders = preload("helpers/shaders.gd")
 const Drawing = preload("helpers/drawing.gd")
+const Rasterizer = preload("helpers/rasterizer.gd")
 const BrushHelpers = preload("helpers/brushes.gd")
 const ExportUtils = preload("helpers/export.gd")
+const CelUtils = preload("helpers/cels.gd")
+const MemoryStats = preload("helpers/memory.gd")
+const Listing = preload("helpers/listing.gd")
 
 
 func _ready() -> void:
@@ -47,9 +71,56 @@ func _ready() -> void:
 		return
 	set_process(true)
 	_init_dispatch_table()
+	_write_discovery_file(host, port)
 	print("Pixelorama MCP bridge listening on %s:%d" % [host, port])
 
 
+func _exit_tree() -> void:
+	_server.stop()
+	# Only remove the discovery file if it still describes this instance
+	var path := _discovery_path()
+	if path.is_empty() or not FileAccess.file_exists(path):
+		return
+	var info = JSON.parse_string(FileAccess.get_file_as_string(path))
+	if typeof(info) == TYPE_DICTIONARY and int(info.get("pid", -1)) == OS.get_process_id():
+		DirAccess.remove_absolute(path)
+
+
+func _discovery_path() -> String:
+	if OS.has_environment("PIXELORAMA_BRIDGE_DISCOVERY"):
+		return OS.get_environment("PIXELORAMA_BRIDGE_DISCOVERY")
+	# ~/.cache is shared with the Flatpak sandbox, unlike XDG_CACHE_HOME
+	var home := OS.get_environment("HOME")
+	if home.is_empty():
+		home = OS.get_environment("USERPROFILE")
+	if home.is_empty():
+		return ""
+	return home.path_join(".cache/pixelorama-mcp/bridge.json")
+
+
+func _write_discovery_file(host: String, port: int) -> void:
+	# Lets the MCP server connect to the actual port without probing
+	var path := _discovery_path()
+	if path.is_empty():
+		return
+	DirAccess.make_dir_recursive_absolute(path.get_base_dir())
+	var file := FileAccess.open(path, FileAccess.WRITE)
+	if file == null:
+		push_warning("Pixelorama MCP bridge: cannot write %s" % path)
+		return
+	file.store_string(
+		JSON.stringify(
+			{
+				"host": host,
+				"port": port,
+				"pid": OS.get_process_id(),
+				"protocol_version": BRIDGE_PROTOCOL_VERSION,
+				"started": int(Time.get_unix_time_from_system())
+			}
+		)
+	)
+
+
 func _process(_delta: float) -> void:
 	while _server.is_connection_available():
 		var peer := _server.take_connection()
@@ -57,6 +128,7 @@ func _process(_delta: float) -> void:
 		_peers[peer_id] = peer
 		_buffers[peer_id] = PackedByteArray()
 
+	var deadline := Time.get_ticks_usec() + MAX_TICK_USEC
 	var to_remove := []
 	for peer_id in _peers.keys():
 		var peer: StreamPeerTCP = _peers[peer_id]
@@ -69,27 +141,38 @@ func _process(_delta: float) -> void:
 			if data[0] != OK:
 				continue
 			var buf: PackedByteArray = _buffers[peer_id]
+			if buf.is_empty():
+				_arrived[peer_id] = Time.get_ticks_usec()
 			buf.append_array(data[1])
 			_buffers[peer_id] = buf
-			_drain_buffer(peer_id)
+		if not _buffers[peer_id].is_empty():
+			_drain_buffer(peer_id, deadline)
 
 	for peer_id in to_remove:
 		_peers.erase(peer_id)
 		_buffers.erase(peer_id)
+		_arrived.erase(peer_id)
 
 
-func _drain_buffer(peer_id: String) -> void:
+func _drain_buffer(peer_id: String, deadline: int) -> void:
 	var buf: PackedByteArray = _buffers[peer_id]
+	var start := 0
+	var handled := 0
 	while true:
-		var idx := buf.find(10)  # '\n'
+		# Always serve at least one request per peer per frame.
+		if handled > 0 and Time.get_ticks_usec() >= deadline:
+			break
+		var idx := buf.find(10, start)  # '\n'
 		if idx == -1:
 			break
-		var line_bytes := buf.slice(0, idx)
-		buf = buf.slice(idx + 1, buf.size())
-		var line := line_bytes.get_string_from_utf8().strip_edges()
+		var line := buf.slice(start, idx).get_string_from_utf8().strip_edges()
+		start = idx + 1
 		if line.is_empty():
 			continue
 		_handle_request(peer_id, line)
+		handled += 1
+	if start > 0:
+		buf = buf.slice(start, buf.size())
 	_buffers[peer_id] = buf
 
 
@@ -114,25 +197,33 @@ func _handle_request(peer_id: String, line: String) -> void:
 	var params = data.get("params", {})
 	if typeof(params) != TYPE_DICTIONARY:
 		params = {}
+	var started := Time.get_ticks_usec()
+	var queued: int = started - _arrived.get(peer_id, started)
 	var result := _dispatch_method(str(method), params, true)
-	_send_result(peer_id, req_id, result)
+	_send_result(peer_id, req_id, result, Time.get_ticks_usec() - started, queued)
 	return
 
 
-func _send_ok(peer_id: String, req_id, result: Dictionary) -> void:
-	_send(peer_id, {"id": req_id, "ok": true, "result": result})
-
-
 func _send_error(peer_id: String, req_id, code: String, message: String) -> void:
 	_send(peer_id, {"id": req_id, "ok": false, "error": {"code": code, "message": message}})
 
 
-func _send_result(peer_id: String, req_id, result: Dictionary) -> void:
+func _send_result(
+	peer_id: String, req_id, result: Dictionary, elapsed_us: int, queued_us: int
+) -> void:
+	# elapsed_us: time spent in the handler; queued_us: time the request
+	# waited in the receive buffer. Both are for client-side instrumentation.
+	# revision lets clients cache a read without a bridge.revision call.
+	var payload := {"id": req_id, "elapsed_us": elapsed_us, "queued_us": queued_us}
 	if result.has("_error"):
 		var err: Dictionary = result["_error"]
-		_send_error(peer_id, req_id, str(err.get("code", "error")), str(err.get("message", "")))
+		payload["ok"] = false
+		payload["error"] = {"code": str(err.get("code", "error")), "message": str(err.get("message", ""))}
 	else:
-		_send_ok(peer_id, req_id, result)
+		payload["ok"] = true
+		payload["result"] = result
+		payload["revision"] = _current_revision()
+	_send(peer_id, payload)
 
 
 func _send(peer_id: String, payload: Dictionary) -> void:
@@ -150,6 +241,7 @@ func _init_dispatch_table() -> void:
 		"ping": func(p: Dictionary) -> Dictionary: return {"message": "pong"},
 		"version": _handle_version,
 		"bridge.info": _handle_bridge_info,
+		"bridge.revision": _handle_bridge_revision,
 		"batch.exec": _handle_batch_exec,
 		"project.create": _handle_project_create,
 		"project.open": _handle_project_open,
@@ -160,6 +252,9 @@ func _init_dispatch_table() -> void:
 		"project.set_indexed_mode": _handle_project_set_indexed_mode,
 		"project.import.sequence": _handle_project_import_sequence,
 		"project.import.spritesheet": _handle_project_import_spritesheet,
+		"project.compact": _handle_project_compact,
+		"project.memory_stats": _handle_project_memory_stats,
+		"cel.link": _handle_cel_link,
 		"project.export.animated": _handle_project_export_animated,
 		"project.export.spritesheet": _handle_project_export_spritesheet,
 		"layer.list": _handle_layer_list,
@@ -176,6 +271,8 @@ func _init_dispatch_table() -> void:
 		"frame.remove": _handle_frame_remove,
 		"frame.duplicate": _handle_frame_duplicate,
 		"frame.move": _handle_frame_move,
+		"frame.snapshot": _handle_frame_snapshot,
+		"frame.hashes": _handle_frame_hashes,
 		"pixel.get": _handle_pixel_get,
 		"pixel.set": _handle_pixel_set,
 		"pixel.set_many": _handle_pixel_set_many,
@@ -189,6 +286,7 @@ func _init_dispatch_table() -> void:
 		"canvas.snapshot": _handle_canvas_snapshot,
 		"palette.list": _handle_palette_list,
 		"palette.select": _handle_palette_select,
+		"palette.get": _handle_palette_get,
 		"palette.create": _handle_palette_create,
 		"palette.delete": _handle_palette_delete,
 		"palette.import": _handle_palette_import,
@@ -219,6 +317,7 @@ func _init_dispatch_table() -> void:
 		"tilemap.tileset.list": _handle_tilemap_tileset_list,
 		"tilemap.tileset.create": _handle_tilemap_tileset_create,
 		"tilemap.tileset.add_tile": _handle_tilemap_tileset_add_tile,
+		"tilemap.tileset.add_tiles": _handle_tilemap_tileset_add_tiles,
 		"tilemap.tileset.remove_tile": _handle_tilemap_tileset_remove_tile,
 		"tilemap.tileset.replace_tile": _handle_tilemap_tileset_replace_tile,
 		"tilemap.layer.set_tileset": _handle_tilemap_layer_set_tileset,
@@ -227,6 +326,8 @@ func _init_dispatch_table() -> void:
 		"tilemap.cell.get": _handle_tilemap_cell_get,
 		"tilemap.cell.set": _handle_tilemap_cell_set,
 		"tilemap.cell.clear": _handle_tilemap_cell_clear,
+		"tilemap.cells.get_region": _handle_tilemap_cells_get_region,
+		"tilemap.cells.set_region": _handle_tilemap_cells_set_region,
 		"tilemap.fill_rect": _handle_tilemap_fill_rect,
 		"tilemap.replace_index": _handle_tilemap_replace_index,
 		"tilemap.random_fill": _handle_tilemap_random_fill,
@@ -262,9 +363,25 @@ func _dispatch_method(method: String, params: Dictionary, allow_batch: bool) ->
 	var handler = _dispatch_table.get(method)
 	if handler == null:
 		return _err("invalid_method", "unknown method")
+	if not READ_ONLY_METHODS.has(method):
+		_revision += 1
 	return handler.call(params)
 
 
+func _handle_bridge_revision(_params: Dictionary) -> Dictionary:
+	return {"revision": _current_revision()}
+
+
+func _current_revision() -> String:
+	# Changes whenever the project may have changed: another project became
+	# current, an edit was done or undone in the editor (undo version), or a
+	# mutating bridge request was handled.
+	var project: Project = Global.current_project
+	if project:
+		return "%d:%d:%d" % [project.get_instance_id(), project.undo_redo.get_version(), _revision]
+	return "%d" % _revision
+
+
 func _handle_version(_params: Dictionary) -> Dictionary:
 	var version := ""
 	if _api and _api.general:
@@ -574,19 +691,19 @@ func _handle_project_set_indexed_mode(params: Dictionary) -> Dictionary:
 	return {"indexed": enabled}
 
 
-func _handle_layer_list(_params: Dictionary) -> Dictionary:
+func _handle_layer_list(params: Dictionary) -> Dictionary:
 	if not _require_project():
 		return _err("no_project", "no current project")
 	var project := Global.current_project
-	var items := []
-	for i in project.layers.size():
-		var layer := project.layers[i]
-		items.append({
-			"index": i,
-			"name": layer.name,
-			"type": layer.get_class()
-		})
-	return {"layers": items, "current_layer": project.current_layer}
+	var span := Listing.page(params, project.layers.size())
+	var items := Listing.rows(params, span, {
+		"index": func(i: int) -> Variant: return i,
+		"name": func(i: int) -> Variant: return project.layers[i].name,
+		"type": func(i: int) -> Variant: return project.layers[i].get_class(),
+	})
+	return Listing.shape(
+		{"current_layer": project.current_layer}, "layers", items, params, span, project.layers.size()
+	)
 
 
 func _handle_layer_add(params: Dictionary) -> Dictionary:
@@ -770,15 +887,18 @@ func _handle_layer_parent_set(params: Dictionary) -> Dictionary:
 	return _handle_layer_get_props({"index": index})
 
 
-func _handle_frame_list(_params: Dictionary) -> Dictionary:
+func _handle_frame_list(params: Dictionary) -> Dictionary:
 	if not _require_project():
 		return _err("no_project", "no current project")
 	var project := Global.current_project
-	var items := []
-	for i in project.frames.size():
-		var frame := project.frames[i]
-		items.append({"index": i, "duration": frame.duration})
-	return {"frames": items, "current_frame": project.current_frame}
+	var span := Listing.page(params, project.frames.size())
+	var items := Listing.rows(params, span, {
+		"index": func(i: int) -> Variant: return i,
+		"duration": func(i: int) -> Variant: return project.frames[i].duration,
+	})
+	return Listing.shape(
+		{"current_frame": project.current_frame}, "frames", items, params, span, project.frames.size()
+	)
 
 
 func _handle_frame_add(params: Dictionary) -> Dictionary:
@@ -787,8 +907,13 @@ func _handle_frame_add(params: Dictionary) -> Dictionary:
 	var project := Global.current_project
 	var after := int(params.get("after", project.frames.size() - 1))
 	after = clampi(after, 0, project.frames.size() - 1)
-	var frame := project.new_empty_frame()
-	project.add_frames([frame], PackedInt32Array([after + 1]))
+	var count := maxi(1, int(params.get("count", 1)))
+	var frames: Array = []
+	var indices := PackedInt32Array()
+	for i in count:
+		frames.append(project.new_empty_frame())
+		indices.append(after + 1 + i)
+	project.add_frames(frames, indices)
 	return _handle_frame_list({})
 
 
@@ -839,6 +964,53 @@ func _handle_frame_move(params: Dictionary) -> Dictionary:
 	return _handle_frame_list({})
 
 
+func _handle_frame_snapshot(params: Dictionary) -> Dictionary:
+	if not _require_project():
+		return _err("no_project", "no current project")
+	var project := Global.current_project
+	var index := int(params.get("frame", project.current_frame))
+	if index < 0 or index >= project.frames.size():
+		return _err("invalid_index", "frame index out of range")
+	var image := project.new_empty_image()
+	DrawingAlgos.blend_layers(image, project.frames[index], Vector2i.ZERO, project)
+	var fmt := str(params.get("format", "raw")).to_lower()
+	if fmt == "png":
+		return {
+			"frame": index,
+			"format": "png",
+			"width": image.get_width(),
+			"height": image.get_height(),
+			"data": Marshalls.raw_to_base64(image.save_png_to_buffer())
+		}
+	image.convert(Image.FORMAT_RGBA8)
+	return {
+		"frame": index,
+		"format": "raw",
+		"width": image.get_width(),
+		"height": image.get_height(),
+		"data": Marshalls.raw_to_base64(image.get_data())
+	}
+
+
+func _handle_frame_hashes(params: Dictionary) -> Dictionary:
+	if not _require_project():
+		return _err("no_project", "no current project")
+	var project := Global.current_project
+	var frames: Array = []
+	var frames_raw: Variant = params.get("frames", null)
+	if typeof(frames_raw) == TYPE_ARRAY:
+		frames = frames_raw
+	else:
+		frames = range(project.frames.size())
+	var hashes := {}
+	for f in frames:
+		var index := int(f)
+		if index < 0 or index >= project.frames.size():
+			return _err("invalid_index", "frame index out of range")
+		hashes[str(index)] = CelUtils.frame_digest(project, index)
+	return {"hashes": hashes}
+
+
 func _handle_pixel_get(params: Dictionary) -> Dictionary:
 	if not _require_project():
 		return _err("no_project", "no current project")
@@ -955,17 +1127,25 @@ func _handle_canvas_snapshot(params: Dictionary) -> Dictionary:
 	}
 
 
-func _handle_palette_list(_params: Dictionary) -> Dictionary:
-	var items := []
+func _handle_palette_list(params: Dictionary) -> Dictionary:
+	var names := []
+	var scopes := []
 	for name in Palettes.palettes.keys():
-		items.append({"name": name, "scope": "global"})
+		names.append(name)
+		scopes.append("global")
 	if Global.current_project:
 		for name in Global.current_project.palettes.keys():
-			items.append({"name": name, "scope": "project"})
+			names.append(name)
+			scopes.append("project")
+	var span := Listing.page(params, names.size())
+	var items := Listing.rows(params, span, {
+		"name": func(i: int) -> Variant: return names[i],
+		"scope": func(i: int) -> Variant: return scopes[i],
+	})
 	var current := ""
 	if Palettes.current_palette:
 		current = Palettes.current_palette.name
-	return {"palettes": items, "current": current}
+	return Listing.shape({"current": current}, "palettes", items, params, span, names.size())
 
 
 func _handle_palette_select(params: Dictionary) -> Dictionary:
@@ -976,6 +1156,30 @@ func _handle_palette_select(params: Dictionary) -> Dictionary:
 	return {"current": Palettes.current_palette.name if Palettes.current_palette else ""}
 
 
+func _handle_palette_get(params: Dictionary) -> Dictionary:
+	var name := str(params.get("name", ""))
+	var palette: Palette = null
+	if name.is_empty():
+		palette = Palettes.current_palette
+	elif Palettes.palettes.has(name):
+		palette = Palettes.palettes[name]
+	elif Global.current_project and Global.current_project.palettes.has(name):
+		palette = Global.current_project.palettes[name]
+	if palette == null:
+		return _err("not_found", "palette not found")
+	var indices := palette.colors.keys()
+	indices.sort()
+	var colors := []
+	for idx in indices:
+		colors.append({"index": idx, "color": Drawing.color_to_array(palette.colors[idx].color)})
+	return {
+		"name": palette.name,
+		"width": palette.width,
+		"height": palette.height,
+		"colors": colors
+	}
+
+
 func _handle_palette_create(params: Dictionary) -> Dictionary:
 	var name := str(params.get("name", ""))
 	if name.is_empty():
@@ -1126,21 +1330,9 @@ func _handle_draw_gradient(params: Dictionary) -> Dictionary:
 	var from_color := Parsers.parse_color(params.get("from", null))
 	var to_color := Parsers.parse_color(params.get("to", null))
 	var direction := str(params.get("direction", "horizontal")).to_lower()
-	for yy in range(y, y + height):
-		for xx in range(x, x + width):
-			if xx < 0 or yy < 0 or xx >= project.size.x or yy >= project.size.y:
-				continue
-			var t := 0.0
-			if direction == "vertical":
-				t = float(yy - y) / float(max(1, height - 1))
-			elif direction == "diagonal":
-				var tx := float(xx - x) / float(max(1, width - 1))
-				var ty := float(yy - y) / float(max(1, height - 1))
-				t = (tx + ty) * 0.5
-			else:
-				t = float(xx - x) / float(max(1, width - 1))
-			var c := from_color.lerp(to_color, t)
-			cel.image.set_pixel(xx, yy, c)
+	Rasterizer.fill_gradient(
+		cel.image, Rect2i(x, y, width, height), from_color, to_color, direction
+	)
 	cel.update_texture()
 	return {"ok": true}
 
@@ -1167,11 +1359,7 @@ func _handle_draw_rect(params: Dictionary) -> Dictionary:
 	if fill:
 		cel.image.fill_rect(rect, color)
 	else:
-		for i in range(thickness):
-			Drawing.draw_line_on_image(cel.image, Vector2i(rect.position.x, rect.position.y + i), Vector2i(rect.position.x + rect.size.x - 1, rect.position.y + i), color, 1)
-			Drawing.draw_line_on_image(cel.image, Vector2i(rect.position.x, rect.position.y + rect.size.y - 1 - i), Vector2i(rect.position.x + rect.size.x - 1, rect.position.y + rect.size.y - 1 - i), color, 1)
-			Drawing.draw_line_on_image(cel.image, Vector2i(rect.position.x + i, rect.position.y), Vector2i(rect.position.x + i, rect.position.y + rect.size.y - 1), color, 1)
-			Drawing.draw_line_on_image(cel.image, Vector2i(rect.position.x + rect.size.x - 1 - i, rect.position.y), Vector2i(rect.position.x + rect.size.x - 1 - i, rect.position.y + rect.size.y - 1), color, 1)
+		Rasterizer.stroke_rect(cel.image, rect, color, thickness)
 	cel.update_texture()
 	return {"ok": true}
 
@@ -1485,10 +1673,15 @@ func _handle_project_import_spritesheet(params: Dictionary) -> Dictionary:
 	if horiz <= 0 or vert <= 0:
 		return _err("invalid_size", "horizontal/vertical must be > 0")
 	var detect_empty := bool(params.get("detect_empty", true))
+	var dedupe := bool(params.get("dedupe", true))
 	var mode := str(params.get("mode", "new_project")).to_lower()
 	if mode == "new_project":
 		OpenSave.open_image_as_spritesheet_tab(path, image, horiz, vert, detect_empty)
-		return _project_info(Global.current_project)
+		var project: Project = Global.current_project
+		var info := _project_info(project)
+		if dedupe:
+			info["compact"] = _compact_layers(project, [0], true, false)
+		return info
 	if mode == "new_layer":
 		if not _require_project():
 			return _err("no_project", "no current project")
@@ -1497,10 +1690,78 @@ func _handle_project_import_spritesheet(params: Dictionary) -> Dictionary:
 		OpenSave.open_image_as_spritesheet_layer(
 			path, image, file_name, start_frame, horiz, vert, detect_empty
 		)
-		return _project_info(Global.current_project)
+		var project: Project = Global.current_project
+		var info := _project_info(project)
+		if dedupe:
+			# The spritesheet layer is added on top
+			info["compact"] = _compact_layers(project, [project.layers.size() - 1], true, false)
+		return info
 	return _err("invalid_mode", "mode must be new_project or new_layer")
 
 
+func _handle_project_compact(params: Dictionary) -> Dictionary:
+	if not _require_project():
+		return _err("no_project", "no current project")
+	var project: Project = Global.current_project
+	var layers: Array = []
+	var layers_raw: Variant = params.get("layers", null)
+	if typeof(layers_raw) == TYPE_ARRAY:
+		for l in layers_raw:
+			var index := int(l)
+			if index < 0 or index >= project.layers.size():
+				return _err("invalid_layer", "layer index out of range")
+			layers.append(index)
+	else:
+		layers = range(project.layers.size())
+	var include_empty := bool(params.get("include_empty", true))
+	var dry_run := bool(params.get("dry_run", false))
+	var result := _compact_layers(project, layers, include_empty, dry_run)
+	result["dry_run"] = dry_run
+	return result
+
+
+func _handle_project_memory_stats(params: Dictionary) -> Dictionary:
+	if not _require_project():
+		return _err("no_project", "no current project")
+	return MemoryStats.project_stats(Global.current_project, bool(params.get("hash", true)))
+
+
+func _compact_layers(project: Project, layers: Array, include_empty: bool, dry_run: bool) -> Dictionary:
+	var frames := range(project.frames.size())
+	var total := {"linked": 0, "emptied": 0, "link_sets": 0, "bytes_reclaimed": 0}
+	for l in layers:
+		var stats := CelUtils.compact_layer(project, l, frames, include_empty, dry_run)
+		for key in total:
+			total[key] += stats[key]
+	if not dry_run and total["linked"] > 0:
+		project.change_cel(project.current_frame, project.current_layer)
+	return total
+
+
+func _handle_cel_link(params: Dictionary) -> Dictionary:
+	if not _require_project():
+		return _err("no_project", "no current project")
+	var project: Project = Global.current_project
+	var layer := int(params.get("layer", project.current_layer))
+	if layer < 0 or layer >= project.layers.size():
+		return _err("invalid_layer", "layer index out of range")
+	var frames_raw: Variant = params.get("frames", [])
+	if typeof(frames_raw) != TYPE_ARRAY or frames_raw.size() < 2:
+		return _err("invalid_params", "frames must be an array of at least 2 indices")
+	var cels: Array = []
+	for f in frames_raw:
+		var frame := int(f)
+		if frame < 0 or frame >= project.frames.size():
+			return _err("invalid_index", "frame index out of range")
+		var cel: BaseCel = project.frames[frame].cels[layer]
+		if not CelUtils.is_dedupable(cel):
+			return _err("invalid_cel", "not a PixelCel")
+		cels.append(cel)
+	var linked := CelUtils.link_cels(project.layers[layer], cels)
+	project.change_cel(project.current_frame, project.current_layer)
+	return {"ok": true, "linked": linked}
+
+
 func _handle_pixel_set_many(params: Dictionary) -> Dictionary:
 	if not _require_project():
 		return _err("no_project", "no current project")
@@ -1613,24 +1874,21 @@ func _handle_pixel_set_region(params: Dictionary) -> Dictionary:
 	return {"ok": true, "width": image.get_width(), "height": image.get_height()}
 
 
-func _handle_animation_tags_list(_params: Dictionary) -> Dictionary:
+func _handle_animation_tags_list(params: Dictionary) -> Dictionary:
 	if not _require_project():
 		return _err("no_project", "no current project")
 	var project: Project = Global.current_project
-	var items := []
-	for i in project.animation_tags.size():
-		var tag := project.animation_tags[i]
-		items.append(
-			{
-				"index": i,
-				"name": tag.name,
-				"color": Drawing.color_to_array(tag.color),
-				"from": tag.from,
-				"to": tag.to,
-				"user_data": tag.user_data
-			}
-		)
-	return {"tags": items}
+	var span := Listing.page(params, project.animation_tags.size())
+	var tags := project.animation_tags
+	var items := Listing.rows(params, span, {
+		"index": func(i: int) -> Variant: return i,
+		"name": func(i: int) -> Variant: return tags[i].name,
+		"color": func(i: int) -> Variant: return Drawing.color_to_array(tags[i].color),
+		"from": func(i: int) -> Variant: return tags[i].from,
+		"to": func(i: int) -> Variant: return tags[i].to,
+		"user_data": func(i: int) -> Variant: return tags[i].user_data,
+	})
+	return Listing.shape({}, "tags", items, params, span, project.animation_tags.size())
 
 
 func _handle_animation_tags_add(params: Dictionary) -> Dictionary:
@@ -1780,23 +2038,20 @@ func _handle_animation_loop_set(params: Dictionary) -> Dictionary:
 	return {"mode": mode}
 
 
-func _handle_tilemap_tileset_list(_params: Dictionary) -> Dictionary:
+func _handle_tilemap_tileset_list(params: Dictionary) -> Dictionary:
 	if not _require_project():
 		return _err("no_project", "no current project")
 	var project: Project = Global.current_project
-	var items := []
-	for i in project.tilesets.size():
-		var tileset := project.tilesets[i]
-		items.append(
-			{
-				"index": i,
-				"name": tileset.name,
-				"tile_size": [tileset.tile_size.x, tileset.tile_size.y],
-				"tile_shape": tileset.tile_shape,
-				"tile_count": tileset.tiles.size()
-			}
-		)
-	return {"tilesets": items}
+	var span := Listing.page(params, project.tilesets.size())
+	var tilesets := project.tilesets
+	var items := Listing.rows(params, span, {
+		"index": func(i: int) -> Variant: return i,
+		"name": func(i: int) -> Variant: return tilesets[i].name,
+		"tile_size": func(i: int) -> Variant: return [tilesets[i].tile_size.x, tilesets[i].tile_size.y],
+		"tile_shape": func(i: int) -> Variant: return tilesets[i].tile_shape,
+		"tile_count": func(i: int) -> Variant: return tilesets[i].tiles.size(),
+	})
+	return Listing.shape({}, "tilesets", items, params, span, project.tilesets.size())
 
 
 func _handle_tilemap_tileset_create(params: Dictionary) -> Dictionary:
@@ -1850,6 +2105,45 @@ func _handle_tilemap_tileset_add_tile(params: Dictionary) -> Dictionary:
 	return {"tile_index": tileset.tiles.size() - 1}
 
 
+func _handle_tilemap_tileset_add_tiles(params: Dictionary) -> Dictionary:
+	if not _require_project():
+		return _err("no_project", "no current project")
+	var project: Project = Global.current_project
+	var idx := int(params.get("tileset_index", -1))
+	if idx < 0 or idx >= project.tilesets.size():
+		return _err("invalid_index", "tileset index out of range")
+	var data_str := str(params.get("data", ""))
+	if data_str.is_empty():
+		return _err("invalid_params", "data is required")
+	var raw := Marshalls.base64_to_raw(data_str)
+	var atlas := Image.new()
+	if str(params.get("format", "png")).to_lower() == "raw":
+		var width := int(params.get("width", 0))
+		var height := int(params.get("height", 0))
+		if width <= 0 or height <= 0 or raw.size() != width * height * 4:
+			return _err("invalid_size", "width/height do not match raw data")
+		atlas = Image.create_from_data(width, height, false, Image.FORMAT_RGBA8, raw)
+	else:
+		var err := atlas.load_png_from_buffer(raw)
+		if err != OK:
+			return _err("decode_failed", error_string(err))
+		atlas.convert(Image.FORMAT_RGBA8)
+	var tileset := project.tilesets[idx]
+	var tile_size := tileset.tile_size
+	var columns := atlas.get_width() / tile_size.x
+	var rows := atlas.get_height() / tile_size.y
+	if columns <= 0 or rows <= 0:
+		return _err("invalid_size", "atlas is smaller than one tile")
+	var count := int(params.get("tile_count", columns * rows))
+	count = clampi(count, 0, columns * rows)
+	var times_used := int(params.get("times_used", 0))
+	var first_index := tileset.tiles.size()
+	for i in count:
+		var pos := Vector2i((i % columns) * tile_size.x, (i / columns) * tile_size.y)
+		tileset.add_tile(atlas.get_region(Rect2i(pos, tile_size)), null, times_used)
+	return {"first_index": first_index, "count": count, "tile_count": tileset.tiles.size()}
+
+
 func _handle_tilemap_tileset_remove_tile(params: Dictionary) -> Dictionary:
 	if not _require_project():
 		return _err("no_project", "no current project")
@@ -2019,6 +2313,82 @@ func _handle_tilemap_cell_clear(params: Dictionary) -> Dictionary:
 	return _handle_tilemap_cell_set(params)
 
 
+func _handle_tilemap_cells_get_region(params: Dictionary) -> Dictionary:
+	if not _require_project():
+		return _err("no_project", "no current project")
+	var project: Project = Global.current_project
+	var layer_idx := int(params.get("layer", project.current_layer))
+	var frame_idx := int(params.get("frame", project.current_frame))
+	var cell_x := int(params.get("cell_x", 0))
+	var cell_y := int(params.get("cell_y", 0))
+	var width := int(params.get("width", 1))
+	var height := int(params.get("height", 1))
+	if width <= 0 or height <= 0:
+		return _err("invalid_size", "width/height must be > 0")
+	var cel := _get_tilemap_cel(frame_idx, layer_idx)
+	if cel == null:
+		return _err("invalid_cel", "not a CelTileMap")
+	var indices := PackedInt32Array()
+	indices.resize(width * height)
+	var flags := PackedByteArray()
+	flags.resize(width * height)
+	var i := 0
+	for yy in range(cell_y, cell_y + height):
+		for xx in range(cell_x, cell_x + width):
+			var cell = cel.get_cell_at(Vector2i(xx, yy))
+			if cell != null:
+				indices[i] = cell.index
+				flags[i] = _pack_cell_flags(cell.flip_h, cell.flip_v, cell.transpose)
+			i += 1
+	var result := {"cell_x": cell_x, "cell_y": cell_y, "width": width, "height": height}
+	if str(params.get("format", "packed")).to_lower() == "list":
+		result["format"] = "list"
+		result["indices"] = Array(indices)
+		result["flags"] = Array(flags)
+	else:
+		result["format"] = "packed"
+		result["indices"] = Marshalls.raw_to_base64(indices.to_byte_array())
+		result["flags"] = Marshalls.raw_to_base64(flags)
+	return result
+
+
+func _handle_tilemap_cells_set_region(params: Dictionary) -> Dictionary:
+	if not _require_project():
+		return _err("no_project", "no current project")
+	var project: Project = Global.current_project
+	var layer_idx := int(params.get("layer", project.current_layer))
+	var frame_idx := int(params.get("frame", project.current_frame))
+	var cell_x := int(params.get("cell_x", 0))
+	var cell_y := int(params.get("cell_y", 0))
+	var width := int(params.get("width", 1))
+	var height := int(params.get("height", 1))
+	if width <= 0 or height <= 0:
+		return _err("invalid_size", "width/height must be > 0")
+	var cel := _get_tilemap_cel(frame_idx, layer_idx)
+	if cel == null:
+		return _err("invalid_cel", "not a CelTileMap")
+	var indices_raw: Variant = params.get("indices", null)
+	var flags_raw: Variant = params.get("flags", null)
+	var indices := PackedInt32Array()
+	var flags := PackedByteArray()
+	if typeof(indices_raw) == TYPE_STRING:
+		indices = Marshalls.base64_to_raw(indices_raw).to_int32_array()
+	elif typeof(indices_raw) == TYPE_ARRAY:
+		indices = PackedInt32Array(indices_raw)
+	else:
+		return _err("invalid_params", "indices must be base64 int32 or array")
+	if typeof(flags_raw) == TYPE_STRING:
+		flags = Marshalls.base64_to_raw(flags_raw)
+	elif typeof(flags_raw) == TYPE_ARRAY:
+		flags = PackedByteArray(flags_raw)
+	if indices.size() != width * height:
+		return _err("invalid_params", "indices size does not match width*height")
+	if not flags.is_empty() and flags.size() != width * height:
+		return _err("invalid_params", "flags size does not match width*height")
+	var changed := _set_tilemap_cells(cel, Vector2i(cell_x, cell_y), width, indices, flags)
+	return {"ok": true, "changed": changed}
+
+
 func _handle_tilemap_fill_rect(params: Dictionary) -> Dictionary:
 	if not _require_project():
 		return _err("no_project", "no current project")
@@ -2038,11 +2408,14 @@ func _handle_tilemap_fill_rect(params: Dictionary) -> Dictionary:
 	var cel := _get_tilemap_cel(frame_idx, layer_idx)
 	if cel == null:
 		return _err("invalid_cel", "not a CelTileMap")
-	for yy in range(cell_y, cell_y + height):
-		for xx in range(cell_x, cell_x + width):
-			var cell := cel.get_cell_at(Vector2i(xx, yy))
-			cel.set_index(cell, index, flip_h, flip_v, transpose)
-	return {"ok": true}
+	var indices := PackedInt32Array()
+	indices.resize(width * height)
+	indices.fill(index)
+	var flags := PackedByteArray()
+	flags.resize(width * height)
+	flags.fill(_pack_cell_flags(flip_h, flip_v, transpose))
+	var changed := _set_tilemap_cells(cel, Vector2i(cell_x, cell_y), width, indices, flags)
+	return {"ok": true, "changed": changed}
 
 
 func _handle_tilemap_replace_index(params: Dictionary) -> Dictionary:
@@ -2089,12 +2462,12 @@ func _handle_tilemap_random_fill(params: Dictionary) -> Dictionary:
 	var cel := _get_tilemap_cel(frame_idx, layer_idx)
 	if cel == null:
 		return _err("invalid_cel", "not a CelTileMap")
-	for yy in range(cell_y, cell_y + height):
-		for xx in range(cell_x, cell_x + width):
-			var idx := Drawing.pick_weighted_index(indices, weights)
-			var cell := cel.get_cell_at(Vector2i(xx, yy))
-			cel.set_index(cell, idx, false, false, false)
-	return {"ok": true}
+	var picked := PackedInt32Array()
+	picked.resize(width * height)
+	for i in picked.size():
+		picked[i] = Drawing.pick_weighted_index(indices, weights)
+	var changed := _set_tilemap_cells(cel, Vector2i(cell_x, cell_y), width, picked, PackedByteArray())
+	return {"ok": true, "changed": changed}
 
 
 func _handle_effect_layer_list(params: Dictionary) -> Dictionary:
@@ -2348,15 +2721,16 @@ func _handle_history_redo(_params: Dictionary) -> Dictionary:
 	return {"ok": true}
 
 
-func _handle_brush_list(_params: Dictionary) -> Dictionary:
+func _handle_brush_list(params: Dictionary) -> Dictionary:
 	if not _require_project():
 		return _err("no_project", "no current project")
 	var project: Project = Global.current_project
-	var items := []
-	for i in project.brushes.size():
-		var brush: Image = project.brushes[i]
-		items.append({"index": i, "size": [brush.get_width(), brush.get_height()]})
-	return {"brushes": items}
+	var span := Listing.page(params, project.brushes.size())
+	var items := Listing.rows(params, span, {
+		"index": func(i: int) -> Variant: return i,
+		"size": func(i: int) -> Variant: return [project.brushes[i].get_width(), project.brushes[i].get_height()],
+	})
+	return Listing.shape({}, "brushes", items, params, span, project.brushes.size())
 
 
 func _handle_brush_add(params: Dictionary) -> Dictionary:
@@ -2425,7 +2799,7 @@ func _handle_brush_stamp(params: Dictionary) -> Dictionary:
 	var jitter := float(params.get("jitter", 0.0))
 	var spray := int(params.get("spray", 0))
 	var spray_radius := float(params.get("spray_radius", 0.0))
-	BrushHelpers.apply_brush_with_variation(
+	var dirty := BrushHelpers.apply_brush_with_variation(
 		cel.image,
 		brush,
 		Vector2i(x, y),
@@ -2436,8 +2810,9 @@ func _handle_brush_stamp(params: Dictionary) -> Dictionary:
 		spray,
 		spray_radius
 	)
-	cel.update_texture()
-	return {"ok": true}
+	if dirty.has_area():
+		cel.update_texture()
+	return {"ok": true, "dirty_rect": _rect_to_array(dirty)}
 
 
 func _handle_brush_stroke(params: Dictionary) -> Dictionary:
@@ -2466,6 +2841,10 @@ func _handle_brush_stroke(params: Dictionary) -> Dictionary:
 	var spray := int(params.get("spray", 0))
 	var spray_radius := float(params.get("spray_radius", 0.0))
 	var curve: Dictionary = Parsers.parse_spacing_curve(params.get("spacing_curve", null))
+	# Tint and blend tables are built once per stroke, not once per stamp.
+	var ctx := BrushHelpers.begin_stroke(
+		cel.image, BrushHelpers.prepare_brush(brush, color, opacity, mode)
+	)
 	var total_length := Drawing.polyline_length(points)
 	var traveled := 0.0
 	for i in range(points.size() - 1):
@@ -2490,20 +2869,14 @@ func _handle_brush_stroke(params: Dictionary) -> Dictionary:
 		for s in range(steps + 1):
 			var t := 0.0 if steps == 0 else float(s) / float(steps)
 			var pos := v1 + segment * t
-			BrushHelpers.apply_brush_with_variation(
-				cel.image,
-				brush,
-				Vector2i(int(round(pos.x)), int(round(pos.y))),
-				color,
-				opacity,
-				mode,
-				jitter,
-				spray,
-				spray_radius
+			BrushHelpers.stamp_with_variation(
+				ctx, Vector2i(int(round(pos.x)), int(round(pos.y))), jitter, spray, spray_radius
 			)
 		traveled += dist
-	cel.update_texture()
-	return {"ok": true}
+	var dirty: Rect2i = ctx["dirty"]
+	if dirty.has_area():
+		cel.update_texture()
+	return {"ok": true, "dirty_rect": _rect_to_array(dirty)}
 
 
 func _handle_palette_import(params: Dictionary) -> Dictionary:
@@ -2744,6 +3117,56 @@ func _get_3d_cel(frame: int, layer: int) -> Cel3D:
 	return null
 
 
+func _set_tilemap_cells(
+	cel: CelTileMap, origin: Vector2i, width: int, indices: PackedInt32Array, flags: PackedByteArray
+) -> int:
+	# Writes cells directly (same bookkeeping as CelTileMap.set_index) and
+	# redraws the cel once, instead of once per cell. Negative indices leave
+	# the cell untouched; unchanged cells are skipped.
+	var tiles := cel.tileset.tiles
+	var changed := 0
+	for i in indices.size():
+		var index := indices[i]
+		if index < 0:
+			continue
+		var cell = cel.get_cell_at(origin + Vector2i(i % width, i / width))
+		if cell == null:
+			continue
+		index = clampi(index, 0, tiles.size() - 1)
+		var f := flags[i] if i < flags.size() else 0
+		var flip_h := f & 1 != 0
+		var flip_v := f & 2 != 0
+		var transpose := f & 4 != 0
+		if (
+			cell.index == index
+			and cell.flip_h == flip_h
+			and cell.flip_v == flip_v
+			and cell.transpose == transpose
+		):
+			continue
+		if cell.index != index:
+			if cell.index > 0 and cell.index < tiles.size():
+				tiles[cell.index].times_used -= 1
+			tiles[index].times_used += 1
+			cell.index = index
+		cell.flip_h = flip_h
+		cell.flip_v = flip_v
+		cell.transpose = transpose
+		changed += 1
+	if changed > 0:
+		cel.update_cel_portions()
+		cel.update_texture()
+	return changed
+
+
+func _pack_cell_flags(flip_h: bool, flip_v: bool, transpose: bool) -> int:
+	return int(flip_h) | (int(flip_v) << 1) | (int(transpose) << 2)
+
+
+func _rect_to_array(rect: Rect2i) -> Array:
+	return [rect.position.x, rect.position.y, rect.size.x, rect.size.y]
+
+
 func _serialize_effect_params(params: Dictionary) -> Dictionary:
 	var out := {}
 	for key in params.keys():
@@ -48,6 +48,138 @@ static func build_brush_image(params: Dictionary) -> Image:
 	return image
 
 
+static func prepare_brush(brush: Image, color: Color, opacity: float, mode: String) -> Dictionary:
+	# Everything that only depends on the brush and stroke settings is built
+	# once here, so individual stamps are bulk image operations.
+	var mask := brush
+	if mask.get_format() != Image.FORMAT_RGBA8:
+		mask = Image.new()
+		mask.copy_from(brush)
+		mask.convert(Image.FORMAT_RGBA8)
+	var size := mask.get_size()
+	var mode_l := mode.to_lower()
+	var prepared := {"size": size, "mode": mode_l, "mask": mask}
+	if mode_l == "erase":
+		return prepared
+	prepared["tinted"] = tint_brush(mask, color, opacity)
+	if mode_l != "paint" and mode_l != "normal":
+		prepared["lut"] = build_blend_lut(color, mode_l)
+		var tinted_data: PackedByteArray = prepared["tinted"].get_data()
+		var offsets := PackedInt32Array()
+		var alphas := PackedByteArray()
+		for i in range(size.x * size.y):
+			var a := tinted_data[i * 4 + 3]
+			if a == 0:
+				continue
+			offsets.append(i)
+			alphas.append(a)
+		prepared["offsets"] = offsets
+		prepared["alphas"] = alphas
+	return prepared
+
+
+static func tint_brush(mask: Image, color: Color, opacity: float) -> Image:
+	var data := mask.get_data()
+	var r := clampi(int(round(color.r * 255.0)), 0, 255)
+	var g := clampi(int(round(color.g * 255.0)), 0, 255)
+	var b := clampi(int(round(color.b * 255.0)), 0, 255)
+	for i in range(0, data.size(), 4):
+		data[i] = r
+		data[i + 1] = g
+		data[i + 2] = b
+		data[i + 3] = clampi(int(round(data[i + 3] * opacity)), 0, 255)
+	return Image.create_from_data(mask.get_width(), mask.get_height(), false, Image.FORMAT_RGBA8, data)
+
+
+static func build_blend_lut(color: Color, mode: String) -> PackedByteArray:
+	# The brush color is constant over a stroke and every blend mode works per
+	# channel, so the blended value only depends on the destination byte.
+	var src := Color(color.r, color.g, color.b, 1.0)
+	var lut := PackedByteArray()
+	lut.resize(768)
+	for v in 256:
+		var f := v / 255.0
+		var blended := Drawing.blend_mode_color(src, Color(f, f, f, 1.0), mode)
+		lut[v] = clampi(int(round(blended.r * 255.0)), 0, 255)
+		lut[256 + v] = clampi(int(round(blended.g * 255.0)), 0, 255)
+		lut[512 + v] = clampi(int(round(blended.b * 255.0)), 0, 255)
+	return lut
+
+
+static func begin_stroke(target: Image, prepared: Dictionary) -> Dictionary:
+	var ctx := {"target": target, "prepared": prepared, "dirty": Rect2i()}
+	if prepared["mode"] == "erase":
+		# blit_rect_mask needs the source in the target's format
+		var size: Vector2i = prepared["size"]
+		ctx["blank"] = Image.create(size.x, size.y, false, target.get_format())
+	return ctx
+
+
+static func stamp(ctx: Dictionary, pos: Vector2i) -> void:
+	var target: Image = ctx["target"]
+	var prepared: Dictionary = ctx["prepared"]
+	var size: Vector2i = prepared["size"]
+	var dst := pos - size / 2
+	var rect := Rect2i(dst, size).intersection(Rect2i(Vector2i.ZERO, target.get_size()))
+	if not rect.has_area():
+		return
+	var dirty: Rect2i = ctx["dirty"]
+	ctx["dirty"] = rect if not dirty.has_area() else dirty.merge(rect)
+	var full := Rect2i(Vector2i.ZERO, size)
+	match prepared["mode"]:
+		"erase":
+			target.blit_rect_mask(ctx["blank"], prepared["mask"], full, dst)
+		"paint", "normal":
+			target.blend_rect(prepared["tinted"], full, dst)
+		_:
+			_stamp_lut(target, prepared, dst, rect)
+
+
+static func _stamp_lut(target: Image, prepared: Dictionary, dst: Vector2i, rect: Rect2i) -> void:
+	# Read-modify-write only the stamp's on-canvas rect, as raw bytes.
+	var region := target.get_region(rect)
+	if region.get_format() != Image.FORMAT_RGBA8:
+		region.convert(Image.FORMAT_RGBA8)
+	var data := region.get_data()
+	var lut: PackedByteArray = prepared["lut"]
+	var offsets: PackedInt32Array = prepared["offsets"]
+	var alphas: PackedByteArray = prepared["alphas"]
+	var brush_w: int = prepared["size"].x
+	var clip := rect.position - dst
+	for i in offsets.size():
+		var bx := offsets[i] % brush_w - clip.x
+		var by := offsets[i] / brush_w - clip.y
+		if bx < 0 or by < 0 or bx >= rect.size.x or by >= rect.size.y:
+			continue
+		var sa := alphas[i]
+		var inv := 255 - sa
+		var o := (by * rect.size.x + bx) * 4
+		var dr := data[o]
+		var dg := data[o + 1]
+		var db := data[o + 2]
+		var da := data[o + 3]
+		data[o] = (dr * inv + lut[dr] * sa + 127) / 255
+		data[o + 1] = (dg * inv + lut[256 + dg] * sa + 127) / 255
+		data[o + 2] = (db * inv + lut[512 + db] * sa + 127) / 255
+		data[o + 3] = da + (sa * (255 - da) + 127) / 255
+	var out := Image.create_from_data(rect.size.x, rect.size.y, false, Image.FORMAT_RGBA8, data)
+	if target.get_format() != Image.FORMAT_RGBA8:
+		out.convert(target.get_format())
+	target.blit_rect(out, Rect2i(Vector2i.ZERO, rect.size), rect.position)
+
+
+static func stamp_with_variation(
+	ctx: Dictionary, pos: Vector2i, jitter: float, spray: int, spray_radius: float
+) -> void:
+	if spray > 0:
+		for i in range(spray):
+			var offset := random_offset(spray_radius)
+			var jitter_offset := random_offset(jitter)
+			stamp(ctx, pos + offset + jitter_offset)
+		return
+	stamp(ctx, pos + random_offset(jitter))
+
+
 static func apply_brush(
 	target: Image,
 	brush: Image,
@@ -55,44 +187,10 @@ static func apply_brush(
 	color: Color,
 	opacity: float,
 	mode: String
-) -> void:
-	var brush_img := Image.new()
-	brush_img.copy_from(brush)
-	var size := brush_img.get_size()
-	var dst := pos - size / 2
-	var mode_l := mode.to_lower()
-	if mode_l == "erase":
-		var blank := Image.create(size.x, size.y, false, target.get_format())
-		blank.fill(Color(0, 0, 0, 0))
-		target.blit_rect_mask(blank, brush_img, Rect2i(Vector2i.ZERO, size), dst)
-		return
-	for y in size.y:
-		for x in size.x:
-			var pix := brush_img.get_pixel(x, y)
-			if pix.a <= 0.0:
-				continue
-			var c := color
-			c.a = pix.a * opacity
-			brush_img.set_pixel(x, y, c)
-	if mode_l == "paint" or mode_l == "normal":
-		target.blend_rect(brush_img, Rect2i(Vector2i.ZERO, size), dst)
-		return
-	for y2 in size.y:
-		for x2 in size.x:
-			var src := brush_img.get_pixel(x2, y2)
-			if src.a <= 0.0:
-				continue
-			var tx := dst.x + x2
-			var ty := dst.y + y2
-			if tx < 0 or ty < 0 or tx >= target.get_width() or ty >= target.get_height():
-				continue
-			var dst_c := target.get_pixel(tx, ty)
-			var blended := Drawing.blend_mode_color(src, dst_c, mode_l)
-			var out_r := dst_c.r * (1.0 - src.a) + blended.r * src.a
-			var out_g := dst_c.g * (1.0 - src.a) + blended.g * src.a
-			var out_b := dst_c.b * (1.0 - src.a) + blended.b * src.a
-			var out_a := dst_c.a + src.a * (1.0 - dst_c.a)
-			target.set_pixel(tx, ty, Color(out_r, out_g, out_b, out_a))
+) -> Rect2i:
+	var ctx := begin_stroke(target, prepare_brush(brush, color, opacity, mode))
+	stamp(ctx, pos)
+	return ctx["dirty"]
 
 
 static func apply_brush_with_variation(
@@ -105,15 +203,10 @@ static func apply_brush_with_variation(
 	jitter: float,
 	spray: int,
 	spray_radius: float
-) -> void:
-	if spray > 0:
-		for i in range(spray):
-			var offset := random_offset(spray_radius)
-			var jitter_offset := random_offset(jitter)
-			apply_brush(target, brush, pos + offset + jitter_offset, color, opacity, mode)
-		return
-	var jitter_offset2 := random_offset(jitter)
-	apply_brush(target, brush, pos + jitter_offset2, color, opacity, mode)
+) -> Rect2i:
+	var ctx := begin_stroke(target, prepare_brush(brush, color, opacity, mode))
+	stamp_with_variation(ctx, pos, jitter, spray, spray_radius)
+	return ctx["dirty"]
 
 
 static func random_offset(radius: float) -> Vector2i:
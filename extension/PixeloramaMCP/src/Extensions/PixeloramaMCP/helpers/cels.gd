@@ -0,0 +1,125 @@
+class_name CelUtils
+
+# Linked-cel deduplication: identical pixel cels of a layer are put in one
+# link set and share a single Image, so repeated poses and blank frames
+# keep only one copy of their pixels in memory.
+
+
+static func image_digest(image: Image) -> String:
+	var ctx := HashingContext.new()
+	ctx.start(HashingContext.HASH_MD5)
+	ctx.update(image.get_data())
+	return "%dx%d:%s" % [image.get_width(), image.get_height(), ctx.finish().hex_encode()]
+
+
+static func is_dedupable(cel: BaseCel) -> bool:
+	# Tilemap cels carry cell data besides their image
+	return cel is PixelCel and not cel is CelTileMap
+
+
+static func compact_layer(
+	project: Project, layer_index: int, frames: Array, include_empty: bool, dry_run: bool
+) -> Dictionary:
+	# Group the layer's cels by content; fully transparent cels form one
+	# group regardless of the color channels of their transparent pixels.
+	var groups := {}  # key -> Array of frame indices
+	var order: Array = []
+	for f in frames:
+		var cel: BaseCel = project.frames[f].cels[layer_index]
+		if not is_dedupable(cel):
+			continue
+		var image: Image = cel.image
+		var key := ""
+		if image.is_invisible():
+			if not include_empty:
+				continue
+			key = "empty"
+		else:
+			key = image_digest(image)
+		if not groups.has(key):
+			groups[key] = []
+			order.append(key)
+		groups[key].append(f)
+
+	var linked := 0
+	var emptied := 0
+	var reclaimed := 0
+	var sets := 0
+	for key in order:
+		var group: Array = groups[key]
+		if group.size() < 2:
+			continue
+		var cels: Array = []
+		var images := {}  # distinct Image instances in the group
+		for f in group:
+			var cel: PixelCel = project.frames[f].cels[layer_index]
+			cels.append(cel)
+			images[cel.image.get_instance_id()] = cel.image
+		if images.size() < 2:
+			continue  # already sharing one image
+		var image: Image = cels[0].image
+		# Pixelorama cel images are RGBA8
+		reclaimed += (images.size() - 1) * image.get_width() * image.get_height() * 4
+		sets += 1
+		for cel in cels:
+			if cel.image != image:
+				linked += 1
+				if key == "empty":
+					emptied += 1
+		if not dry_run:
+			link_cels(project.layers[layer_index], cels, key == "empty")
+	return {"linked": linked, "emptied": emptied, "link_sets": sets, "bytes_reclaimed": reclaimed}
+
+
+static func link_cels(layer: BaseLayer, cels: Array, clear := false) -> int:
+	# The first cel's image becomes the shared content of the link set.
+	var first: PixelCel = cels[0]
+	if clear:
+		first.image.fill(Color(0, 0, 0, 0))
+		first.update_texture()
+	if first.link_set == null:
+		layer.link_cel(first, {})
+	var count := 0
+	for i in range(1, cels.size()):
+		var cel: PixelCel = cels[i]
+		if cel.link_set == first.link_set and cel.image == first.image:
+			continue
+		layer.link_cel(cel, first.link_set)
+		cel.set_content(first.get_content(), first.image_texture)
+		count += 1
+	return count
+
+
+static func frame_digest(project: Project, frame_index: int) -> String:
+	# Everything blend_layers reads: cel pixels, opacity and z-index, layer
+	# visibility, opacity, blend mode, clipping mask, parent group and
+	# effects, and the canvas size.
+	# Returns "" for frames whose content cannot be hashed.
+	var ctx := HashingContext.new()
+	ctx.start(HashingContext.HASH_MD5)
+	ctx.update(("%dx%d" % [project.size.x, project.size.y]).to_utf8_buffer())
+	var frame: Frame = project.frames[frame_index]
+	for l in project.layers.size():
+		var layer: BaseLayer = project.layers[l]
+		var cel: BaseCel = frame.cels[l]
+		var parent := project.layers.find(layer.parent) if is_instance_valid(layer.parent) else -1
+		var props := "|%d:%s:%s:%s:%s:%d:%s:%s" % [
+			l,
+			layer.is_visible_in_hierarchy(),
+			layer.opacity,
+			layer.blend_mode,
+			layer.clipping_mask,
+			parent,
+			cel.opacity,
+			cel.z_index,
+		]
+		for effect in layer.effects:
+			props += ":%s:%s:%s" % [effect.name, effect.enabled, effect.params]
+		ctx.update(props.to_utf8_buffer())
+		if not layer.is_visible_in_hierarchy():
+			continue
+		if cel is PixelCel:
+			ctx.update(cel.image.get_data())
+		elif cel is Cel3D:
+			return ""  # 3D content is not hashable; never cached
+	return ctx.finish().hex_encode()
@@ -1,5 +1,7 @@
 class_name Drawing
 
+const Rasterizer = preload("rasterizer.gd")
+
 
 static func blend_mode_color(src: Color, dst: Color, mode: String) -> Color:
 	match mode:
@@ -107,9 +109,7 @@ static func color_close(a: Color, b: Color, tolerance: float) -> bool:
 
 static func draw_points(image: Image, points: Array, color: Color, thickness := 1) -> void:
 	var radius := maxi(0, int(thickness / 2))
-	for p in points:
-		if typeof(p) == TYPE_VECTOR2I:
-			draw_point(image, p, color, radius)
+	Rasterizer.fill_points(image, points, color, radius)
 
 
 static func draw_line_on_image(
@@ -120,14 +120,8 @@ static func draw_line_on_image(
 
 
 static func draw_point(image: Image, p: Vector2i, color: Color, radius := 0) -> void:
-	var w := image.get_width()
-	var h := image.get_height()
-	for dy in range(-radius, radius + 1):
-		for dx in range(-radius, radius + 1):
-			var x := p.x + dx
-			var y := p.y + dy
-			if x >= 0 and y >= 0 and x < w and y < h:
-				image.set_pixel(x, y, color)
+	var side := radius * 2 + 1
+	image.fill_rect(Rect2i(p.x - radius, p.y - radius, side, side), color)
 
 
 static func pick_weighted_index(indices: Array, weights: Array) -> int:
@@ -0,0 +1,65 @@
+class_name Listing
+
+# Paging and field projection for the *.list methods. Handlers pass one
+# getter per field; rows() calls only the getters of the requested fields,
+# and only for the requested page. shape() then optionally turns the rows
+# into columns ({field: [values...]}), which repeats no keys and is much
+# smaller for long lists.
+
+
+static func page(params: Dictionary, total: int) -> Vector2i:
+	# [from, to) item range for offset/limit; no limit (or 0) means the rest
+	var offset := clampi(int(params.get("offset", 0)), 0, total)
+	var limit := int(params.get("limit", 0))
+	var end := total if limit <= 0 else mini(total, offset + limit)
+	return Vector2i(offset, end)
+
+
+static func fields(params: Dictionary, getters: Dictionary) -> Array:
+	# Requested field names in request order; unknown names are ignored and
+	# no (or an empty) list means every field
+	var requested = params.get("fields", [])
+	if typeof(requested) != TYPE_ARRAY or requested.is_empty():
+		return getters.keys()
+	var names := []
+	for field in requested:
+		if getters.has(field) and not names.has(field):
+			names.append(field)
+	return names
+
+
+static func rows(params: Dictionary, span: Vector2i, getters: Dictionary) -> Array:
+	# getters: field -> Callable(index) -> Variant
+	var names := fields(params, getters)
+	var items := []
+	for i in range(span.x, span.y):
+		var row := {}
+		for name in names:
+			row[name] = getters[name].call(i)
+		items.append(row)
+	return items
+
+
+static func shape(
+	result: Dictionary, key: String, items: Array, params: Dictionary, span: Vector2i, total: int
+) -> Dictionary:
+	if str(params.get("format", "rows")) == "columns":
+		var names: Array = []
+		if not items.is_empty():
+			names = items[0].keys()
+		elif typeof(params.get("fields")) == TYPE_ARRAY:
+			names = params["fields"]
+		var columns := {}
+		for name in names:
+			var column := []
+			column.resize(items.size())
+			for i in items.size():
+				column[i] = items[i].get(name)
+			columns[name] = column
+		result[key] = columns
+	else:
+		result[key] = items
+	result["total"] = total
+	if span.y < total:
+		result["next_offset"] = span.y
+	return result
@@ -0,0 +1,149 @@
+class_name MemoryStats
+
+# Estimates of what a project keeps in memory. Sizes are of the image data
+# only; an Image shared by linked cels is counted once, at its first cel.
+
+const CelUtils = preload("cels.gd")
+
+
+static func image_bytes(image: Image) -> int:
+	if image == null or image.is_empty():
+		return 0
+	if image.get_format() == Image.FORMAT_RGBA8 and not image.has_mipmaps():
+		return image.get_width() * image.get_height() * 4
+	return image.get_data().size()
+
+
+static func project_stats(project: Project, with_hash: bool) -> Dictionary:
+	var seen := {}  # Image instance id -> true
+	var digests := {}  # "layer:digest" -> [frame, layer]
+	var cels := []
+	var layers := []
+	var frame_bytes := PackedInt64Array()
+	frame_bytes.resize(project.frames.size())
+	var totals := {
+		"cel_bytes": 0,
+		"texture_bytes": 0,
+		"cels": 0,
+		"empty_cels": 0,
+		"linked_cels": 0,
+		"duplicate_cels": 0,
+		"reclaimable_bytes": 0,
+	}
+	var effects := 0
+	var shaders := {}
+	for l in project.layers.size():
+		var layer: BaseLayer = project.layers[l]
+		var layer_stats := {
+			"index": l,
+			"name": layer.name,
+			"bytes": 0,
+			"cels": 0,
+			"empty": 0,
+			"duplicates": 0,
+			"effects": layer.effects.size(),
+		}
+		effects += layer.effects.size()
+		for effect in layer.effects:
+			if is_instance_valid(effect.shader):
+				shaders[effect.shader.resource_path] = true
+		for f in project.frames.size():
+			var cel: BaseCel = project.frames[f].cels[l]
+			var item := {"frame": f, "layer": l, "bytes": 0}
+			if cel.link_set != null:
+				item["linked"] = true
+				totals["linked_cels"] += 1
+			if cel is PixelCel:
+				var image: Image = cel.image
+				var id := image.get_instance_id()
+				if seen.has(id):
+					item["shared"] = true
+				else:
+					seen[id] = true
+					var size := image_bytes(image)
+					item["bytes"] = size
+					# The canvas keeps a GPU texture of the same size per image
+					totals["texture_bytes"] += size
+					if image.is_invisible():
+						item["empty"] = true
+						layer_stats["empty"] += 1
+						totals["empty_cels"] += 1
+					elif with_hash and CelUtils.is_dedupable(cel):
+						var key := "%d:%s" % [l, CelUtils.image_digest(image)]
+						if digests.has(key):
+							item["duplicate_of"] = digests[key]
+							layer_stats["duplicates"] += 1
+							totals["duplicate_cels"] += 1
+						else:
+							digests[key] = [f, l]
+				if cel is CelTileMap:
+					item["type"] = "tilemap"
+				else:
+					item["type"] = "pixel"
+			elif cel is Cel3D:
+				item["type"] = "3d"
+			else:
+				item["type"] = "group"
+			if item.get("duplicate_of") != null:
+				totals["reclaimable_bytes"] += item["bytes"]
+			layer_stats["bytes"] += item["bytes"]
+			layer_stats["cels"] += 1
+			frame_bytes[f] += item["bytes"]
+			totals["cel_bytes"] += item["bytes"]
+			totals["cels"] += 1
+			cels.append(item)
+		layers.append(layer_stats)
+		# All empty cels of a layer can share one image
+		if layer_stats["empty"] > 1:
+			totals["reclaimable_bytes"] += (layer_stats["empty"] - 1) * project.size.x * project.size.y * 4
+
+	var frames := []
+	for f in frame_bytes.size():
+		frames.append({"index": f, "bytes": frame_bytes[f]})
+	return {
+		"name": project.name,
+		"size": [project.size.x, project.size.y],
+		"totals": totals,
+		"layers": layers,
+		"frames": frames,
+		"cels": cels,
+		"effects": {"count": effects, "shaders": shaders.size()},
+		"undo": {
+			"history_count": project.undo_redo.get_history_count(),
+			"version": project.undo_redo.get_version(),
+		},
+		"brushes": brushes_stats(project),
+		"tilesets": tilesets_stats(project),
+		"export_cache": export_cache_stats(),
+	}
+
+
+static func brushes_stats(project: Project) -> Dictionary:
+	var size := 0
+	for brush in project.brushes:
+		size += image_bytes(brush)
+	return {"count": project.brushes.size(), "bytes": size}
+
+
+static func tilesets_stats(project: Project) -> Array:
+	var items := []
+	for i in project.tilesets.size():
+		var tileset: TileSetCustom = project.tilesets[i]
+		var size := 0
+		for tile in tileset.tiles:
+			size += image_bytes(tile.image)
+		items.append({"index": i, "name": tileset.name, "tiles": tileset.tiles.size(), "bytes": size})
+	return items
+
+
+static func export_cache_stats() -> Dictionary:
+	# Blended frames and processed images kept by the export dialog
+	var count := 0
+	var size := 0
+	for image in Export.blended_frames.values():
+		count += 1
+		size += image_bytes(image)
+	for processed in Export.processed_images:
+		count += 1
+		size += image_bytes(processed.image)
+	return {"images": count, "bytes": size}
@@ -0,0 +1,159 @@
+class_name Rasterizer
+
+# Span-based rasterization: shapes are reduced to horizontal spans per row,
+# overlapping spans are merged, and identical spans on consecutive rows are
+# coalesced into rectangles, so every pixel is written once with fill_rect.
+
+
+static func fill_points(image: Image, points: Array, color: Color, radius := 0) -> void:
+	fill_spans(image, point_spans(points, radius), color)
+
+
+static func point_spans(points: Array, radius := 0) -> Dictionary:
+	# Consecutive points on a row form one run; each run is then widened by
+	# the radius and repeated on the rows the square pen covers.
+	var xs_by_row := {}
+	for p in points:
+		if typeof(p) != TYPE_VECTOR2I:
+			continue
+		if not xs_by_row.has(p.y):
+			xs_by_row[p.y] = []
+		xs_by_row[p.y].append(p.x)
+	var spans := {}
+	for row in xs_by_row.keys():
+		var xs: Array = xs_by_row[row]
+		xs.sort()
+		var start: int = xs[0]
+		var end: int = xs[0]
+		for i in range(1, xs.size() + 1):
+			if i < xs.size() and xs[i] <= end + 1:
+				end = maxi(end, xs[i])
+				continue
+			for dy in range(-radius, radius + 1):
+				add_span(spans, row + dy, start - radius, end + radius)
+			if i < xs.size():
+				start = xs[i]
+				end = xs[i]
+	return spans
+
+
+static func add_span(spans: Dictionary, row: int, x0: int, x1: int) -> void:
+	if not spans.has(row):
+		spans[row] = []
+	spans[row].append(Vector2i(x0, x1))
+
+
+static func merge_row(row_spans: Array) -> Array:
+	# Sorts and merges overlapping or touching [x0, x1] spans.
+	row_spans.sort_custom(func(a: Vector2i, b: Vector2i) -> bool: return a.x < b.x)
+	var merged: Array = []
+	for s in row_spans:
+		if not merged.is_empty() and s.x <= merged[-1].y + 1:
+			merged[-1] = Vector2i(merged[-1].x, maxi(merged[-1].y, s.y))
+		else:
+			merged.append(s)
+	return merged
+
+
+static func fill_spans(image: Image, spans: Dictionary, color: Color) -> void:
+	var w := image.get_width()
+	var h := image.get_height()
+	var rows := spans.keys()
+	rows.sort()
+	# span -> top row of the rectangle it is currently extending
+	var open := {}
+	var prev_row := -2
+	for row in rows:
+		if row < 0 or row >= h:
+			continue
+		var current := {}
+		for s in merge_row(spans[row]):
+			var x0 := maxi(0, s.x)
+			var x1 := mini(w - 1, s.y)
+			if x0 > x1:
+				continue
+			var key := Vector2i(x0, x1)
+			current[key] = open[key] if open.has(key) and prev_row == row - 1 else row
+		for key in open.keys():
+			if not current.has(key) or current[key] != open[key]:
+				_fill_band(image, key, open[key], prev_row, color)
+		open = current
+		prev_row = row
+	for key in open.keys():
+		_fill_band(image, key, open[key], prev_row, color)
+
+
+static func _fill_band(image: Image, span: Vector2i, top: int, bottom: int, color: Color) -> void:
+	image.fill_rect(Rect2i(span.x, top, span.y - span.x + 1, bottom - top + 1), color)
+
+
+static func stroke_rect(image: Image, rect: Rect2i, color: Color, thickness := 1) -> void:
+	# Four non-overlapping bands; fill_rect clips to the image.
+	var t := thickness
+	if t <= 0:
+		return
+	if t * 2 >= rect.size.x or t * 2 >= rect.size.y:
+		image.fill_rect(rect, color)
+		return
+	var inner_h := rect.size.y - t * 2
+	image.fill_rect(Rect2i(rect.position.x, rect.position.y, rect.size.x, t), color)
+	image.fill_rect(Rect2i(rect.position.x, rect.end.y - t, rect.size.x, t), color)
+	image.fill_rect(Rect2i(rect.position.x, rect.position.y + t, t, inner_h), color)
+	image.fill_rect(Rect2i(rect.end.x - t, rect.position.y + t, t, inner_h), color)
+
+
+static func fill_gradient(
+	image: Image, rect: Rect2i, from_color: Color, to_color: Color, direction: String
+) -> void:
+	var area := rect.intersection(Rect2i(Vector2i.ZERO, image.get_size()))
+	if not area.has_area():
+		return
+	var dx := 1.0 / float(maxi(1, rect.size.x - 1))
+	var dy := 1.0 / float(maxi(1, rect.size.y - 1))
+	var x0 := area.position.x - rect.position.x
+	var y0 := area.position.y - rect.position.y
+	if direction == "vertical":
+		for run in ramp_runs(from_color, to_color, y0 * dy, dy, area.size.y):
+			image.fill_rect(
+				Rect2i(area.position.x, area.position.y + run[0], area.size.x, run[1]), run[2]
+			)
+	elif direction == "diagonal":
+		for i in area.size.y:
+			var t0 := ((y0 + i) * dy + x0 * dx) * 0.5
+			for run in ramp_runs(from_color, to_color, t0, dx * 0.5, area.size.x):
+				image.fill_rect(Rect2i(area.position.x + run[0], area.position.y + i, run[1], 1), run[2])
+	else:
+		for run in ramp_runs(from_color, to_color, x0 * dx, dx, area.size.x):
+			image.fill_rect(
+				Rect2i(area.position.x + run[0], area.position.y, run[1], area.size.y), run[2]
+			)
+
+
+static func ramp_runs(from_color: Color, to_color: Color, t0: float, dt: float, count: int) -> Array:
+	# Splits a linear ramp of `count` samples into [start, length, color] runs
+	# of equal 8-bit color. Every channel is monotonic in t, so equal colors at
+	# both ends of a range mean the whole range is equal, and the end of each
+	# run can be found by galloping + binary search instead of per sample.
+	var runs: Array = []
+	var start := 0
+	while start < count:
+		var color := from_color.lerp(to_color, t0 + start * dt)
+		var key := color.to_rgba32()
+		var lo := start
+		var step := 1
+		var hi := start + step
+		while hi < count and from_color.lerp(to_color, t0 + hi * dt).to_rgba32() == key:
+			lo = hi
+			step *= 2
+			hi = start + step
+		hi = mini(hi, count)
+		# lo has the key; hi is either past the end or a different color
+		while hi - lo > 1:
+			var mid := (lo + hi) / 2
+			if from_color.lerp(to_color, t0 + mid * dt).to_rgba32() == key:
+				lo = mid
+			else:
+				hi = mid
+		runs.append([start, lo - start + 1, color])
+		start = lo + 1
+	return runs
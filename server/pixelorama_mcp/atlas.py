@@ -0,0 +1,246 @@
+import binascii
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .image_utils import report_progress
+from .tiling import PIPELINE_WINDOW
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None  # Pillow optional; handle_export_atlas will fail gracefully
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # NumPy optional; handle_export_atlas will fail gracefully
+
+Rect = Tuple[int, int, int, int]
+
+
+def handle_export_atlas(args: Dict[str, Any], bridge, progress: Optional[Callable] = None) -> Dict[str, Any]:
+    """Export frames as a packed texture atlas (PNG) plus JSON metadata.
+
+    Blended frames are fetched as pipelined frame.snapshot calls, trimmed to
+    their opaque bounds, deduplicated by content and packed with a skyline
+    packer. The JSON uses the Aseprite "array" layout (frame rects, trim
+    offsets, durations, frame tags), which most game engines can import.
+    """
+    if Image is None:
+        raise RuntimeError("Pillow is required: pip install Pillow")
+    if np is None:
+        raise RuntimeError("NumPy is required: pip install numpy")
+    path = args.get("path")
+    if not path:
+        raise RuntimeError("path is required")
+    json_path = args.get("json_path") or os.path.splitext(path)[0] + ".json"
+    trim = bool(args.get("trim", True))
+    dedupe = bool(args.get("dedupe", True))
+    padding = max(0, int(args.get("padding", 1)))
+    scale = max(1, int(args.get("scale", 1)))
+
+    info = bridge.call("project.info", {})
+    fps = float(bridge.call("animation.fps.get", {}).get("fps") or 10)
+    all_frames = bridge.call("frame.list", {}).get("frames", [])
+    indices = [int(i) for i in args.get("frames") or [f["index"] for f in all_frames]]
+    if not indices:
+        raise RuntimeError("no frames to export")
+    durations = {f["index"]: f.get("duration", 1.0) for f in all_frames}
+    src_w, src_h = info["size"]
+
+    sprites: List[Dict[str, Any]] = []  # per exported frame
+    images: List["np.ndarray"] = []  # unique trimmed images
+    seen: Dict[bytes, int] = {}
+    for n, pixels in enumerate(snapshot_frames(bridge, indices)):
+        box = trim_box(pixels) if trim else (0, 0, src_w, src_h)
+        x0, y0, x1, y1 = box
+        sprite = pixels[y0:y1, x0:x1]
+        if scale > 1:
+            sprite = sprite.repeat(scale, axis=0).repeat(scale, axis=1)
+        key = _content_key(sprite) if dedupe else n
+        if key not in seen:
+            seen[key] = len(images)
+            images.append(sprite)
+        sprites.append({"frame": indices[n], "image": seen[key], "box": box})
+        report_progress(progress, n + 1, len(indices), "fetch")
+
+    sizes = [(img.shape[1] + padding, img.shape[0] + padding) for img in images]
+    width, height, positions = pack_skyline(sizes, int(args.get("max_width", 0)), bool(args.get("power_of_two", False)))
+    sheet = np.zeros((height, width, 4), dtype=np.uint8)
+    for img, (x, y) in zip(images, positions):
+        sheet[y : y + img.shape[0], x : x + img.shape[1]] = img
+    Image.fromarray(sheet, "RGBA").save(path, format="PNG")
+
+    name = args.get("name") or info.get("name") or "sprite"
+    meta_frames = []
+    for sprite in sprites:
+        img = images[sprite["image"]]
+        x, y = positions[sprite["image"]]
+        x0, y0, _, _ = sprite["box"]
+        w, h = img.shape[1], img.shape[0]
+        meta_frames.append(
+            {
+                "filename": f"{name} {sprite['frame']}",
+                "frame": {"x": x, "y": y, "w": w, "h": h},
+                "rotated": False,
+                "trimmed": (w, h) != (src_w * scale, src_h * scale),
+                "spriteSourceSize": {"x": x0 * scale, "y": y0 * scale, "w": w, "h": h},
+                "sourceSize": {"w": src_w * scale, "h": src_h * scale},
+                "duration": max(10, int(round(durations.get(sprite["frame"], 1.0) / fps * 1000))),
+            }
+        )
+    atlas = {
+        "frames": meta_frames,
+        "meta": {
+            "app": "pixelorama-mcp",
+            "image": os.path.basename(path),
+            "format": "RGBA8888",
+            "size": {"w": width, "h": height},
+            "scale": str(scale),
+            "frameTags": _frame_tags(bridge, indices),
+        },
+    }
+    with open(json_path, "w", encoding="utf-8") as fh:
+        json.dump(atlas, fh, indent=1)
+
+    return {
+        "path": path,
+        "json_path": json_path,
+        "width": width,
+        "height": height,
+        "frames": len(sprites),
+        "unique": len(images),
+    }
+
+
+def snapshot_frames(bridge, indices: List[int]) -> Iterator["np.ndarray"]:
+    """Yield blended (h, w, 4) frames, fetched as pipelined frame.snapshot calls."""
+    calls = (("frame.snapshot", {"frame": i, "format": "raw"}) for i in indices)
+    for snap in bridge.call_stream(calls, PIPELINE_WINDOW):
+        pixels = np.frombuffer(binascii.a2b_base64(snap["data"]), dtype=np.uint8)
+        yield pixels.reshape(snap["height"], snap["width"], 4)
+
+
+def trim_box(pixels: "np.ndarray") -> Rect:
+    """Bounds (x0, y0, x1, y1) of the non-transparent pixels.
+
+    A fully transparent frame keeps a single pixel, so it still has a rect.
+    """
+    alpha = pixels[..., 3]
+    rows = np.flatnonzero(alpha.any(axis=1))
+    if len(rows) == 0:
+        return 0, 0, 1, 1
+    cols = np.flatnonzero(alpha.any(axis=0))
+    return int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1
+
+
+def _content_key(img: "np.ndarray") -> bytes:
+    digest = hashlib.blake2b(np.ascontiguousarray(img).tobytes(), digest_size=16)
+    digest.update(repr(img.shape).encode())
+    return digest.digest()
+
+
+def pack_skyline(
+    sizes: List[Tuple[int, int]], max_width: int = 0, power_of_two: bool = False
+) -> Tuple[int, int, List[Tuple[int, int]]]:
+    """Pack rectangles; returns (sheet width, sheet height, positions).
+
+    With max_width the sheet has that width. Otherwise a few widths around
+    the square root of the total area are tried and the smallest sheet wins.
+    """
+    if not sizes:
+        return 1, 1, []
+    widest = max(w for w, _ in sizes)
+    if max_width > 0:
+        candidates = [max(max_width, widest)]
+    else:
+        side = int(sum(w * h for w, h in sizes) ** 0.5)
+        candidates = sorted({max(widest, int(side * f)) for f in (0.8, 1.0, 1.2, 1.5, 2.0)})
+    best = None
+    for bin_w in candidates:
+        positions = _skyline(sizes, bin_w)
+        width = max(x + w for (x, _), (w, _) in zip(positions, sizes))
+        height = max(y + h for (_, y), (_, h) in zip(positions, sizes))
+        if power_of_two:
+            width, height = _next_pow2(width), _next_pow2(height)
+        key = (width * height, max(width, height))
+        if best is None or key < best[0]:
+            best = (key, width, height, positions)
+    return best[1], best[2], best[3]
+
+
+def _skyline(sizes: List[Tuple[int, int]], bin_w: int) -> List[Tuple[int, int]]:
+    # Bottom-left skyline: the skyline is a list of [x, y, width] segments;
+    # each rect goes where its top edge ends lowest (then leftmost).
+    # Rects are placed tallest first.
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0]))
+    skyline = [[0, 0, bin_w]]
+    positions: List[Tuple[int, int]] = [(0, 0)] * len(sizes)
+    for i in order:
+        w, h = sizes[i]
+        best = None
+        for s in range(len(skyline)):
+            y = _fit(skyline, s, w, bin_w)
+            if y is not None and (best is None or (y + h, skyline[s][0]) < best[0]):
+                best = ((y + h, skyline[s][0]), s, y)
+        _, s, y = best
+        x = skyline[s][0]
+        positions[i] = (x, y)
+        _add_segment(skyline, s, x, y + h, w)
+    return positions
+
+
+def _fit(skyline: List[List[int]], s: int, w: int, bin_w: int) -> Optional[int]:
+    """Lowest y for a rect of width w whose left edge is segment s's x."""
+    x = skyline[s][0]
+    if x + w > bin_w:
+        return None
+    y = 0
+    remaining = w
+    while remaining > 0:
+        y = max(y, skyline[s][1])
+        remaining -= skyline[s][2]
+        s += 1
+    return y
+
+
+def _add_segment(skyline: List[List[int]], s: int, x: int, y: int, w: int) -> None:
+    skyline.insert(s, [x, y, w])
+    end = x + w
+    # Shrink or drop the segments now covered by the new one
+    i = s + 1
+    while i < len(skyline) and skyline[i][0] < end:
+        seg = skyline[i]
+        overlap = end - seg[0]
+        if overlap >= seg[2]:
+            del skyline[i]
+            continue
+        seg[0] += overlap
+        seg[2] -= overlap
+        break
+    # Merge neighbours of equal height
+    i = 0
+    while i < len(skyline) - 1:
+        if skyline[i][1] == skyline[i + 1][1]:
+            skyline[i][2] += skyline[i + 1][2]
+            del skyline[i + 1]
+        else:
+            i += 1
+
+
+def _next_pow2(n: int) -> int:
+    return 1 << max(0, (n - 1).bit_length())
+
+
+def _frame_tags(bridge, indices: List[int]) -> List[Dict[str, Any]]:
+    # Pixelorama tags are 1-indexed inclusive; Aseprite's are 0-indexed
+    # positions in the exported frame list.
+    position = {frame: i for i, frame in enumerate(indices)}
+    tags = []
+    for tag in bridge.call("animation.tags.list", {}).get("tags", []):
+        inside = [position[f] for f in range(tag["from"] - 1, tag["to"]) if f in position]
+        if inside:
+            tags.append({"name": tag["name"], "from": min(inside), "to": max(inside), "direction": "forward"})
+    return tags
@@ -1,13 +1,59 @@
 #!/usr/bin/env python3
 import json
 import os
+import select
 import socket
 import sys
+import threading
+import time
 import uuid
 
+from .metadata_cache import CACHED_METHODS
+from .metrics import get_metrics
+from .tracing import BRIDGE_TID, get_tracer
+
 DEFAULT_HOST = os.environ.get("PIXELORAMA_BRIDGE_HOST", "127.0.0.1")
 DEFAULT_PORT = int(os.environ.get("PIXELORAMA_BRIDGE_PORT", "8123"))
 DEFAULT_TOKEN = os.environ.get("PIXELORAMA_BRIDGE_TOKEN", "")
+# Per-port connect timeout while searching for the bridge; a local bridge
+# accepts within milliseconds, so this only bounds firewalled/filtered ports.
+CONNECT_TIMEOUT = float(os.environ.get("PIXELORAMA_CONNECT_TIMEOUT", "0.5"))
+# The bridge falls back to port+1..port+20 when its port is taken
+PORT_FALLBACKS = 20
+# Seconds of idle time before TCP keepalive probes start
+KEEPALIVE_IDLE = 30
+
+
+def _discovery_path() -> str:
+    path = os.environ.get("PIXELORAMA_BRIDGE_DISCOVERY")
+    if path:
+        return path
+    return os.path.join(os.path.expanduser("~"), ".cache", "pixelorama-mcp", "bridge.json")
+
+
+def read_discovery() -> dict | None:
+    """Host/port/pid the running bridge wrote on startup, if any."""
+    try:
+        with open(_discovery_path(), encoding="utf-8") as fh:
+            info = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(info, dict) or not isinstance(info.get("port"), int):
+        return None
+    return info
+
+
+def _configure_socket(sock: socket.socket) -> None:
+    # Requests are small JSON lines; send them without Nagle delay. Keepalive
+    # stops NAT/firewalls from silently dropping an idle connection.
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    for name, value in (("TCP_KEEPIDLE", KEEPALIVE_IDLE), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3)):
+        if hasattr(socket, name):
+            try:
+                sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, name), value)
+            except OSError:
+                pass
 
 
 def _parse_ports(default_port: int) -> list[int]:
@@ -30,7 +76,7 @@ def _parse_ports(default_port: int) -> list[int]:
             return list(range(start, end + 1))
     if "PIXELORAMA_BRIDGE_PORT" in os.environ:
         return [default_port]
-    return list(range(default_port, default_port + 11))
+    return list(range(default_port, default_port + PORT_FALLBACKS + 1))
 
 
 class BridgeClient:
@@ -42,6 +88,7 @@ class BridgeClient:
         ports=None,
         token=DEFAULT_TOKEN,
         expected_protocol: str | None = None,
+        metadata=None,
     ):
         self.host = host
         self.timeout = timeout
@@ -50,22 +97,95 @@ class BridgeClient:
         self.token = token
         self.expected_protocol = expected_protocol
         self._protocol_checked = False
+        # Optional MetadataCache for idempotent reads (project.info, *.list)
+        self.metadata = metadata
+        self._has_revision = True  # bridge.revision exists (older bridges lack it)
+        self._last_revision = None  # "revision" of the last call's response
+        self.metrics = get_metrics()
+        self.tracer = get_tracer()
+        self._connections = 0
+        self._inflight = {}  # request id -> (method, send time)
         self._sock = None
+        self._rbuf = bytearray()
 
     def connect(self):
         if self._sock is not None:
-            return
-        last_err = None
-        for port in self.ports:
-            try:
-                self._sock = socket.create_connection((self.host, port), timeout=self.timeout)
-                self.port = port
+            if not self._peer_closed():
                 return
+            # Pixelorama was restarted or dropped us while idle
+            self.close()
+        # Last known port first, then the discovery file, then a parallel
+        # probe of every candidate port.
+        port = self.port
+        sock = self._try_connect(port)
+        if sock is None:
+            info = read_discovery()
+            if info and info["port"] in self.ports and info["port"] != port:
+                port = info["port"]
+                sock = self._try_connect(port)
+        if sock is None:
+            sock, port = self._probe_ports()
+        sock.settimeout(self.timeout)
+        _configure_socket(sock)
+        self._sock = sock
+        self.port = port
+        self._connections += 1
+        self.metrics.inc("events", "connects")
+        if self._connections > 1:
+            self.metrics.inc("events", "reconnects")
+
+    def warm_up(self):
+        """Connect and verify the protocol ahead of the first call."""
+        try:
+            self.connect()
+            self._check_protocol()
+        except (OSError, ConnectionError):
+            self.close()
+            raise
+
+    def _try_connect(self, port):
+        try:
+            return socket.create_connection((self.host, port), timeout=CONNECT_TIMEOUT)
+        except OSError:
+            return None
+
+    def _probe_ports(self):
+        """Connect to all candidate ports at once; the first port in list order wins."""
+        socks = [None] * len(self.ports)
+        errors = []
+
+        def probe(i, port):
+            try:
+                socks[i] = socket.create_connection((self.host, port), timeout=CONNECT_TIMEOUT)
             except OSError as exc:
-                last_err = exc
-                self._sock = None
-        if last_err:
-            raise last_err
+                errors.append(exc)
+
+        threads = [threading.Thread(target=probe, args=(i, p), daemon=True) for i, p in enumerate(self.ports)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        winner = None
+        for i, sock in enumerate(socks):
+            if sock is None:
+                continue
+            if winner is None:
+                winner = i
+            else:
+                sock.close()
+        if winner is None:
+            if errors:
+                raise errors[0]
+            raise ConnectionError("no bridge ports to probe")
+        return socks[winner], self.ports[winner]
+
+    def _peer_closed(self):
+        # A readable socket with nothing to read has been closed by the peer
+        try:
+            readable, _, _ = select.select([self._sock], [], [], 0)
+            return bool(readable) and not self._sock.recv(1, socket.MSG_PEEK)
+        except (OSError, ValueError):
+            return True
 
     def close(self):
         if self._sock is not None:
@@ -73,62 +193,183 @@ class BridgeClient:
                 self._sock.close()
             finally:
                 self._sock = None
+                self._rbuf = bytearray()
+                self._inflight.clear()
+                # The protocol is verified once per connection
+                self._protocol_checked = False
+                self._has_revision = True
+                if self.metadata is not None:
+                    self.metadata.clear()  # may be a different Pixelorama instance now
 
     def call(self, method, params=None):
         if params is None:
             params = {}
+        cache = self.metadata
+        if cache is not None and cache.enabled:
+            if method in CACHED_METHODS:
+                return cache.get(method, params, self._fetch_with_revision, self._revision)
+            cache.invalidate(method, params)
+        return self._call_uncached(method, params)
+
+    def _revision(self):
+        if not self._has_revision:
+            return None
+        try:
+            return self._call_uncached("bridge.revision", {}).get("revision")
+        except RuntimeError:
+            self._has_revision = False
+            return None
+
+    def _fetch_with_revision(self, method, params):
+        # Newer bridges report their revision with every response, so a
+        # cache miss needs no separate bridge.revision round-trip
+        result = self._call_uncached(method, params)
+        return result, self._last_revision
+
+    def _call_uncached(self, method, params):
         for attempt in range(2):
             try:
-                if (
-                    self.expected_protocol
-                    and not self._protocol_checked
-                    and method not in ("bridge.info", "ping", "version")
-                ):
-                    info = self._call_raw("bridge.info", {})
-                    protocol = info.get("protocol_version") if isinstance(info, dict) else None
-                    if protocol != self.expected_protocol:
-                        raise RuntimeError(
-                            f"protocol_mismatch: expected {self.expected_protocol}, got {protocol}"
-                        )
-                    self._protocol_checked = True
+                if method not in ("bridge.info", "ping", "version"):
+                    self._check_protocol()
                 return self._call_raw(method, params)
             except (OSError, ConnectionError):
                 self.close()
                 if attempt == 0:
+                    self.metrics.inc("events", "retries")
                     continue
                 raise
 
+    def call_stream(self, calls, window=4):
+        """Pipeline ``(method, params)`` calls, yielding results in order.
+
+        Up to ``window`` requests are in flight at once, so the bridge always
+        has the next request queued while the previous response is being
+        read. ``calls`` may be a lazy iterable; only the in-flight requests
+        and the current response are held in memory.
+        """
+        window = max(1, int(window))
+        self.connect()
+        self._check_protocol()
+        calls_iter = iter(calls)
+        pending = []  # request ids in send order
+        results = {}
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < window:
+                    try:
+                        method, params = next(calls_iter)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    if self.metadata is not None:
+                        self.metadata.invalidate(method, params)
+                    pending.append(self._send_request(method, params))
+                if not pending:
+                    return
+                head = pending.pop(0)
+                while head not in results:
+                    payload = self._read_payload()
+                    results[payload.get("id")] = payload
+                yield self._unwrap(results.pop(head))
+        except (OSError, ConnectionError):
+            self.close()
+            raise
+
+    def _check_protocol(self):
+        if not self.expected_protocol or self._protocol_checked:
+            return
+        info = self._call_raw("bridge.info", {})
+        protocol = info.get("protocol_version") if isinstance(info, dict) else None
+        if protocol != self.expected_protocol:
+            raise RuntimeError(
+                f"protocol_mismatch: expected {self.expected_protocol}, got {protocol}"
+            )
+        self._protocol_checked = True
+
     def _call_raw(self, method, params):
         self.connect()
+        req_id = self._send_request(method, params)
+        while True:
+            # Responses left over from an aborted pipeline are skipped.
+            payload = self._read_payload()
+            if payload.get("id") in (req_id, ""):
+                self._last_revision = payload.get("revision")
+                return self._unwrap(payload)
+
+    def _send_request(self, method, params):
+        req_id = str(uuid.uuid4())
         req = {
-            "id": str(uuid.uuid4()),
+            "id": req_id,
             "method": method,
-            "params": params,
+            "params": params if params is not None else {},
         }
         if self.token:
             req["token"] = self.token
         data = json.dumps(req, separators=(",", ":")).encode("utf-8") + b"\n"
         self._sock.sendall(data)
+        self._inflight[req_id] = (method, time.perf_counter())
+        self.metrics.inc("bridge_bytes_out", method, len(data))
+        return req_id
+
+    def _read_payload(self):
         resp = self._recv_line()
         if not resp:
             raise ConnectionError("empty response from bridge")
         payload = json.loads(resp)
+        sent = self._inflight.pop(payload.get("id"), None)
+        if sent is not None:
+            method, started = sent
+            now = time.perf_counter()
+            metrics = self.metrics
+            metrics.observe("bridge", method, now - started)
+            metrics.inc("bridge_bytes_in", method, len(resp) + 1)
+            # Handler time as measured by the bridge (newer bridges only)
+            elapsed_us = payload.get("elapsed_us")
+            if elapsed_us is not None:
+                metrics.observe("bridge_exec", method, elapsed_us / 1e6)
+            if self.tracer.enabled:
+                self._trace_request(method, started, now, len(resp) + 1, payload)
+        return payload
+
+    def _trace_request(self, method, started, now, size, payload):
+        tracer = self.tracer
+        tracer.add(f"bridge {method}", started, now, cat="bridge", args={"bytes_in": size})
+        # The bridge reports durations, not timestamps: its spans are drawn
+        # ending when the response arrived, so they include no transfer time.
+        elapsed = payload.get("elapsed_us")
+        if elapsed is None:
+            return
+        exec_start = now - elapsed / 1e6
+        tracer.add(method, exec_start, now, cat="bridge", tid=BRIDGE_TID)
+        queued = payload.get("queued_us")
+        if queued:
+            tracer.add("queued", exec_start - queued / 1e6, exec_start, cat="bridge", tid=BRIDGE_TID)
+
+    @staticmethod
+    def _unwrap(payload):
         if not payload.get("ok", False):
             err = payload.get("error", {})
             raise RuntimeError(f"bridge error: {err.get('code')} {err.get('message')}")
         return payload.get("result")
 
     def _recv_line(self):
-        buf = b""
+        # Keep bytes past the newline: with pipelining the next response
+        # often arrives in the same chunk.
+        buf = self._rbuf
+        scan_from = 0
         while True:
-            chunk = self._sock.recv(4096)
+            idx = buf.find(b"\n", scan_from)
+            if idx != -1:
+                line = bytes(buf[:idx])
+                del buf[: idx + 1]
+                return line
+            scan_from = len(buf)
+            chunk = self._sock.recv(65536)
             if not chunk:
-                break
+                buf.clear()
+                return b""
             buf += chunk
-            if b"\n" in buf:
-                line, _ = buf.split(b"\n", 1)
-                return line.decode("utf-8", errors="replace")
-        return ""
 
 
 if __name__ == "__main__":
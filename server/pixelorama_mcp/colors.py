@@ -0,0 +1,50 @@
+from typing import Any, Tuple
+
+RGBA = Tuple[int, int, int, int]
+
+
+def _to_byte(value: float, scale_255: bool) -> int:
+    v = float(value) if scale_255 else float(value) * 255.0
+    return max(0, min(255, int(round(v))))
+
+
+def parse_color(value: Any) -> RGBA:
+    """Parse a color like the bridge's Parsers.parse_color does.
+
+    Accepts [r,g,b,a] arrays (0-1 floats or 0-255), {"r","g","b","a"} dicts
+    and hex strings. A missing alpha means opaque. Returns 8-bit RGBA;
+    anything unparseable is transparent.
+    """
+    if isinstance(value, str):
+        return parse_hex(value)
+    if isinstance(value, dict):
+        value = [value.get("r", 0.0), value.get("g", 0.0), value.get("b", 0.0)] + (
+            [value["a"]] if "a" in value else []
+        )
+    if isinstance(value, (list, tuple)):
+        if len(value) == 1 and isinstance(value[0], str):
+            return parse_hex(value[0])
+        comps = [float(c) for c in value[:4]]
+        comps += [0.0] * (3 - len(comps))
+        scale_255 = any(c > 1.0 for c in comps)
+        rgba = [_to_byte(c, scale_255) for c in comps[:4]]
+        if len(rgba) < 4:
+            rgba.append(255)
+        return tuple(rgba)
+    return (0, 0, 0, 0)
+
+
+def parse_hex(text: str) -> RGBA:
+    """Parse #RGB, #RGBA, #RRGGBB or #RRGGBBAA (leading '#' optional)."""
+    h = text.strip().lstrip("#")
+    if len(h) in (3, 4):
+        h = "".join(ch * 2 for ch in h)
+    if len(h) not in (6, 8):
+        return (0, 0, 0, 0)
+    try:
+        parts = [int(h[i : i + 2], 16) for i in range(0, len(h), 2)]
+    except ValueError:
+        return (0, 0, 0, 0)
+    if len(parts) == 3:
+        parts.append(255)
+    return tuple(parts)
@@ -0,0 +1,138 @@
+import functools
+from typing import Any, Optional, Tuple
+
+from .quantize import RGB, PaletteLUT, get_palette_lut
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None  # Pillow optional; only Floyd-Steinberg needs it
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # NumPy optional; quantize_pixels will fail gracefully
+
+ORDERED_MODES = ("bayer2", "bayer4", "bayer8", "blue_noise")
+DITHER_MODES = ("none", "floyd_steinberg") + ORDERED_MODES
+
+
+def parse_dither(value: Any) -> str:
+    """Normalize a dither argument: bool (True = Floyd-Steinberg) or a mode name."""
+    if value is None or value is False:
+        return "none"
+    if value is True:
+        return "floyd_steinberg"
+    mode = str(value).lower().replace("-", "_")
+    if mode in ("fs", "floyd", "floydsteinberg"):
+        mode = "floyd_steinberg"
+    if mode not in DITHER_MODES:
+        raise RuntimeError(f"dither must be a boolean or one of: {', '.join(DITHER_MODES)}")
+    return mode
+
+
+def quantize_pixels(
+    pixels: "np.ndarray",
+    palette: Tuple[RGB, ...],
+    dither: str = "none",
+    strength: float = 1.0,
+    lut: Optional[PaletteLUT] = None,
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Map (h, w, 4) RGBA onto a palette; returns (indices, opaque mask).
+
+    Ordered modes add a position-dependent threshold before the palette
+    lookup. They are whole-array operations and give the same pattern for
+    the same input in every frame, so animations do not flicker. A prebuilt
+    ``lut`` (e.g. one shipped to a worker process) skips the cache lookup.
+    """
+    if np is None:
+        raise RuntimeError("NumPy is required: pip install numpy")
+    if lut is None:
+        lut = get_palette_lut(palette)
+    if dither == "floyd_steinberg":
+        if Image is None:
+            raise RuntimeError("Pillow is required: pip install Pillow")
+        pal_img = Image.new("P", (1, 1))
+        pal_img.putpalette([c for rgb in palette for c in rgb])
+        rgb = Image.fromarray(np.ascontiguousarray(pixels[..., :3]), "RGB")
+        indices = np.asarray(rgb.quantize(palette=pal_img, dither=Image.Dither.FLOYDSTEINBERG))
+        return indices, pixels[..., 3] >= 128
+    if dither in ORDERED_MODES:
+        h, w = pixels.shape[:2]
+        matrix = threshold_matrix(dither)
+        n = matrix.shape[0]
+        offsets = matrix[(np.arange(h) % n)[:, None], (np.arange(w) % n)[None, :]]
+        # Threshold amplitude ~ spacing between palette levels per channel
+        spread = strength * 255.0 / max(1.0, len(palette) ** (1.0 / 3.0) - 1.0)
+        rgb = pixels[..., :3] + (offsets * spread)[..., None]
+        rgb = np.clip(np.round(rgb), 0, 255).astype(np.uint8)
+        return lut.lookup(rgb), pixels[..., 3] >= 128
+    return lut.remap(pixels)
+
+
+@functools.lru_cache(maxsize=None)
+def threshold_matrix(mode: str) -> "np.ndarray":
+    """Square threshold matrix with values in [-0.5, 0.5)."""
+    if mode == "blue_noise":
+        ranks = blue_noise_ranks()
+    else:
+        ranks = bayer_matrix(int(mode[len("bayer"):]))
+    ranks.setflags(write=False)
+    return ((ranks + 0.5) / ranks.size - 0.5).astype(np.float32)
+
+
+def bayer_matrix(n: int) -> "np.ndarray":
+    """Bayer index matrix of size n (a power of two), values 0..n*n-1."""
+    m = np.zeros((1, 1), dtype=np.int32)
+    while m.shape[0] < n:
+        m = np.block([[4 * m, 4 * m + 2], [4 * m + 3, 4 * m + 1]])
+    return m
+
+
+@functools.lru_cache(maxsize=None)
+def blue_noise_ranks(size: int = 64, sigma: float = 1.5, seed: int = 0) -> "np.ndarray":
+    """Blue-noise rank matrix built with the void-and-cluster method.
+
+    Deterministic for a given seed; computed once per process.
+    """
+    d = np.minimum(np.arange(size), size - np.arange(size)).astype(np.float64)
+    kernel = np.exp(-(d[:, None] ** 2 + d[None, :] ** 2) / (2.0 * sigma * sigma))
+
+    def splat(energy, y, x, sign):
+        energy += sign * np.roll(kernel, (y, x), axis=(0, 1))
+
+    # Initial pattern: ~10% random points, relaxed until the tightest
+    # cluster and the largest void coincide.
+    rng = np.random.default_rng(seed)
+    pattern = np.zeros((size, size), dtype=bool)
+    pattern.flat[rng.choice(size * size, size * size // 10, replace=False)] = True
+    energy = np.zeros((size, size))
+    for y, x in zip(*np.nonzero(pattern)):
+        splat(energy, y, x, 1.0)
+    while True:
+        cluster = np.unravel_index(np.argmax(np.where(pattern, energy, -np.inf)), energy.shape)
+        pattern[cluster] = False
+        splat(energy, *cluster, -1.0)
+        void = np.unravel_index(np.argmin(np.where(pattern, np.inf, energy)), energy.shape)
+        pattern[void] = True
+        splat(energy, *void, 1.0)
+        if void == cluster:
+            break
+
+    ranks = np.zeros((size, size), dtype=np.int32)
+    ones = int(pattern.sum())
+    # Rank the initial points by repeatedly removing the tightest cluster
+    work = pattern.copy()
+    work_energy = energy.copy()
+    for rank in range(ones - 1, -1, -1):
+        cluster = np.unravel_index(np.argmax(np.where(work, work_energy, -np.inf)), energy.shape)
+        work[cluster] = False
+        splat(work_energy, *cluster, -1.0)
+        ranks[cluster] = rank
+    # Then fill the remaining cells, largest void first
+    for rank in range(ones, size * size):
+        void = np.unravel_index(np.argmin(np.where(pattern, np.inf, energy)), energy.shape)
+        pattern[void] = True
+        splat(energy, *void, 1.0)
+        ranks[void] = rank
+    return ranks
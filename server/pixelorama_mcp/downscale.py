@@ -0,0 +1,83 @@
+from typing import Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # NumPy optional; block_reduce will fail gracefully
+
+RESAMPLE_METHODS = ("nearest", "mode", "median", "mean")
+
+
+def block_reduce(pixels: "np.ndarray", width: int, height: int, method: str = "mode") -> "np.ndarray":
+    """Downscale an (h, w, 4) uint8 RGBA array with a per-block statistic.
+
+    Every output pixel summarizes one block of source pixels:
+      - mode:   most frequent color (fully transparent pixels count as one color)
+      - median: per-channel median
+      - mean:   alpha-weighted mean color, mean alpha
+    Blocks are formed by reshaping the whole image into an
+    (height, by, width, bx) view, so each statistic is a single vectorized
+    pass over all blocks at once.
+    """
+    if np is None:
+        raise RuntimeError("NumPy is required: pip install numpy")
+    if method not in RESAMPLE_METHODS or method == "nearest":
+        raise RuntimeError(f"unknown block method: {method}")
+    blocks, (by, bx) = _blocks(pixels, width, height)
+    if by * bx == 1:
+        return np.ascontiguousarray(blocks.reshape(height, width, 4))
+    if method == "mode":
+        out = _block_mode(blocks)
+    elif method == "median":
+        out = _block_median(blocks)
+    else:
+        out = _block_mean(blocks)
+    return out.reshape(height, width, 4)
+
+
+def _blocks(pixels: "np.ndarray", width: int, height: int) -> Tuple["np.ndarray", Tuple[int, int]]:
+    """Return (height * width, by * bx, 4) blocks and the block size.
+
+    When the source is not a whole multiple of the target, rows and columns
+    are first resampled (nearest) to height * by x width * bx.
+    """
+    src_h, src_w, _ = pixels.shape
+    by = max(1, src_h // height)
+    bx = max(1, src_w // width)
+    if src_h != height * by:
+        pixels = pixels[(np.arange(height * by) * src_h) // (height * by)]
+    if src_w != width * bx:
+        pixels = pixels[:, (np.arange(width * bx) * src_w) // (width * bx)]
+    view = pixels.reshape(height, by, width, bx, 4).swapaxes(1, 2)
+    return view.reshape(height * width, by * bx, 4), (by, bx)
+
+
+def _block_mode(blocks: "np.ndarray") -> "np.ndarray":
+    # Pack RGBA into uint32, sort each block and find its longest run.
+    packed = np.ascontiguousarray(blocks).view("<u4")[..., 0]
+    packed = np.where(packed >> 24 == 0, 0, packed)  # all transparent pixels are equal
+    packed.sort(axis=1)
+    n = packed.shape[1]
+    pos = np.arange(n)
+    starts = np.ones(packed.shape, dtype=bool)
+    starts[:, 1:] = packed[:, 1:] != packed[:, :-1]
+    run_start = np.maximum.accumulate(np.where(starts, pos, 0), axis=1)
+    # Length of the current run at every position; its argmax ends the longest run
+    best = np.argmax(pos - run_start, axis=1)
+    winner = packed[np.arange(packed.shape[0]), best].astype("<u4")
+    return winner.view(np.uint8).reshape(-1, 4)
+
+
+def _block_median(blocks: "np.ndarray") -> "np.ndarray":
+    return np.round(np.median(blocks, axis=1)).astype(np.uint8)
+
+
+def _block_mean(blocks: "np.ndarray") -> "np.ndarray":
+    # Weighting color by alpha keeps transparent pixels from darkening edges.
+    alpha = blocks[..., 3:4].astype(np.float32)
+    weight = alpha.sum(axis=1)
+    color = (blocks[..., :3] * alpha).sum(axis=1) / np.maximum(weight, 1.0)
+    out = np.empty((blocks.shape[0], 4), dtype=np.uint8)
+    out[:, :3] = np.round(color)
+    out[:, 3] = np.round(weight[:, 0] / blocks.shape[1])
+    return out
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Optional
+
+# Default location is under ~/.cache (not /tmp) so the Flatpak sandbox sees it too
+CACHE_DIR = os.environ.get(
+    "PIXELORAMA_EXPORT_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "pixelorama-mcp", "export-cache"),
+)
+# Size limit in MB; 0 disables the cache
+CACHE_MAX_MB = int(os.environ.get("PIXELORAMA_EXPORT_CACHE_MB", "512"))
+
+
+class ExportCache:
+    """Content-addressed on-disk cache of encoded export artifacts.
+
+    Entries are keyed by the frame content hash plus the export parameters,
+    so unchanged frames are reused across exports. Files are evicted least
+    recently used first once the total size exceeds the limit; a hit
+    refreshes the file's mtime.
+    """
+
+    def __init__(self, root: str = CACHE_DIR, max_bytes: int = CACHE_MAX_MB * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None  # lazily scanned total
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def key(frame_hash: str, kind: str, **params: Any) -> Optional[str]:
+        """Cache key for one artifact; None when the frame is not cacheable."""
+        if not frame_hash:
+            return None
+        blob = json.dumps([frame_hash, kind, params], sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def get(self, key: Optional[str]) -> Optional[bytes]:
+        if key is None or not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fh:
+                data = fh.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def put(self, key: Optional[str], data: bytes) -> None:
+        if key is None or not self.enabled or len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename, so readers never see a partial file
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                # An overwritten entry's old bytes are gone
+                self._size += len(data) - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for dirpath, _, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield st.st_mtime, st.st_size, path
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> None:
+        # Drop the oldest entries until 90% of the limit, leaving headroom
+        # so not every put triggers a scan.
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 9 // 10
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self._size = total
+
+    def clear(self) -> int:
+        """Remove every entry; returns the number of bytes freed."""
+        with self._lock:
+            freed = 0
+            for _, size, path in list(self._entries()):
+                try:
+                    os.remove(path)
+                    freed += size
+                except OSError:
+                    pass
+            self._size = 0
+        return freed
+
+
+_cache: Optional[ExportCache] = None
+
+
+def get_cache() -> ExportCache:
+    global _cache
+    if _cache is None:
+        _cache = ExportCache()
+    return _cache
@@ -1,10 +1,22 @@
+import atexit
 import base64
+import binascii
+import collections
 import io
+import multiprocessing
 import os
 import shutil
 import sys
 import tempfile
-from typing import Any, Callable, Dict, List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .downscale import RESAMPLE_METHODS, block_reduce
+from .dither import ORDERED_MODES, parse_dither, quantize_pixels
+from .export_cache import ExportCache, get_cache
+from .quantize import adaptive_palette, get_palette_lut, resolve_palette
+from .tiling import PIPELINE_WINDOW, region_calls
+from .tracing import get_tracer
 
 def _log(msg: str) -> None:
     print(f"[pixelorama-mcp] {msg}", file=sys.stderr, flush=True)
@@ -14,59 +26,281 @@ try:
 except ImportError:
     Image = None  # Pillow optional; handle_to_pixelart will fail gracefully
 
+try:
+    import numpy as np
+except ImportError:
+    np = None  # NumPy optional; only needed for block resampling
+
+# Upper bound on decoded source pixels (after JPEG draft scaling), so one
+# huge upload cannot blow up the server's memory.
+MAX_DECODE_PIXELS = int(os.environ.get("PIXELORAMA_MAX_DECODE_PIXELS", str(64 * 1024 * 1024)))
+# Worker processes for multi-frame conversion
+FRAME_WORKERS = int(os.environ.get("PIXELORAMA_WORKERS", "0")) or (os.cpu_count() or 1)
+# Animated sources with fewer output pixels (frames x width x height) are
+# quantized inline: starting workers and shipping frames would cost more
+PARALLEL_MIN_PIXELS = int(os.environ.get("PIXELORAMA_PARALLEL_MIN_PIXELS", str(4 * 1024 * 1024)))
+
+_frame_pool: Optional[ProcessPoolExecutor] = None
+
 
-def handle_to_pixelart(args: Dict[str, Any], bridge_call: Callable) -> Dict[str, Any]:
+def get_frame_pool() -> Optional[ProcessPoolExecutor]:
+    """Worker pool shared by all calls, started on first use; None with one worker."""
+    global _frame_pool
+    if FRAME_WORKERS <= 1:
+        return None
+    if _frame_pool is None:
+        _frame_pool = ProcessPoolExecutor(FRAME_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        atexit.register(_frame_pool.shutdown)
+    return _frame_pool
+
+
+def handle_to_pixelart(args: Dict[str, Any], bridge, progress: Optional[Callable] = None) -> Dict[str, Any]:
     """Convert a photo/image to pixel art and import into Pixelorama."""
     if Image is None:
         raise RuntimeError("Pillow is required: pip install Pillow")
 
-    img = load_image(args)
     target_w = args.get("width", 64)
     target_h = args.get("height", 64)
     colors = args.get("colors", 0)
-    dither = args.get("dither", False)
+    dither = parse_dither(args.get("dither", False))
     project_name = args.get("project_name", "pixelart")
     keep_aspect = args.get("keep_aspect", True)
+    resample = str(args.get("resample", "nearest")).lower()
+    if resample not in RESAMPLE_METHODS:
+        raise RuntimeError(f"resample must be one of: {', '.join(RESAMPLE_METHODS)}")
+    if resample != "nearest" and np is None:
+        raise RuntimeError("NumPy is required: pip install numpy")
+
+    # Only decode what the target size needs: JPEG sources are decoded at a
+    # reduced DCT scale, everything else is box-reduced before the final resize.
+    # Block statistics need more than 2x2 samples per output pixel.
+    hint = 2 if resample == "nearest" else 8
+    tracer = get_tracer()
+    with tracer.span("image.load"):
+        img = load_image(args, size_hint=(target_w * hint, target_h * hint))
 
     # Calculate final dimensions
     final_w, final_h = fit_dimensions(img, target_w, target_h, keep_aspect)
+    palette = resolve_palette(args.get("palette"), bridge.call)
+    result = {
+        "ok": True,
+        "width": final_w,
+        "height": final_h,
+        "colors": colors,
+        "resample": resample,
+        "palette_colors": len(palette) if palette else 0,
+        "dither": dither,
+        "project": project_name,
+    }
+
+    n_frames = getattr(img, "n_frames", 1)
+    if n_frames > 1 and args.get("animated", True):
+        if np is None:
+            raise RuntimeError("NumPy is required: pip install numpy")
+        return dict(
+            result,
+            **_animated_to_pixelart(
+                img, n_frames, (final_w, final_h), resample, colors, palette, dither,
+                project_name, bridge, progress,
+            ),
+        )
 
-    # Resize with nearest-neighbor for pixel art look
-    img = img.resize((final_w, final_h), Image.NEAREST)
-
-    # Quantize colors if requested
-    if colors > 0:
-        dither_mode = Image.Dither.FLOYDSTEINBERG if dither else Image.Dither.NONE
-        img = img.quantize(colors=colors, dither=dither_mode).convert("RGBA")
+    with tracer.span("image.downscale", resample=resample):
+        img = downscale_image(img, final_w, final_h, resample)
+
+    if palette is None and colors > 0 and dither in ORDERED_MODES:
+        # Ordered dithering works against a fixed palette; build an adaptive one
+        palette = adaptive_palette([np.asarray(img.convert("RGBA"))], colors)
+        result["palette_colors"] = len(palette)
+    if palette is not None:
+        # Map onto the palette through the cached LUT
+        if np is None:
+            raise RuntimeError("NumPy is required: pip install numpy")
+        with tracer.span("image.quantize"):
+            img = Image.fromarray(_quantize_frame((np.asarray(img.convert("RGBA")), palette, dither)), "RGBA")
+    elif colors > 0:
+        # Quantize colors if requested
+        dither_mode = Image.Dither.FLOYDSTEINBERG if dither != "none" else Image.Dither.NONE
+        with tracer.span("image.quantize"):
+            img = img.quantize(colors=colors, dither=dither_mode).convert("RGBA")
 
     # Ensure RGBA for PNG export
     if img.mode != "RGBA":
         img = img.convert("RGBA")
 
     # Encode to base64 PNG
-    buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    b64_png = base64.b64encode(buf.getvalue()).decode("ascii")
+    with tracer.span("image.encode_png"):
+        buf = io.BytesIO()
+        img.save(buf, format="PNG")
+        b64_png = base64.b64encode(buf.getvalue()).decode("ascii")
 
     # Create project and set region in Pixelorama
-    bridge_call("project.create", {"name": project_name, "width": final_w, "height": final_h})
-    bridge_call("pixel.set_region", {"x": 0, "y": 0, "data": b64_png, "format": "png", "mode": "replace"})
+    bridge.call("project.create", {"name": project_name, "width": final_w, "height": final_h})
+    bridge.call("pixel.set_region", {"x": 0, "y": 0, "data": b64_png, "format": "png", "mode": "replace"})
+
+    return result
+
+
+def downscale_image(img: "Image.Image", width: int, height: int, resample: str) -> "Image.Image":
+    """Reduce an image to the final pixel art size with the chosen method."""
+    if resample == "nearest":
+        # Resize with nearest-neighbor for pixel art look
+        img = reduce_staged(img, width, height)
+        return img.resize((width, height), Image.NEAREST)
+    # One representative color per output block instead of one arbitrary sample
+    pixels = np.asarray(img.convert("RGBA"))
+    return Image.fromarray(block_reduce(pixels, width, height, resample), "RGBA")
+
+
+def _animated_to_pixelart(
+    img: "Image.Image",
+    n_frames: int,
+    size: Tuple[int, int],
+    resample: str,
+    colors: int,
+    palette: Optional[tuple],
+    dither: str,
+    project_name: str,
+    bridge,
+    progress: Optional[Callable],
+) -> Dict[str, Any]:
+    """Convert every frame of an animated source into a project frame.
+
+    Frames are decoded and downscaled in order here (GIF/APNG frames depend
+    on the previous ones, and only the small frames are kept). All frames
+    share one palette whose LUT is built once in this process; large
+    animations are quantized in the shared worker pool, one chunk of frames
+    and one copy of the finished LUT per worker. The pixels are uploaded as
+    one pipelined stream of raw set_region calls.
+    """
+    width, height = size
+    total = n_frames * 3  # downscale, quantize, upload
+    done = 0
+    durations_ms: List[float] = []
+
+    small = []
+    for i in range(n_frames):
+        img.seek(i)
+        durations_ms.append(float(img.info.get("duration") or 100))
+        frame = downscale_image(img.convert("RGBA"), width, height, resample)
+        small.append(np.asarray(frame.convert("RGBA")))
+        done += 1
+        report_progress(progress, done, total, "downscale")
+
+    if palette is None and colors > 0:
+        palette = adaptive_palette(small, colors)
+    if palette is not None:
+        lut = get_palette_lut(palette)
+        pool = get_frame_pool() if n_frames * width * height >= PARALLEL_MIN_PIXELS else None
+        chunk = -(-n_frames // FRAME_WORKERS) if pool is not None else 1
+        tasks = ((small[i : i + chunk], palette, dither, lut) for i in range(0, n_frames, chunk))
+        quantized = []
+        for frames in map_ordered(pool, _quantize_frames, tasks, FRAME_WORKERS):
+            quantized.extend(frames)
+            done += len(frames)
+            report_progress(progress, done, total, "quantize")
+        small = quantized
+    else:
+        done += n_frames
+
+    bridge.call("project.create", {"name": project_name, "width": width, "height": height})
+    bridge.call("frame.add", {"after": 0, "count": n_frames - 1})
+    bridge.call("animation.frame_duration.set", {"durations_ms": durations_ms})
+
+    def uploads() -> Iterator[tuple]:
+        for i, frame in enumerate(small):
+            raw = np.ascontiguousarray(frame).tobytes()
+            yield from region_calls(0, 0, width, height, raw, {"frame": i, "layer": 0})
+            report_progress(progress, done + i + 1, total, "upload")
+
+    for _ in bridge.call_stream(uploads(), PIPELINE_WINDOW):
+        pass
+    return {"frames": n_frames, "palette_colors": len(palette) if palette else 0}
+
+
+def map_ordered(pool, fn: Callable, tasks: Iterable, window: int) -> Iterator[Any]:
+    """Ordered map over an executor with at most `window` tasks in flight.
+
+    Without a pool the tasks run inline.
+    """
+    if pool is None:
+        yield from map(fn, tasks)
+        return
+    pending = collections.deque()
+    for task in tasks:
+        pending.append(pool.submit(fn, task))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _quantize_frame(task: tuple) -> "np.ndarray":
+    pixels, palette, dither = task
+    indices, opaque = quantize_pixels(pixels, palette, dither)
+    return get_palette_lut(palette).colorize(indices, opaque)
+
 
-    return {"ok": True, "width": final_w, "height": final_h, "colors": colors, "project": project_name}
+def _quantize_frames(task: tuple) -> List["np.ndarray"]:
+    # The LUT arrives prebuilt, so workers never rebuild it
+    frames, palette, dither, lut = task
+    out = []
+    for pixels in frames:
+        indices, opaque = quantize_pixels(pixels, palette, dither, lut=lut)
+        out.append(lut.colorize(indices, opaque))
+    return out
 
 
-def load_image(args: Dict[str, Any]) -> "Image.Image":
-    """Load image from base64 data or file path."""
+def report_progress(progress: Optional[Callable], done: int, total: int, message: str) -> None:
+    if progress is not None:
+        progress(done, total, message)
+
+
+def load_image(args: Dict[str, Any], size_hint: Optional[Tuple[int, int]] = None) -> "Image.Image":
+    """Load image from base64 data or file path.
+
+    With size_hint, JPEG sources are decoded in draft mode at the smallest
+    DCT scale that is still at least that large.
+    """
     image_data = args.get("image_data")
     image_path = args.get("image_path")
 
     if image_data:
-        raw = base64.b64decode(image_data)
-        return Image.open(io.BytesIO(raw))
-    if image_path:
-        return Image.open(image_path)
+        # a2b_base64 reads the str buffer directly (b64decode would first
+        # copy it to bytes), and BytesIO shares the decoded bytes.
+        try:
+            raw = binascii.a2b_base64(image_data)
+        except (binascii.Error, ValueError) as exc:
+            raise RuntimeError(f"invalid image_data: {exc}") from exc
+        img = Image.open(io.BytesIO(raw))
+    elif image_path:
+        img = Image.open(image_path)
+    else:
+        raise RuntimeError("image_data or image_path is required")
+
+    if size_hint and img.format == "JPEG":
+        img.draft(img.mode, size_hint)
+    width, height = img.size
+    if width * height > MAX_DECODE_PIXELS:
+        raise RuntimeError(
+            f"image too large to decode: {width}x{height} exceeds "
+            f"PIXELORAMA_MAX_DECODE_PIXELS ({MAX_DECODE_PIXELS})"
+        )
+    return img
 
-    raise RuntimeError("image_data or image_path is required")
+
+def reduce_staged(img: "Image.Image", target_w: int, target_h: int) -> "Image.Image":
+    """Box-reduce by the largest integer factor that keeps 2x the target size.
+
+    The final nearest-neighbor resize then works on a small image, and
+    every output pixel still samples an averaged source block.
+    """
+    factor = min(img.width // max(1, target_w * 2), img.height // max(1, target_h * 2))
+    if factor < 2:
+        return img
+    if img.mode not in ("L", "LA", "RGB", "RGBA"):
+        img = img.convert("RGBA")
+    return img.reduce(factor)
 
 
 def fit_dimensions(img: "Image.Image", target_w: int, target_h: int, keep_aspect: bool) -> tuple:
@@ -98,6 +332,8 @@ def handle_animated_export(args: Dict[str, Any], bridge_call: Callable) -> Dict[
     trim = args.get("trim", False)
     scale = args.get("scale", 1)
     interpolation = args.get("interpolation", "nearest")
+    palette = resolve_palette(args.get("palette"), bridge_call) if fmt == "gif" else None
+    dither = parse_dither(args["dither"]) if "dither" in args else None
 
     # Query project metadata and frame list from bridge
     _log("querying project.info...")
@@ -112,11 +348,18 @@ def handle_animated_export(args: Dict[str, Any], bridge_call: Callable) -> Dict[
     frame_indices = _resolve_frame_range(args, all_frames, bridge_call)
 
     # Apply direction (forward / backwards / ping_pong)
-    frame_indices = _apply_direction(frame_indices, args.get("direction", "forward"))
+    frame_indices = apply_direction(frame_indices, args.get("direction", "forward"))
 
     if not frame_indices:
         raise RuntimeError("no frames to export")
 
+    # Unchanged frames come from the export cache
+    hashes = frame_hashes(sorted(set(frame_indices)), bridge_call) if args.get("cache", True) else {}
+    frame_keys = [
+        ExportCache.key(hashes.get(i, ""), "png", trim=trim, scale=scale, interpolation=interpolation)
+        for i in frame_indices
+    ]
+
     # Export each frame as temp PNG, then assemble
     # Use ~/.cache/ (not /tmp/) because Flatpak sandboxes /tmp/ but shares ~/
     cache_base = os.path.join(os.path.expanduser("~"), ".cache", "pixelorama-mcp")
@@ -126,12 +369,12 @@ def handle_animated_export(args: Dict[str, Any], bridge_call: Callable) -> Dict[
         durations_map = {f["index"]: f.get("duration", 1.0) for f in all_frames}
         pil_frames, durations_ms = _export_frames(
             frame_indices, durations_map, fps,
-            temp_dir, trim, scale, interpolation, bridge_call,
+            temp_dir, trim, scale, interpolation, bridge_call, frame_keys,
         )
 
         _log(f"all frames exported, assembling {fmt} ({len(pil_frames)} frames)...")
         if fmt == "gif":
-            _save_gif(pil_frames, durations_ms, final_path)
+            save_gif(pil_frames, durations_ms, final_path, palette, dither, frame_keys)
         else:  # apng
             pil_frames[0].save(
                 final_path, format="PNG", save_all=True,
@@ -179,7 +422,7 @@ def _resolve_frame_range(
     return list(range(start, end))
 
 
-def _apply_direction(indices: List[int], direction: str) -> List[int]:
+def apply_direction(indices: List[int], direction: str) -> List[int]:
     """Reorder frame indices based on playback direction."""
     if direction == "backwards":
         return list(reversed(indices))
@@ -201,24 +444,39 @@ def _export_frames(
     scale: int,
     interpolation: str,
     bridge_call: Callable,
+    frame_keys: Optional[List[Optional[str]]] = None,
 ) -> tuple:
-    """Export individual frames as temp PNGs, return PIL images and durations."""
+    """Export individual frames as temp PNGs, return PIL images and durations.
+
+    Frames found in the export cache (by frame_keys) are not exported again,
+    and a frame repeated in the sequence is exported once.
+    """
+    cache = get_cache()
     pil_frames = []
     durations_ms = []
+    loaded: Dict[int, "Image.Image"] = {}
 
     for i, frame_idx in enumerate(frame_indices):
-        temp_path = os.path.join(temp_dir, f"{i:04d}.png")
-        _log(f"exporting frame {i+1}/{len(frame_indices)} (idx={frame_idx}) -> {temp_path}")
-        bridge_call("project.export", {
-            "path": temp_path,
-            "frame": frame_idx,
-            "trim": trim,
-            "scale": scale,
-            "interpolation": interpolation,
-        })
-        _log(f"frame {i+1} exported, loading PIL image...")
-
-        img = Image.open(temp_path).convert("RGBA")
+        key = frame_keys[i] if frame_keys else None
+        img = loaded.get(frame_idx)
+        data = cache.get(key) if img is None else None
+        if img is None and data is None:
+            temp_path = os.path.join(temp_dir, f"{i:04d}.png")
+            _log(f"exporting frame {i+1}/{len(frame_indices)} (idx={frame_idx}) -> {temp_path}")
+            bridge_call("project.export", {
+                "path": temp_path,
+                "frame": frame_idx,
+                "trim": trim,
+                "scale": scale,
+                "interpolation": interpolation,
+            })
+            _log(f"frame {i+1} exported, loading PIL image...")
+            with open(temp_path, "rb") as fh:
+                data = fh.read()
+            cache.put(key, data)
+        if img is None:
+            img = Image.open(io.BytesIO(data)).convert("RGBA")
+            loaded[frame_idx] = img
         pil_frames.append(img)
 
         # Duration: multiplier / fps * 1000 = milliseconds
@@ -229,19 +487,121 @@ def _export_frames(
     return pil_frames, durations_ms
 
 
-def _save_gif(
-    frames_rgba: list, durations_ms: list, path: str
+def frame_hashes(indices: List[int], bridge_call: Callable) -> Dict[int, str]:
+    """Content hashes of frames; empty when the bridge cannot provide them."""
+    try:
+        result = bridge_call("frame.hashes", {"frames": indices})
+    except RuntimeError as exc:
+        _log(f"frame.hashes unavailable, export cache disabled: {exc}")
+        return {}
+    return {int(k): v for k, v in result.get("hashes", {}).items()}
+
+
+def handle_cached_export(args: Dict[str, Any], bridge_call: Callable) -> Dict[str, Any]:
+    """project.export of a blended frame, served from the export cache when unchanged.
+
+    Layer and split-layer exports go straight to the bridge, and so do
+    relative paths: Pixelorama resolves them against its own working
+    directory, which need not be the server's. An absolute path may still
+    exist only inside Pixelorama's sandbox (Flatpak), so file access here
+    falls back to the plain bridge export.
+    """
+    params = {k: v for k, v in args.items() if k != "cache"}
+    path = str(params.get("path", ""))
+    if (
+        not args.get("cache", True)
+        or args.get("split_layers")
+        or int(args.get("layer", -1)) >= 0
+        or not os.path.isabs(path)
+    ):
+        return bridge_call("project.export", params)
+    if "frame" not in params:
+        params["frame"] = bridge_call("project.info", {})["current_frame"]
+    frame = int(params["frame"])
+    key = ExportCache.key(
+        frame_hashes([frame], bridge_call).get(frame, ""),
+        "png",
+        trim=bool(params.get("trim", False)),
+        scale=int(params.get("scale", 1)),
+        interpolation=params.get("interpolation", "nearest"),
+    )
+    cache = get_cache()
+    data = cache.get(key)
+    if data is not None and os.path.isdir(os.path.dirname(path)):
+        try:
+            with open(path, "wb") as fh:
+                fh.write(data)
+            return {"path": path, "frame": frame, "cached": True}
+        except OSError as exc:
+            _log(f"cannot write cached export to {path}, exporting in Pixelorama: {exc}")
+    result = bridge_call("project.export", params)
+    if key is not None:
+        try:
+            with open(path, "rb") as fh:
+                cache.put(key, fh.read())
+        except OSError as exc:
+            _log(f"export not readable from the server, not cached: {exc}")
+    return dict(result, cached=False)
+
+
+def save_gif(
+    frames_rgba: list,
+    durations_ms: list,
+    path: str,
+    palette: Optional[tuple] = None,
+    dither: Optional[str] = None,
+    frame_keys: Optional[List[Optional[str]]] = None,
 ) -> None:
-    """Save animated GIF from RGBA PIL frames with transparency support."""
+    """Save animated GIF from RGBA PIL frames with transparency support.
+
+    With a palette (at most 255 colors) or an ordered dither mode, all
+    frames are mapped onto one shared palette through the palette LUT
+    instead of being quantized one by one, so colors and dither patterns
+    stay stable between frames. With frame_keys (export cache keys of the
+    RGBA frames), quantized frames are reused from the export cache.
+    """
+    if palette is not None and len(palette) > 255:
+        raise RuntimeError("GIF palette can have at most 255 colors")
+    shared = palette is not None or dither in ORDERED_MODES
+    if shared:
+        if np is None:
+            raise RuntimeError("NumPy is required: pip install numpy")
+        if palette is None:
+            palette = adaptive_palette([np.asarray(f.convert("RGBA")) for f in frames_rgba], 255)
+        flat_palette = [c for rgb in palette for c in rgb]
+        flat_palette += [0] * (768 - len(flat_palette))
+
+    cache = get_cache()
     gif_frames = []
-    for f in frames_rgba:
-        alpha = f.split()[3]
-        rgb = f.convert("RGB")
-        # Quantize to 255 colors, reserve palette index 255 for transparency
-        quantized = rgb.quantize(colors=255)
-        # Mark transparent pixels (alpha < 128) with reserved index
-        mask = alpha.point(lambda a: 255 if a < 128 else 0, mode="1")
-        quantized.paste(255, mask=mask)
+    for f, key in zip(frames_rgba, frame_keys or [None] * len(frames_rgba)):
+        gif_key = ExportCache.key(key or "", "gif", palette=palette, dither=dither)
+        data = cache.get(gif_key)
+        if data is not None:
+            gif_frames.append(Image.open(io.BytesIO(data)))
+            continue
+        if shared:
+            indices, opaque = quantize_pixels(np.asarray(f.convert("RGBA")), palette, dither or "none")
+            # Index 255 stays reserved for transparency
+            quantized = Image.fromarray(np.where(opaque, indices, 255).astype(np.uint8), "P")
+            quantized.putpalette(flat_palette)
+        else:
+            alpha = f.split()[3]
+            rgb = f.convert("RGB")
+            # Quantize to 255 colors, reserve palette index 255 for transparency
+            if dither == "none":
+                quantized = rgb.quantize(colors=255, dither=Image.Dither.NONE)
+            else:
+                quantized = rgb.quantize(colors=255)
+            # Mark transparent pixels (alpha < 128) with reserved index
+            mask = alpha.point(lambda a: 255 if a < 128 else 0, mode="1")
+            quantized.paste(255, mask=mask)
+            # A full 256-entry palette keeps index 255 valid when cached as PNG
+            flat = quantized.getpalette()
+            quantized.putpalette(flat + [0] * (768 - len(flat)))
+        if gif_key is not None:
+            buf = io.BytesIO()
+            quantized.save(buf, format="PNG")
+            cache.put(gif_key, buf.getvalue())
         gif_frames.append(quantized)
 
     gif_frames[0].save(
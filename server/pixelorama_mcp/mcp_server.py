@@ -1,11 +1,18 @@
 #!/usr/bin/env python3
 import json
 import os
-from typing import Any, Dict, Optional
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Union
 
+# Handler modules pull in Pillow/NumPy; they are imported on first use so
+# that startup (spawned once per MCP session) only pays for the registry.
 from .bridge_client import BridgeClient
-from .image_utils import handle_animated_export, handle_to_pixelart
+from .metadata_cache import MetadataCache
+from .metrics import get_metrics
+from .schema import SchemaError, compile_tools
 from .tools import TOOLS
+from .tracing import get_tracer
 from .transport import StdioTransport
 
 PROTOCOL_VERSION = "2024-11-05"  # conservative MCP-style version string
@@ -16,58 +23,47 @@ _BRIDGE_NAME_MAP = {
     "bridge.version": "version",
 }
 
-# Tools that skip protocol check (work without verified bridge protocol)
-_SKIP_PROTOCOL_CHECK = {"bridge.ping", "bridge.version", "bridge.info"}
-
-# Tools handled server-side (not passed through to bridge)
-_SERVER_SIDE_TOOLS = {"image.to_pixelart", "project.export.animated"}
+# Bridge tools whose large payloads are streamed as pipelined tiles
+_TILED_TOOLS = {
+    "pixel.get_region": "handle_get_region",
+    "pixel.set_region": "handle_set_region",
+}
 
 # Tools that return image data ({"data": b64, "format": "png"})
 # These get MCP image content blocks in the response
-_IMAGE_TOOLS = {"pixel.get_region", "canvas.snapshot"}
+_IMAGE_TOOLS = {"pixel.get_region", "canvas.snapshot", "frame.snapshot"}
+
+# Arguments filled in for MCP callers where the bridge default does not suit
+# them (frame.snapshot defaults to raw RGBA for bridge clients)
+_MCP_DEFAULTS = {
+    "frame.snapshot": {"format": "png"},
+}
 
 # Tools that modify pixel data and need a canvas refresh after execution
 _NEEDS_REFRESH = {
-    "pixel.set", "pixel.set_many", "pixel.set_region", "pixel.replace_color",
+    "pixel.set", "pixel.set_many", "pixel.set_region", "pixel.replace_color", "pixel.replace_colors",
     "canvas.fill", "canvas.clear", "canvas.resize", "canvas.crop",
     "draw.line", "draw.rect", "draw.ellipse", "draw.erase_line",
     "draw.text", "draw.gradient",
     "effect.shader.apply", "effect.layer.apply",
     "brush.stamp", "brush.stroke",
-    "project.create", "batch.exec",
+    "project.create", "batch.exec", "project.compact", "cel.link",
 }
 
 
-def _deserialize_args(args: Dict[str, Any]) -> Dict[str, Any]:
-    """MCP clients may serialize arrays/objects AND strings as JSON strings.
-
-    Claude Code MCP client JSON-encodes all non-primitive argument values:
-      - arrays:  [255,0,0,255]  -> '"[255,0,0,255]"'  (starts with '[')
-      - objects: {"r":1}        -> '"{\"r\":1}"'       (starts with '{')
-      - strings: "#ff0000"      -> '"\"#ff0000\""'     (starts with '"')
-
-    We detect these and parse them back to their original types.
-    """
-    out = {}
-    for key, val in args.items():
-        if isinstance(val, str) and val and val[0] in ("[", "{", '"'):
-            try:
-                out[key] = json.loads(val)
-                continue
-            except (json.JSONDecodeError, ValueError):
-                pass
-        out[key] = val
-    return out
-
-
 class MCPServer:
     def __init__(self):
         self._transport = StdioTransport()
         host = os.environ.get("PIXELORAMA_BRIDGE_HOST", "127.0.0.1")
         port = int(os.environ.get("PIXELORAMA_BRIDGE_PORT", "8123"))
-        self._bridge = BridgeClient(host=host, port=port)
-        self._bridge_protocol_checked = False
-        self._tool_names = {t["name"] for t in TOOLS}
+        self._bridge = BridgeClient(
+            host=host, port=port, expected_protocol=PROTOCOL_VERSION, metadata=MetadataCache()
+        )
+        self._warm_up_thread: Optional[threading.Thread] = None
+        self._metrics = get_metrics()
+        self._tracer = get_tracer()
+        self._validators = compile_tools(TOOLS)
+        self._tools_json: Optional[bytes] = None
 
     def run(self) -> None:
         while True:
@@ -77,14 +73,16 @@ class MCPServer:
             response = self._handle_message(msg)
             if response is not None:
                 self._transport.send_message(response)
+            self._tracer.flush()
 
-    def _handle_message(self, msg: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def _handle_message(self, msg: Dict[str, Any]) -> Optional[Union[Dict[str, Any], bytes]]:
         msg_id = msg.get("id")
         method = msg.get("method")
         params = msg.get("params", {})
 
         try:
             if method == "initialize":
+                self._start_warm_up()
                 result = {
                     "protocolVersion": PROTOCOL_VERSION,
                     "capabilities": {"tools": {}},
@@ -92,24 +90,59 @@ class MCPServer:
                 }
                 return self._ok(msg_id, result) if msg_id is not None else None
             if method == "tools/list":
-                return self._ok(msg_id, {"tools": TOOLS}) if msg_id is not None else None
+                return self._tools_list_response(msg_id) if msg_id is not None else None
             if method == "tools/call":
                 if msg_id is None:
                     return None
                 tool_name = params.get("name", "")
-                tool_result = self._call_tool(params)
-                wrapped = self._wrap_tool_result(tool_name, tool_result)
+                label = tool_name if tool_name in self._validators else "unknown"
+                started = time.perf_counter()
+                profiler = self._tracer.start_profile()
+                try:
+                    tool_result = self._call_tool(params)
+                    with self._tracer.span("wrap_result"):
+                        wrapped = self._wrap_tool_result(tool_name, tool_result)
+                except Exception:
+                    self._metrics.inc("tool_errors", label)
+                    raise
+                finally:
+                    elapsed = time.perf_counter() - started
+                    self._tracer.finish_profile(profiler, label, elapsed)
+                    self._tracer.add(f"tool {label}", started, started + elapsed, cat="tool")
+                    self._metrics.observe("tool", label, elapsed)
+                    self._metrics.maybe_dump()
                 return self._ok(msg_id, wrapped)
             if method in ("shutdown", "exit"):
                 return self._ok(msg_id, {"ok": True}) if msg_id is not None else None
             if msg_id is None:
                 return None
             return self._err(msg_id, "method_not_found", f"unknown method: {method}")
+        except SchemaError as exc:
+            if msg_id is None:
+                return None
+            return self._err(msg_id, "invalid_params", str(exc))
         except Exception as exc:  # guardrail to avoid crashing the server
             if msg_id is None:
                 return None
             return self._err(msg_id, "internal_error", str(exc))
 
+    def _progress_reporter(self, params: Dict[str, Any]) -> Optional[Callable[[int, int, str], None]]:
+        """Progress callback sending MCP notifications, if the client asked for them."""
+        token = (params.get("_meta") or {}).get("progressToken")
+        if token is None:
+            return None
+
+        def report(progress: int, total: int, message: str) -> None:
+            self._transport.send_message(
+                {
+                    "jsonrpc": "2.0",
+                    "method": "notifications/progress",
+                    "params": {"progressToken": token, "progress": progress, "total": total, "message": message},
+                }
+            )
+
+        return report
+
     def _wrap_tool_result(self, tool_name: str, result: Dict[str, Any]) -> Dict[str, Any]:
         """Wrap tool result as MCP content. Image tools get image content blocks."""
         if tool_name in _IMAGE_TOOLS and isinstance(result, dict) and "data" in result:
@@ -131,45 +164,138 @@ class MCPServer:
 
     def _call_tool(self, params: Dict[str, Any]) -> Dict[str, Any]:
         name = params.get("name")
-        args = _deserialize_args(params.get("arguments", {}))
-
+        # Validate against the tool's inputSchema before any bridge traffic
+        validate = self._validators.get(name)
+        if validate is None:
+            raise RuntimeError(f"unknown tool: {name}")
+        with self._tracer.span("validate"):
+            args = validate(params.get("arguments") or {}, name)
         # Server-side tools (not passed through to bridge)
+        if name == "server.stats":
+            return self._server_stats(args)
+        if name == "server.profile":
+            return self._server_profile(args)
+
+        self._finish_warm_up()
         if name == "image.to_pixelart":
-            return handle_to_pixelart(args, self._bridge.call)
+            from .image_utils import handle_to_pixelart
+
+            return handle_to_pixelart(args, self._bridge, self._progress_reporter(params))
         if name == "project.export.animated":
+            from .image_utils import handle_animated_export
+
             return handle_animated_export(args, self._bridge.call)
+        if name == "project.export":
+            from .image_utils import handle_cached_export
 
-        # Validate tool exists in registry
-        if name not in self._tool_names:
-            raise RuntimeError(f"unknown tool: {name}")
+            return handle_cached_export(args, self._bridge.call)
+        if name == "pixel.replace_colors":
+            from .recolor import handle_replace_colors
+
+            result = handle_replace_colors(args, self._bridge)
+            self._refresh_canvas()
+            return result
+        if name == "project.import.sequence":
+            from .sequence_import import handle_import_sequence
+
+            result = handle_import_sequence(args, self._bridge, self._progress_reporter(params))
+            self._refresh_canvas()
+            return result
+        if name == "project.export.atlas":
+            from .atlas import handle_export_atlas
+
+            return handle_export_atlas(args, self._bridge, self._progress_reporter(params))
+        if name == "project.export.all_tags":
+            from .tag_export import handle_export_all_tags
 
-        # Protocol check for bridge tools (skip for basic bridge queries)
-        if name not in _SKIP_PROTOCOL_CHECK:
-            self._ensure_bridge_protocol()
+            return handle_export_all_tags(args, self._bridge, self._progress_reporter(params))
+        if name == "project.memory_stats":
+            from .memory_stats import handle_memory_stats
+
+            return handle_memory_stats(args, self._bridge)
+        if name == "tilemap.from_image":
+            from .tilemap_import import handle_tilemap_from_image
+
+            result = handle_tilemap_from_image(args, self._bridge)
+            self._refresh_canvas()
+            return result
 
         # Map to bridge method name and call
         bridge_method = _BRIDGE_NAME_MAP.get(name, name)
-        result = self._bridge.call(bridge_method, args)
+        defaults = _MCP_DEFAULTS.get(name)
+        if defaults:
+            args = {**defaults, **args}
+        tiled = _TILED_TOOLS.get(name)
+        if tiled is not None:
+            from . import tiling
+
+            result = getattr(tiling, tiled)(args, self._bridge)
+        else:
+            result = self._bridge.call(bridge_method, args)
 
         # Force canvas refresh for drawing/modification tools
         if name in _NEEDS_REFRESH:
-            try:
-                self._bridge.call("project.set_active", {})
-            except Exception:
-                pass
+            self._refresh_canvas()
 
         return result
 
-    def _ensure_bridge_protocol(self) -> None:
-        if self._bridge_protocol_checked:
-            return
-        info = self._bridge.call("bridge.info", {})
-        protocol = info.get("protocol_version") if isinstance(info, dict) else None
-        if protocol != PROTOCOL_VERSION:
-            raise RuntimeError(
-                f"protocol_mismatch: expected {PROTOCOL_VERSION}, got {protocol}"
-            )
-        self._bridge_protocol_checked = True
+    def _refresh_canvas(self) -> None:
+        try:
+            self._bridge.call("project.set_active", {})
+        except Exception:
+            pass
+
+    def _server_stats(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        if args.get("format") == "openmetrics":
+            result: Dict[str, Any] = {"openmetrics": self._metrics.openmetrics()}
+        else:
+            result = self._metrics.snapshot()
+            cache = self._bridge.metadata
+            if cache is not None:
+                result["metadata_cache"] = {"hits": cache.hits, "misses": cache.misses}
+        if args.get("reset"):
+            self._metrics.reset()
+        return result
+
+    def _server_profile(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        tracer = self._tracer
+        if "profile_dir" in args:
+            tracer.profile_dir = args["profile_dir"]
+        if "profile_ms" in args:
+            tracer.profile_ms = float(args["profile_ms"])
+        if "trace_file" in args:
+            if args["trace_file"]:
+                tracer.start_trace(args["trace_file"])
+            else:
+                tracer.stop_trace()
+        return tracer.status()
+
+    def _start_warm_up(self) -> None:
+        # Connect and check the bridge protocol while the client is still
+        # listing tools, so the first tools/call does not pay for it.
+        if self._warm_up_thread is None:
+            self._warm_up_thread = threading.Thread(target=self._warm_up, daemon=True)
+            self._warm_up_thread.start()
+
+    def _warm_up(self) -> None:
+        try:
+            self._bridge.warm_up()
+        except Exception:
+            pass  # the first tool call reconnects and reports the error
+
+    def _finish_warm_up(self) -> None:
+        # The bridge client is not thread-safe; tool calls wait for warm-up
+        if self._warm_up_thread is not None:
+            self._warm_up_thread.join()
+            self._warm_up_thread = None
+
+    def _tools_list_response(self, msg_id: Any) -> bytes:
+        # The registry never changes at runtime: encode it once and splice
+        # the request id into the cached bytes.
+        if self._tools_json is None:
+            self._tools_json = json.dumps({"tools": TOOLS}, ensure_ascii=False).encode("utf-8")
+        msg_id_json = json.dumps(msg_id, ensure_ascii=False).encode("utf-8")
+        return b'{"jsonrpc": "2.0", "id": ' + msg_id_json + b', "result": ' + self._tools_json + b"}"
 
     def _ok(self, msg_id: Any, result: Any) -> Dict[str, Any]:
         return {"jsonrpc": "2.0", "id": msg_id, "result": result}
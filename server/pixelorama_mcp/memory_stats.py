@@ -0,0 +1,93 @@
+from typing import Any, Dict, List
+
+from .export_cache import CACHE_DIR
+
+
+def handle_memory_stats(args: Dict[str, Any], bridge) -> Dict[str, Any]:
+    """Fetch project.memory_stats from the bridge and add a cost summary.
+
+    The summary ranks where the bytes are (cels, tilesets, brushes, export
+    cache) and suggests what to compact or split.
+    """
+    stats = bridge.call("project.memory_stats", {"hash": bool(args.get("hash", True))})
+    top = max(1, int(args.get("top", 10)))
+    summary = summarize(stats, top)
+    if not args.get("cels", False):
+        stats.pop("cels", None)
+    if not args.get("frames", False):
+        stats.pop("frames", None)
+    stats["summary"] = summary
+    return stats
+
+
+def summarize(stats: Dict[str, Any], top: int = 10) -> Dict[str, Any]:
+    totals = stats.get("totals", {})
+    categories = [
+        {"name": "cels", "bytes": totals.get("cel_bytes", 0)},
+        {"name": "tilesets", "bytes": sum(t["bytes"] for t in stats.get("tilesets", []))},
+        {"name": "brushes", "bytes": stats.get("brushes", {}).get("bytes", 0)},
+        {"name": "export_cache", "bytes": stats.get("export_cache", {}).get("bytes", 0)},
+    ]
+    categories.sort(key=lambda c: c["bytes"], reverse=True)
+    total = sum(c["bytes"] for c in categories)
+    # The bridge only estimates textures as one per cel image, i.e. the cel
+    # bytes again, so they are reported beside the total, not in it
+    textures = totals.get("texture_bytes", 0)
+    return {
+        "total_bytes": total,
+        "total": format_bytes(total),
+        "gpu_textures_estimate_bytes": textures,
+        "gpu_textures_estimate": format_bytes(textures),
+        "categories": [dict(c, human=format_bytes(c["bytes"])) for c in categories],
+        "top_layers": _top(stats.get("layers", []), top),
+        "top_frames": _top(stats.get("frames", []), top),
+        "top_cels": _top(stats.get("cels", []), top),
+        "undo_steps": stats.get("undo", {}).get("history_count", 0),
+        "suggestions": _suggestions(stats),
+    }
+
+
+def format_bytes(n: float) -> str:
+    if n < 1024:
+        return f"{n} B"
+    for unit in ("KB", "MB", "GB"):
+        n /= 1024.0
+        if n < 1024 or unit == "GB":
+            break
+    return f"{n:.1f} {unit}"
+
+
+def _top(items: List[Dict[str, Any]], n: int) -> List[Dict[str, Any]]:
+    ranked = sorted((i for i in items if i.get("bytes", 0) > 0), key=lambda i: i["bytes"], reverse=True)
+    return [dict(i, human=format_bytes(i["bytes"])) for i in ranked[:n]]
+
+
+def _suggestions(stats: Dict[str, Any]) -> List[str]:
+    totals = stats.get("totals", {})
+    out = []
+    reclaimable = totals.get("reclaimable_bytes", 0)
+    if reclaimable > 0:
+        out.append(
+            f"project.compact can link {totals.get('duplicate_cels', 0)} duplicate and "
+            f"{totals.get('empty_cels', 0)} empty cels, reclaiming about {format_bytes(reclaimable)}"
+        )
+    cache = stats.get("export_cache", {}).get("bytes", 0)
+    if cache > 0:
+        out.append(
+            f"Pixelorama's export buffers keep {format_bytes(cache)} of frames in memory until the next export; "
+            f"the server's on-disk export cache ({CACHE_DIR}) is separate and capped by PIXELORAMA_EXPORT_CACHE_MB"
+        )
+    # Only the number of steps is known; their image data is not measured
+    history = stats.get("undo", {}).get("history_count", 0)
+    if history > 100:
+        out.append(f"{history} undo steps may keep old images alive; saving and reopening the project clears them")
+    layers = [layer for layer in stats.get("layers", []) if layer.get("bytes", 0) > 0]
+    cel_bytes = totals.get("cel_bytes", 0)
+    if len(layers) > 1 and cel_bytes > 0:
+        heaviest = max(layers, key=lambda layer: layer["bytes"])
+        if heaviest["bytes"] > cel_bytes / 2:
+            out.append(
+                f"layer {heaviest['index']} ({heaviest['name']}) holds "
+                f"{format_bytes(heaviest['bytes'])} of {format_bytes(cel_bytes)} cel data"
+            )
+    return out
@@ -0,0 +1,143 @@
+import json
+import os
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Seconds a cached read is trusted without asking the bridge; after that it
+# is revalidated with bridge.revision. 0 disables the cache.
+METADATA_TTL = float(os.environ.get("PIXELORAMA_METADATA_TTL", "2"))
+
+# Cached read methods and the domains their result depends on. Methods with
+# no domains read static data (shader files) and never expire.
+CACHED_METHODS: Dict[str, Tuple[str, ...]] = {
+    "project.info": ("project", "layer", "frame", "current"),
+    "frame.list": ("frame", "current"),
+    "layer.list": ("layer", "current"),
+    "animation.tags.list": ("tag",),
+    "animation.fps.get": ("animation",),
+    "brush.list": ("brush",),
+    "effect.shader.list": (),
+    "effect.shader.schema": (),
+}
+
+_ALL = ("project", "layer", "frame", "current", "tag", "animation", "brush")
+
+# Domains a mutating method invalidates, by longest matching prefix.
+# Methods matching no rule (history.undo, project.open, batch.exec, ...)
+# invalidate everything.
+INVALIDATES: Dict[str, Tuple[str, ...]] = {
+    "layer.": ("layer", "current"),
+    "frame.": ("frame", "current"),
+    "project.set_active": ("current",),
+    "project.save": ("project",),
+    "project.set_indexed_mode": (),
+    "project.export": (),
+    "canvas.resize": ("project",),
+    "canvas.crop": ("project",),
+    "canvas.": (),
+    "pixel.": (),
+    "draw.": (),
+    "selection.": (),
+    "symmetry.": (),
+    "palette.": (),
+    "animation.tags.": ("tag",),
+    "animation.frame_duration.set": ("frame",),
+    "animation.": ("animation",),
+    "brush.stamp": (),
+    "brush.stroke": (),
+    "brush.": ("brush",),
+    "effect.": (),
+    "tilemap.layer.": ("layer",),
+    "tilemap.": (),
+    "three_d.": (),
+    "cel.link": (),
+}
+
+# Reads that are not cached but must not invalidate anything either
+READ_ONLY_METHODS = {
+    "ping", "version", "bridge.info", "bridge.revision", "project.memory_stats",
+    "layer.get_props", "frame.snapshot", "frame.hashes", "pixel.get", "pixel.get_region",
+    "canvas.snapshot", "palette.list", "palette.get", "palette.export", "selection.export_mask",
+    "tilemap.tileset.list", "tilemap.cell.get", "tilemap.cells.get_region",
+    "effect.layer.list", "effect.shader.inspect", "three_d.object.list",
+}
+
+
+def invalidated_domains(method: str, params: Dict[str, Any]) -> Tuple[str, ...]:
+    """Domains whose cached reads a call to ``method`` makes stale."""
+    if method in CACHED_METHODS or method in READ_ONLY_METHODS:
+        return ()
+    if method == "project.set_active" and not params:
+        return ()  # the canvas refresh after drawing tools changes nothing
+    best = None
+    for prefix in INVALIDATES:
+        if method.startswith(prefix) and (best is None or len(prefix) > len(best)):
+            best = prefix
+    return INVALIDATES[best] if best is not None else _ALL
+
+
+class MetadataCache:
+    """In-memory cache of idempotent metadata reads (project.info, *.list, ...).
+
+    Every call sent to the bridge passes through invalidate(), which drops
+    the entries whose domains the call may change. Entries older than the
+    TTL are revalidated against the bridge revision (project identity,
+    editor undo version and mutating request count), so edits made in the
+    Pixelorama UI are picked up too. Results are stored as JSON and decoded
+    on each hit, so callers may mutate what they get.
+    """
+
+    def __init__(self, ttl: float = METADATA_TTL):
+        self.ttl = ttl
+        # key -> (encoded result, domains, revision, time of last validation)
+        self._entries: Dict[Tuple[str, str], Tuple[str, Tuple[str, ...], Optional[str], float]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(
+        self,
+        method: str,
+        params: Dict[str, Any],
+        fetch: Callable[[str, Dict[str, Any]], Tuple[Any, Optional[str]]],
+        revision: Callable[[], Optional[str]],
+    ) -> Any:
+        """Cached result of ``method``.
+
+        On a miss ``fetch`` calls the bridge and returns the result with the
+        revision reported in the same response (None from older bridges,
+        whose entries are refetched instead of revalidated after the TTL).
+        """
+        key = (method, json.dumps(params, sort_keys=True))
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None:
+            data, domains, rev, stamp = entry
+            if not domains or now - stamp < self.ttl:
+                self.hits += 1
+                return json.loads(data)
+            if rev is not None and revision() == rev:
+                self._entries[key] = (data, domains, rev, now)
+                self.hits += 1
+                return json.loads(data)
+        self.misses += 1
+        domains = CACHED_METHODS[method]
+        result, rev = fetch(method, params)
+        if not domains:
+            rev = None
+        self._entries[key] = (json.dumps(result), domains, rev, time.monotonic())
+        return result
+
+    def invalidate(self, method: str, params: Dict[str, Any]) -> None:
+        domains = invalidated_domains(method, params)
+        if not domains or not self._entries:
+            return
+        stale = [key for key, entry in self._entries.items() if set(entry[1]) & set(domains)]
+        for key in stale:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
@@ -0,0 +1,194 @@
+import atexit
+import bisect
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Optional OpenMetrics text dump, rewritten at most every METRICS_INTERVAL
+# seconds after a tool call and once more on exit
+METRICS_FILE = os.environ.get("PIXELORAMA_METRICS_FILE", "")
+METRICS_INTERVAL = float(os.environ.get("PIXELORAMA_METRICS_INTERVAL", "10"))
+
+# Latency bucket upper bounds in seconds (OpenMetrics "le" labels)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+# Counter families reported alongside the per-tool/per-method histograms;
+# the rest (events, mcp_bytes) are listed as totals
+_PER_NAME = ("tool_errors", "bridge_bytes_out", "bridge_bytes_in")
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; observe() is a bisect and two adds."""
+
+    __slots__ = ("counts", "total", "count", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last bucket is +Inf
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Estimate from the buckets, interpolating linearly inside one."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = BUCKETS[i - 1] if i > 0 else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / n)
+            seen += n
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.5) * 1000, 3),
+            "p90_ms": round(self.quantile(0.9) * 1000, 3),
+            "p99_ms": round(self.quantile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class Metrics:
+    """Process-wide counters and latency histograms.
+
+    Histograms are keyed by (family, name): "tool" for MCP tool calls,
+    "bridge" for bridge round-trips as seen by the client and
+    "bridge_exec" for the execution time the bridge reports
+    (elapsed_us). Counters are keyed by (family, name) as well.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._last_dump = 0.0
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+        self.counters: Dict[Tuple[str, str], int] = {}
+
+    def observe(self, family: str, name: str, seconds: float) -> None:
+        with self._lock:
+            hist = self.histograms.get((family, name))
+            if hist is None:
+                hist = self.histograms[(family, name)] = Histogram()
+            hist.observe(seconds)
+
+    def inc(self, family: str, name: str, amount: int = 1) -> None:
+        with self._lock:
+            key = (family, name)
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self._started = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON summary: per-tool and per-method latency, bytes, connection counts."""
+        with self._lock:
+            hists = {key: hist.summary() for key, hist in self.histograms.items()}
+            counters = dict(self.counters)
+        tools: Dict[str, Any] = {}
+        methods: Dict[str, Any] = {}
+        for (family, name), summary in sorted(hists.items()):
+            if family == "tool":
+                tools[name] = dict(summary, errors=counters.get(("tool_errors", name), 0))
+            elif family == "bridge":
+                methods[name] = dict(
+                    summary,
+                    bytes_out=counters.get(("bridge_bytes_out", name), 0),
+                    bytes_in=counters.get(("bridge_bytes_in", name), 0),
+                )
+        for (family, name), summary in hists.items():
+            if family == "bridge_exec" and name in methods:
+                methods[name]["bridge_mean_ms"] = summary["mean_ms"]
+                methods[name]["bridge_max_ms"] = summary["max_ms"]
+        totals = {
+            f"{family}.{name}": n for (family, name), n in sorted(counters.items()) if family not in _PER_NAME
+        }
+        return {"since": self._started, "tools": tools, "bridge_methods": methods, "totals": totals}
+
+    def openmetrics(self) -> str:
+        """Render everything in the OpenMetrics text format."""
+        with self._lock:
+            hists = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+        lines: List[str] = []
+        families = (
+            ("tool", "pixelorama_mcp_tool_duration_seconds", "tool", "MCP tool call latency"),
+            ("bridge", "pixelorama_mcp_bridge_duration_seconds", "method", "Bridge round-trip latency"),
+            ("bridge_exec", "pixelorama_mcp_bridge_exec_seconds", "method", "Execution time reported by the bridge"),
+        )
+        for family, metric, label, help_text in families:
+            rows = [(name, hist) for (fam, name), hist in hists if fam == family]
+            if not rows:
+                continue
+            lines.append(f"# TYPE {metric} histogram")
+            lines.append(f"# HELP {metric} {help_text}.")
+            for name, hist in rows:
+                value = _label(name)
+                cumulative = 0
+                for bound, n in zip(BUCKETS + (None,), hist.counts):
+                    cumulative += n
+                    le = "+Inf" if bound is None else repr(bound)
+                    lines.append(f'{metric}_bucket{{{label}="{value}",le="{le}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{{label}="{value}"}} {hist.total!r}')
+                lines.append(f'{metric}_count{{{label}="{value}"}} {hist.count}')
+        by_family: Dict[str, List[Tuple[str, int]]] = {}
+        for (family, name), n in counters:
+            by_family.setdefault(family, []).append((name, n))
+        for family, rows in sorted(by_family.items()):
+            metric = f"pixelorama_mcp_{family}"
+            lines.append(f"# TYPE {metric} counter")
+            for name, n in rows:
+                lines.append(f'{metric}_total{{name="{_label(name)}"}} {n}')
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def maybe_dump(self, force: bool = False) -> None:
+        """Rewrite PIXELORAMA_METRICS_FILE if it is set and due."""
+        if not METRICS_FILE:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_dump < METRICS_INTERVAL:
+            return
+        self._last_dump = now
+        directory = os.path.dirname(os.path.abspath(METRICS_FILE))
+        try:
+            # Write then rename, so scrapers never read a partial file
+            fd, tmp = tempfile.mkstemp(dir=directory)
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                fh.write(self.openmetrics())
+            os.replace(tmp, METRICS_FILE)
+        except OSError:
+            pass
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_metrics: Optional[Metrics] = None
+
+
+def get_metrics() -> Metrics:
+    global _metrics
+    if _metrics is None:
+        _metrics = Metrics()
+        if METRICS_FILE:
+            atexit.register(_metrics.maybe_dump, True)
+    return _metrics
@@ -0,0 +1,153 @@
+import functools
+import os
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from .colors import parse_color
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None  # Pillow optional; only adaptive_palette needs it
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # NumPy optional; palette quantization will fail gracefully
+
+# Bits per channel of the RGB lookup table: 6 -> 64^3 bins (256 KB per palette)
+LUT_BITS = int(os.environ.get("PIXELORAMA_PALETTE_LUT_BITS", "6"))
+# Pixels with alpha below this are transparent after quantization
+ALPHA_THRESHOLD = 128
+
+RGB = Tuple[int, int, int]
+
+
+class PaletteLUT:
+    """Nearest-palette-color lookup table over RGB bins.
+
+    Every bin center is matched to the closest palette color in OKLab once,
+    so quantizing an image afterwards is one table lookup per pixel.
+    """
+
+    def __init__(self, colors: Sequence[RGB], bits: int = LUT_BITS):
+        if np is None:
+            raise RuntimeError("NumPy is required: pip install numpy")
+        if not colors:
+            raise RuntimeError("palette has no colors")
+        if len(colors) > 65535:
+            raise RuntimeError("palette too large")
+        self.bits = max(1, min(8, int(bits)))
+        self.colors = np.array(colors, dtype=np.uint8).reshape(-1, 3)
+        self.table = self._build()
+
+    def _build(self) -> "np.ndarray":
+        n = 1 << self.bits
+        step = 256 // n
+        centers = np.arange(n, dtype=np.float32) * step + (step - 1) / 2.0
+        grid = np.stack(np.meshgrid(centers, centers, centers, indexing="ij"), axis=-1).reshape(-1, 3)
+        pal = srgb_to_oklab(self.colors)
+        dtype = np.uint8 if len(self.colors) <= 256 else np.uint16
+        table = np.empty(len(grid), dtype=dtype)
+        # Chunked so the distance matrix stays small for large palettes
+        chunk = max(1, (1 << 22) // len(pal))
+        for start in range(0, len(grid), chunk):
+            lab = srgb_to_oklab(grid[start : start + chunk])
+            dist = ((lab[:, None, :] - pal[None, :, :]) ** 2).sum(axis=2)
+            table[start : start + chunk] = dist.argmin(axis=1)
+        return table.reshape(n, n, n)
+
+    def lookup(self, rgb: "np.ndarray") -> "np.ndarray":
+        """Map (..., 3) uint8 colors to palette indices."""
+        shift = 8 - self.bits
+        return self.table[rgb[..., 0] >> shift, rgb[..., 1] >> shift, rgb[..., 2] >> shift]
+
+    def remap(self, pixels: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray"]:
+        """Quantize (h, w, 4) RGBA; returns (indices, opaque mask)."""
+        return self.lookup(pixels[..., :3]), pixels[..., 3] >= ALPHA_THRESHOLD
+
+    def apply(self, pixels: "np.ndarray") -> "np.ndarray":
+        """Quantize (h, w, 4) RGBA to palette colors; transparent stays transparent."""
+        indices, opaque = self.remap(pixels)
+        return self.colorize(indices, opaque)
+
+    def colorize(self, indices: "np.ndarray", opaque: "np.ndarray") -> "np.ndarray":
+        """Build RGBA pixels from palette indices and an opaque mask."""
+        out = np.zeros(indices.shape + (4,), dtype=np.uint8)
+        out[..., :3] = self.colors[indices]
+        out[..., 3] = 255
+        out[~opaque] = 0
+        return out
+
+
+@functools.lru_cache(maxsize=8)
+def get_palette_lut(colors: Tuple[RGB, ...], bits: int = LUT_BITS) -> PaletteLUT:
+    """PaletteLUT memoized per palette (least recently used are evicted)."""
+    return PaletteLUT(colors, bits)
+
+
+def adaptive_palette(frames: List["np.ndarray"], colors: int, max_samples: int = 1 << 20) -> Tuple[RGB, ...]:
+    """Build one median-cut palette from the opaque pixels of all frames.
+
+    Sharing a palette across frames keeps colors stable in animations.
+    """
+    if Image is None:
+        raise RuntimeError("Pillow is required: pip install Pillow")
+    samples = np.concatenate([f[f[..., 3] >= ALPHA_THRESHOLD][:, :3] for f in frames])
+    if len(samples) == 0:
+        return ((0, 0, 0),)
+    if len(samples) > max_samples:
+        samples = samples[:: -(-len(samples) // max_samples)]
+    strip = Image.fromarray(np.ascontiguousarray(samples).reshape(1, -1, 3), "RGB")
+    quantized = strip.quantize(colors=max(1, min(256, colors)), dither=Image.Dither.NONE)
+    used = np.unique(np.asarray(quantized)).tolist()
+    flat = quantized.getpalette()
+    return tuple((flat[i * 3], flat[i * 3 + 1], flat[i * 3 + 2]) for i in used)
+
+
+def srgb_to_oklab(rgb: "np.ndarray") -> "np.ndarray":
+    """Convert (..., 3) sRGB values in 0-255 to OKLab."""
+    c = np.asarray(rgb, dtype=np.float32) / 255.0
+    linear = np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+    lms = linear @ np.array(
+        [
+            [0.4122214708, 0.2119034982, 0.0883024619],
+            [0.5363325363, 0.6806995451, 0.2817188376],
+            [0.0514459929, 0.1073969566, 0.6299787005],
+        ],
+        dtype=np.float32,
+    )
+    lms = np.cbrt(lms)
+    return lms @ np.array(
+        [
+            [0.2104542553, 1.9779984951, 0.0259040371],
+            [0.7936177850, -2.4285922050, 0.7827717662],
+            [-0.0040720468, 0.4505937099, -0.8086757660],
+        ],
+        dtype=np.float32,
+    )
+
+
+def resolve_palette(value: Any, bridge_call: Callable) -> Optional[Tuple[RGB, ...]]:
+    """Turn a palette argument into a tuple of opaque RGB colors.
+
+    Accepts a Pixelorama palette name ("current" for the selected one) or an
+    explicit list of colors. Fully transparent palette entries are skipped.
+    Returns None when no palette was requested.
+    """
+    if value is None or value == "" or value is False:
+        return None
+    if isinstance(value, str):
+        params = {} if value == "current" else {"name": value}
+        entries = [c["color"] for c in bridge_call("palette.get", params).get("colors", [])]
+    elif isinstance(value, list):
+        entries = value
+    else:
+        raise RuntimeError("palette must be a palette name or a list of colors")
+    colors = {}  # ordered set
+    for entry in entries:
+        r, g, b, a = parse_color(entry)
+        if a > 0:
+            colors[(r, g, b)] = None
+    if not colors:
+        raise RuntimeError("palette has no opaque colors")
+    return tuple(colors)
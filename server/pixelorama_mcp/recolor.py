@@ -0,0 +1,153 @@
+from typing import Any, Dict, List, Tuple
+
+from .colors import parse_color
+from .tiling import read_region, write_region
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # NumPy optional; handle_replace_colors will fail gracefully
+
+
+def handle_replace_colors(args: Dict[str, Any], bridge) -> Dict[str, Any]:
+    """Replace many colors at once across frame and layer ranges.
+
+    Each cel is fetched once as raw RGBA, remapped with whole-array NumPy
+    operations and written back only if something changed (and only the
+    bounding box of the changed pixels).
+    """
+    if np is None:
+        raise RuntimeError("NumPy is required: pip install numpy")
+
+    pairs = parse_mapping(args.get("mapping"))
+    tolerance = float(args.get("tolerance", 0.0))
+    info = bridge.call("project.info", {})
+    width, height = info["size"]
+    frames = parse_index_selection(args.get("frames"), info["frames"], info["current_frame"])
+    layers = parse_index_selection(args.get("layers"), info["layers"], info["current_layer"])
+
+    cels_changed = 0
+    pixels_changed = 0
+    skipped = []
+    for frame in frames:
+        for layer in layers:
+            cel = {"frame": frame, "layer": layer}
+            try:
+                buf = read_region(bridge, 0, 0, width, height, cel)
+            except RuntimeError as exc:
+                # Group, 3D and other non-pixel cels cannot be recolored
+                if "invalid_cel" not in str(exc):
+                    raise
+                skipped.append([frame, layer])
+                continue
+            pixels = np.frombuffer(buf, dtype=np.uint8).reshape(height, width, 4)
+            out, changed = remap_colors(pixels, pairs, tolerance)
+            count = int(changed.sum())
+            if count == 0:
+                continue
+            rows = np.flatnonzero(changed.any(axis=1))
+            cols = np.flatnonzero(changed.any(axis=0))
+            y0, y1 = int(rows[0]), int(rows[-1]) + 1
+            x0, x1 = int(cols[0]), int(cols[-1]) + 1
+            patch = np.ascontiguousarray(out[y0:y1, x0:x1])
+            write_region(bridge, x0, y0, x1 - x0, y1 - y0, patch.tobytes(), cel)
+            cels_changed += 1
+            pixels_changed += count
+
+    return {
+        "cels_scanned": len(frames) * len(layers) - len(skipped),
+        "cels_changed": cels_changed,
+        "pixels_changed": pixels_changed,
+        "skipped": skipped,
+    }
+
+
+def remap_colors(pixels: "np.ndarray", pairs: List[Tuple[tuple, tuple]], tolerance: float = 0.0) -> tuple:
+    """Map colors in an (h, w, 4) uint8 array; returns (new pixels, changed mask).
+
+    Exact matching packs each pixel into a uint32 and resolves every mapping
+    entry in one sorted lookup. With a tolerance, entries are applied in
+    order and the first matching entry wins, like repeated
+    pixel.replace_color calls would.
+    """
+    h, w, _ = pixels.shape
+    if tolerance <= 0.0:
+        packed = np.ascontiguousarray(pixels).view("<u4").reshape(h, w)
+        src = np.array([_pack(f) for f, _ in pairs], dtype="<u4")
+        dst = np.array([_pack(t) for _, t in pairs], dtype="<u4")
+        # First occurrence wins for duplicated "from" colors
+        src, first = np.unique(src, return_index=True)
+        dst = dst[first]
+        pos = np.clip(np.searchsorted(src, packed), 0, len(src) - 1)
+        matched = src[pos] == packed
+        out = np.where(matched, dst[pos], packed)
+        changed = matched & (out != packed)
+        return out.view(np.uint8).reshape(h, w, 4), changed
+
+    limit = tolerance * 255.0 + 1e-6
+    signed = pixels.astype(np.int16)
+    out = pixels.copy()
+    remaining = np.ones((h, w), dtype=bool)
+    for from_color, to_color in pairs:
+        diff = np.abs(signed - np.array(from_color, dtype=np.int16))
+        hit = remaining & (diff <= limit).all(axis=2)
+        out[hit] = to_color
+        remaining &= ~hit
+    changed = (out != pixels).any(axis=2)
+    return out, changed
+
+
+def _pack(rgba: tuple) -> int:
+    # Matches a little-endian uint32 ("<u4") view of RGBA8 bytes
+    r, g, b, a = rgba
+    return r | (g << 8) | (b << 16) | (a << 24)
+
+
+def parse_mapping(value: Any) -> List[Tuple[tuple, tuple]]:
+    """Accept [{"from": c, "to": c}, ...] or [[from, to], ...]."""
+    if isinstance(value, dict):
+        value = [value]
+    if not isinstance(value, list) or not value:
+        raise RuntimeError("mapping must be a non-empty array of {from, to}")
+    pairs = []
+    for item in value:
+        if isinstance(item, dict) and "from" in item and "to" in item:
+            pairs.append((parse_color(item["from"]), parse_color(item["to"])))
+        elif isinstance(item, (list, tuple)) and len(item) == 2:
+            pairs.append((parse_color(item[0]), parse_color(item[1])))
+        else:
+            raise RuntimeError(f"invalid mapping entry: {item!r}")
+    return pairs
+
+
+def parse_index_selection(value: Any, count: int, current: int) -> List[int]:
+    """Resolve a frame/layer selection to a sorted list of valid indices.
+
+    Accepts None (current), "all", an index, "a-b" (inclusive) or a list
+    mixing indices and "a-b" ranges. Indices and both range ends must be in
+    range, and a range must not be reversed.
+    """
+    if value is None:
+        return [current]
+    if value == "all":
+        return list(range(count))
+    items = value if isinstance(value, list) else [value]
+    selected = set()
+    for item in items:
+        if isinstance(item, str) and "-" in item.strip("-"):
+            start_s, end_s = item.split("-", 1)
+            try:
+                start, end = int(start_s), int(end_s)
+            except ValueError:
+                raise RuntimeError(f"invalid range: {item!r}") from None
+            if start < 0 or end >= count:
+                raise RuntimeError(f"range out of range: {item} (0-{count - 1})")
+            if start > end:
+                raise RuntimeError(f"reversed range: {item}")
+            selected.update(range(start, end + 1))
+        else:
+            idx = int(item)
+            if idx < 0 or idx >= count:
+                raise RuntimeError(f"index out of range: {idx}")
+            selected.add(idx)
+    return sorted(selected)
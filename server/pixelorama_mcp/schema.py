@@ -0,0 +1,187 @@
+import json
+import re
+from typing import Any, Callable, Dict, List
+
+# Compiled form of a JSON schema: takes a value and its path (for error
+# messages) and returns the value, coerced where the schema allows it.
+Validator = Callable[[Any, str], Any]
+
+_INT_RE = re.compile(r"^-?\d+$")
+_NUMBER_RE = re.compile(r"^-?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$")
+
+
+class SchemaError(RuntimeError):
+    """A tool call whose arguments do not match the tool's inputSchema."""
+
+
+def compile_tools(tools: List[Dict[str, Any]]) -> Dict[str, Validator]:
+    """Compile every tool's inputSchema; keyed by tool name."""
+    return {tool["name"]: compile_schema(tool["inputSchema"]) for tool in tools}
+
+
+def compile_schema(schema: Dict[str, Any]) -> Validator:
+    """Turn the subset of JSON schema used in tools.py into a validator.
+
+    Supported: type (single or list), properties, required,
+    additionalProperties (bool), items, enum, minimum, minItems.
+
+    MCP clients may JSON-encode non-primitive arguments as strings
+    ('"[255,0,0,255]"', '"{\\"r\\":1}"', '"\\"#ff0000\\""'). Such strings
+    are decoded only where the schema accepts an array, an object or a
+    string; numeric and boolean strings are converted where the schema
+    accepts a number or boolean but not a string. Any other string,
+    e.g. base64 image data, is passed through untouched.
+    """
+    types = schema.get("type")
+    if isinstance(types, str):
+        types = [types]
+    types = tuple(types or ())
+    checks: List[Validator] = []
+
+    if types:
+        checks.append(_type_check(types))
+    if "enum" in schema:
+        checks.append(_enum_check(schema["enum"]))
+    if "minimum" in schema:
+        checks.append(_minimum_check(schema["minimum"]))
+    if "properties" in schema or "required" in schema or schema.get("additionalProperties") is False:
+        checks.append(_object_check(schema))
+    if "items" in schema or "minItems" in schema:
+        checks.append(_array_check(schema))
+
+    def validate(value: Any, path: str) -> Any:
+        for check in checks:
+            value = check(value, path)
+        return value
+
+    return validate
+
+
+def _type_name(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        return "integer"
+    if isinstance(value, float):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, list):
+        return "array"
+    if isinstance(value, dict):
+        return "object"
+    return type(value).__name__
+
+
+def _matches(value: Any, types: tuple) -> bool:
+    name = _type_name(value)
+    if name in types:
+        return True
+    if name == "integer" and "number" in types:
+        return True
+    # JSON has no integer type; 3.0 is a valid integer
+    return name == "number" and "integer" in types and value.is_integer()
+
+
+def _type_check(types: tuple) -> Validator:
+    decode_array = "array" in types
+    decode_object = "object" in types
+    decode_string = "string" in types
+    # Numeric/boolean strings are only ambiguous when strings are allowed
+    coerce_scalar = not decode_string and any(t in types for t in ("integer", "number", "boolean"))
+    expected = " or ".join(types)
+
+    def check(value: Any, path: str) -> Any:
+        if isinstance(value, str) and value:
+            first = value[0]
+            if (first == "[" and decode_array) or (first == "{" and decode_object) or (first == '"' and decode_string):
+                try:
+                    decoded = json.loads(value)
+                except ValueError:
+                    decoded = None
+                if decoded is not None and _matches(decoded, types):
+                    value = decoded
+            elif coerce_scalar:
+                value = _coerce_scalar(value, types)
+        if not _matches(value, types):
+            raise SchemaError(f"{path}: expected {expected}, got {_type_name(value)}")
+        if isinstance(value, float) and "number" not in types:
+            value = int(value)
+        return value
+
+    return check
+
+
+def _coerce_scalar(value: str, types: tuple) -> Any:
+    text = value.strip()
+    if "boolean" in types and text in ("true", "false"):
+        return text == "true"
+    if "integer" in types and _INT_RE.match(text):
+        return int(text)
+    if "number" in types and _NUMBER_RE.match(text):
+        return float(text)
+    return value
+
+
+def _enum_check(options: list) -> Validator:
+    allowed = ", ".join(str(o) for o in options)
+
+    def check(value: Any, path: str) -> Any:
+        if value not in options:
+            raise SchemaError(f"{path}: must be one of: {allowed}")
+        return value
+
+    return check
+
+
+def _minimum_check(minimum: float) -> Validator:
+    def check(value: Any, path: str) -> Any:
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and value < minimum:
+            raise SchemaError(f"{path}: must be >= {minimum}")
+        return value
+
+    return check
+
+
+def _object_check(schema: Dict[str, Any]) -> Validator:
+    properties = {key: compile_schema(sub) for key, sub in schema.get("properties", {}).items()}
+    required = tuple(schema.get("required", ()))
+    closed = schema.get("additionalProperties") is False
+
+    def check(value: Any, path: str) -> Any:
+        if not isinstance(value, dict):
+            return value  # type errors are reported by the type check
+        for key in required:
+            if key not in value:
+                raise SchemaError(f"{path}: missing required property '{key}'")
+        out = {}
+        for key, item in value.items():
+            sub = properties.get(key)
+            if sub is not None:
+                out[key] = sub(item, f"{path}.{key}")
+            elif closed:
+                known = ", ".join(properties) or "none"
+                raise SchemaError(f"{path}: unknown property '{key}' (allowed: {known})")
+            else:
+                out[key] = item
+        return out
+
+    return check
+
+
+def _array_check(schema: Dict[str, Any]) -> Validator:
+    items = compile_schema(schema["items"]) if "items" in schema else None
+    min_items = schema.get("minItems", 0)
+
+    def check(value: Any, path: str) -> Any:
+        if not isinstance(value, list):
+            return value
+        if len(value) < min_items:
+            raise SchemaError(f"{path}: expected at least {min_items} items, got {len(value)}")
+        if items is None:
+            return value
+        return [items(item, f"{path}[{i}]") for i, item in enumerate(value)]
+
+    return check
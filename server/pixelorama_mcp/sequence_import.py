@@ -0,0 +1,206 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .dither import parse_dither
+from .image_utils import FRAME_WORKERS, MAX_DECODE_PIXELS, _quantize_frame, map_ordered, report_progress
+from .quantize import resolve_palette
+from .tiling import PIPELINE_WINDOW, region_calls
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None  # Pillow optional; handle_import_sequence will fail gracefully
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # NumPy optional; only needed with a palette
+
+Box = Tuple[int, int, int, int]
+
+
+def handle_import_sequence(
+    args: Dict[str, Any], bridge, progress: Optional[Callable] = None
+) -> Dict[str, Any]:
+    """Import an image sequence as frames, decoding on the server.
+
+    Files are checked up front, decoded (and optionally trimmed/resized) in
+    a thread pool, and streamed to the bridge as raw set_region tiles with a
+    bounded in-flight window. Pixelorama only blits pixels, so the editor
+    stays responsive during large imports. With a palette, frames are mapped
+    onto it in the decode workers through the shared palette LUT.
+    """
+    if Image is None:
+        raise RuntimeError("Pillow is required: pip install Pillow")
+    paths = args.get("paths")
+    if not isinstance(paths, list) or not paths:
+        raise RuntimeError("paths must be a non-empty array")
+    paths = [str(p) for p in paths]
+    mode = str(args.get("mode", "new_project")).lower()
+    if mode not in ("new_project", "append_frames"):
+        raise RuntimeError("mode must be new_project or append_frames")
+    fps = float(args.get("fps", 0.0))
+    durations_ms = args.get("durations_ms") or []
+    trim = bool(args.get("trim", False))
+    dedupe = bool(args.get("dedupe", True))
+    palette = resolve_palette(args.get("palette"), bridge.call)
+    dither = parse_dither(args.get("dither", False))
+    if palette is not None and np is None:
+        raise RuntimeError("NumPy is required: pip install numpy")
+    workers = max(1, min(FRAME_WORKERS, len(paths)))
+    total = len(paths) * (2 if trim or args.get("validate") else 1)
+    done = 0
+
+    sizes = check_headers(paths)
+    with ThreadPoolExecutor(workers) as pool:
+        box: Optional[Box] = (0, 0) + sizes[0]
+        if trim or args.get("validate"):
+            # Full decode before touching the project; trim needs the union
+            # of all content boxes so frames stay aligned.
+            box = None
+            for bbox in map_ordered(pool, _content_box, paths, workers * 2):
+                if trim and bbox is not None:
+                    box = bbox if box is None else _union(box, bbox)
+                done += 1
+                report_progress(progress, done, total, "decode")
+            if not trim:
+                box = (0, 0) + sizes[0]
+            elif box is None:
+                raise RuntimeError("all frames are fully transparent")
+        src_size = (box[2] - box[0], box[3] - box[1])
+        size = src_size
+        if args.get("width") or args.get("height"):
+            size = _target_size(src_size, args.get("width"), args.get("height"), args.get("keep_aspect", True))
+
+        if mode == "new_project":
+            name = args.get("name") or os.path.splitext(os.path.basename(paths[0]))[0]
+            bridge.call("project.create", {"name": name, "width": size[0], "height": size[1]})
+            info = bridge.call("project.info", {})
+            first_frame = 0
+            layer = 0
+            if len(paths) > 1:
+                bridge.call("frame.add", {"after": 0, "count": len(paths) - 1})
+        else:
+            info = bridge.call("project.info", {})
+            first_frame = info["frames"]
+            layer = max(0, min(int(args.get("layer", 0)), info["layers"] - 1))
+            bridge.call("frame.add", {"after": first_frame - 1, "count": len(paths)})
+        canvas = tuple(info["size"])
+
+        # Frames with the same pixels are uploaded once and linked afterwards;
+        # fully transparent frames are already blank and only get linked.
+        groups: Dict[Any, List[int]] = {}
+
+        def calls() -> Iterator[Tuple[str, Dict[str, Any]]]:
+            nonlocal done
+            if fps > 0:
+                yield "animation.fps.set", {"fps": fps}
+            tasks = ((p, box, size, canvas, dedupe, palette, dither) for p in paths)
+            for i, (w, h, raw, key) in enumerate(map_ordered(pool, _load_frame, tasks, workers * 2)):
+                frame = first_frame + i
+                if not dedupe:
+                    key = frame
+                group = groups.setdefault(key, [])
+                group.append(frame)
+                if len(group) == 1 and key is not None:
+                    yield from region_calls(0, 0, w, h, raw, {"frame": frame, "layer": layer})
+                done += 1
+                report_progress(progress, done, total, "upload")
+            for group in groups.values():
+                if len(group) > 1:
+                    yield "cel.link", {"layer": layer, "frames": group}
+            # Durations last: they are stored in frames relative to the fps
+            for i, ms in enumerate(durations_ms[: len(paths)]):
+                yield "animation.frame_duration.set", {"frame": first_frame + i, "duration_ms": float(ms)}
+
+        for _ in bridge.call_stream(calls(), PIPELINE_WINDOW):
+            pass
+
+    result = bridge.call("project.info", {})
+    result.update(
+        {
+            "imported": len(paths),
+            "uploaded": sum(1 for key in groups if key is not None),
+            "linked": sum(len(group) - 1 for group in groups.values()),
+            "first_frame": first_frame,
+            "layer": layer,
+        }
+    )
+    if palette is not None:
+        result["palette_colors"] = len(palette)
+    if trim:
+        result["trim_box"] = list(box)
+    return result
+
+
+def check_headers(paths: List[str]) -> List[Tuple[int, int]]:
+    """Open every file without decoding pixels; report all bad files at once."""
+    sizes = []
+    errors = []
+    for path in paths:
+        try:
+            with Image.open(path) as img:
+                width, height = img.size
+        except (OSError, ValueError) as exc:
+            errors.append(f"{path}: {exc}")
+            continue
+        if width * height > MAX_DECODE_PIXELS:
+            errors.append(f"{path}: {width}x{height} exceeds PIXELORAMA_MAX_DECODE_PIXELS ({MAX_DECODE_PIXELS})")
+        sizes.append((width, height))
+    if errors:
+        more = f" (and {len(errors) - 5} more)" if len(errors) > 5 else ""
+        raise RuntimeError("cannot load: " + "; ".join(errors[:5]) + more)
+    return sizes
+
+
+def frame_key(raw: bytes) -> Optional[bytes]:
+    """Content key of an RGBA8 frame; None when it is fully transparent."""
+    if not raw[3::4].strip(b"\x00"):
+        return None
+    return hashlib.blake2b(raw, digest_size=16).digest()
+
+
+def _open_rgba(path: str) -> "Image.Image":
+    try:
+        with Image.open(path) as img:
+            return img.convert("RGBA")
+    except (OSError, ValueError) as exc:
+        raise RuntimeError(f"cannot load {path}: {exc}") from exc
+
+
+def _content_box(path: str) -> Optional[Box]:
+    return _open_rgba(path).getchannel("A").getbbox()
+
+
+def _load_frame(task: tuple) -> Tuple[int, int, bytes, Optional[bytes]]:
+    """Decode one file, crop, resize, clip to the canvas and map onto the palette."""
+    path, box, size, canvas, dedupe, palette, dither = task
+    img = _open_rgba(path)
+    if box != (0, 0) + img.size:
+        img = img.crop(box)
+    if img.size != size:
+        img = img.resize(size, Image.NEAREST)
+    width = min(img.width, canvas[0])
+    height = min(img.height, canvas[1])
+    if (width, height) != img.size:
+        img = img.crop((0, 0, width, height))
+    if palette is not None:
+        raw = _quantize_frame((np.asarray(img), palette, dither)).tobytes()
+    else:
+        raw = img.tobytes()
+    return width, height, raw, frame_key(raw) if dedupe else None
+
+
+def _target_size(src: Tuple[int, int], width: Any, height: Any, keep_aspect: bool) -> Tuple[int, int]:
+    """Resize target; a missing side follows the aspect ratio."""
+    src_w, src_h = src
+    if not keep_aspect and width and height:
+        return int(width), int(height)
+    ratio = min(int(width) / src_w if width else float("inf"), int(height) / src_h if height else float("inf"))
+    return max(1, int(src_w * ratio)), max(1, int(src_h * ratio))
+
+
+def _union(a: Box, b: Box) -> Box:
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
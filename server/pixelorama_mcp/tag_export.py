@@ -0,0 +1,221 @@
+import multiprocessing
+import os
+import string
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional
+
+from .atlas import snapshot_frames, trim_box
+from .dither import parse_dither
+from .image_utils import FRAME_WORKERS, apply_direction, map_ordered, report_progress, save_gif
+from .quantize import resolve_palette
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None  # Pillow optional; handle_export_all_tags will fail gracefully
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # NumPy optional; handle_export_all_tags will fail gracefully
+
+EXPORT_FORMATS = ("gif", "apng", "spritesheet")
+_SUFFIXES = {"gif": ".gif", "apng": ".png", "spritesheet": "_sheet.png"}
+
+# Unique frames as one (n, h, w, 4) array; in worker processes a view of
+# the parent's shared memory block, attached once by the pool initializer
+_FRAMES: Optional["np.ndarray"] = None
+_SHM: Optional[shared_memory.SharedMemory] = None
+
+
+def handle_export_all_tags(args: Dict[str, Any], bridge, progress: Optional[Callable] = None) -> Dict[str, Any]:
+    """Export every animation tag to its own file(s).
+
+    Each frame used by any selected tag is blended once (frame.snapshot)
+    into a shared memory block that worker processes attach to once; each
+    task names one tag's frame slots and writes all of its formats. Cost
+    and IPC volume grow with unique frames, not with tags x formats.
+    """
+    if Image is None:
+        raise RuntimeError("Pillow is required: pip install Pillow")
+    if np is None:
+        raise RuntimeError("NumPy is required: pip install numpy")
+    out_dir = args.get("dir")
+    if not out_dir:
+        raise RuntimeError("dir is required")
+    formats = args.get("formats") or ["gif"]
+    if isinstance(formats, str):
+        formats = [formats]
+    for fmt in formats:
+        if fmt not in EXPORT_FORMATS:
+            raise RuntimeError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    direction = args.get("direction", "forward")
+    trim = bool(args.get("trim", False))
+    scale = max(1, int(args.get("scale", 1)))
+    palette = resolve_palette(args.get("palette"), bridge.call)
+    dither = parse_dither(args["dither"]) if "dither" in args else None
+
+    tags = bridge.call("animation.tags.list", {}).get("tags", [])
+    wanted = args.get("tags")
+    if wanted:
+        # Tag names need not be unique; a name selects every tag that has it
+        by_name: Dict[str, List[Dict[str, Any]]] = {}
+        for t in tags:
+            by_name.setdefault(t["name"], []).append(t)
+        missing = [name for name in wanted if name not in by_name]
+        if missing:
+            raise RuntimeError(f"animation tag not found: {', '.join(missing)}")
+        tags = [t for name in dict.fromkeys(wanted) for t in by_name[name]]
+    if not tags:
+        raise RuntimeError("project has no animation tags")
+
+    fps = float(bridge.call("animation.fps.get", {}).get("fps") or 10)
+    durations = {f["index"]: f.get("duration", 1.0) for f in bridge.call("frame.list", {}).get("frames", [])}
+    # Pixelorama tags are 1-indexed inclusive ranges
+    sequences = [apply_direction(list(range(t["from"] - 1, t["to"])), direction) for t in tags]
+
+    unique = sorted({i for seq in sequences for i in seq})
+    if not unique:
+        raise RuntimeError("selected tags have no frames")
+    slots = {frame: n for n, frame in enumerate(unique)}
+    total = len(unique) + len(tags) * len(formats)
+    bases = output_names(tags, args.get("name_template", "{tag}"), out_dir)
+    tasks = []
+    for seq, base in zip(sequences, bases):
+        os.makedirs(os.path.dirname(os.path.join(out_dir, base)) or ".", exist_ok=True)
+        ms = [max(10, int(round(durations.get(i, 1.0) / fps * 1000))) for i in seq]
+        paths = [(fmt, os.path.join(out_dir, base + _SUFFIXES[fmt])) for fmt in formats]
+        tasks.append(([slots[i] for i in seq], ms, paths, trim, scale, palette, dither))
+
+    global _FRAMES
+    workers = max(1, min(FRAME_WORKERS, len(tasks)))
+    shm = None
+    pool = None
+    frames = None
+    outputs = []
+    try:
+        for n, pixels in enumerate(snapshot_frames(bridge, unique)):
+            if frames is None:
+                shape = (len(unique),) + pixels.shape
+                if workers > 1:
+                    shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape))))
+                    frames = np.ndarray(shape, np.uint8, buffer=shm.buf)
+                else:
+                    frames = np.empty(shape, np.uint8)
+            frames[n] = pixels
+            report_progress(progress, n + 1, total, "render")
+
+        if shm is not None:
+            pool = ProcessPoolExecutor(
+                workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_attach_frames,
+                initargs=(shm.name, frames.shape),
+            )
+        else:
+            _FRAMES = frames
+        for n, written in enumerate(map_ordered(pool, _encode_tag, tasks, workers * 2)):
+            for fmt, path in written:
+                outputs.append({"tag": tags[n]["name"], "format": fmt, "path": path})
+            report_progress(progress, len(unique) + (n + 1) * len(formats), total, "encode")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        _FRAMES = None
+        frames = None  # release the view before closing the block
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+    return {
+        "ok": True,
+        "tags": len(tags),
+        "unique_frames": len(unique),
+        "frames_total": sum(len(seq) for seq in sequences),
+        "outputs": outputs,
+    }
+
+
+def output_names(tags: List[Dict[str, Any]], template: str, out_dir: str) -> List[str]:
+    """File base name per tag from name_template, unique and inside out_dir.
+
+    Tags whose names sanitize to the same string (or are equal) get a
+    numeric suffix instead of overwriting each other's files.
+    """
+    try:
+        fields = [field for _, field, _, _ in string.Formatter().parse(template) if field is not None]
+    except ValueError as exc:
+        raise RuntimeError(f"invalid name_template: {exc}") from exc
+    if any(field != "tag" for field in fields):
+        raise RuntimeError("name_template may only use the {tag} field")
+    root = os.path.realpath(out_dir)
+    bases = []
+    used = set()
+    for tag in tags:
+        base = template.format(tag=_safe_name(tag["name"]))
+        candidate = base
+        n = 2
+        # Compare case-insensitively: macOS/Windows file systems are
+        # case-insensitive by default
+        while candidate.lower() in used:
+            candidate = f"{base}_{n}"
+            n += 1
+        used.add(candidate.lower())
+        path = os.path.realpath(os.path.join(root, candidate))
+        if not candidate or os.path.commonpath([root, path]) != root or path == root:
+            raise RuntimeError(f"name_template gives a path outside dir: {candidate!r}")
+        bases.append(candidate)
+    return bases
+
+
+def _attach_frames(name: str, shape: tuple) -> None:
+    """Pool initializer: map the parent's frame block into this worker."""
+    global _FRAMES, _SHM
+    try:
+        # The parent owns the block; keep the tracker from unlinking it
+        _SHM = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        _SHM = shared_memory.SharedMemory(name=name)
+    _FRAMES = np.ndarray(shape, np.uint8, buffer=_SHM.buf)
+
+
+def _encode_tag(task: tuple) -> List[tuple]:
+    """Write every requested format of one tag; returns [(format, path)]."""
+    slots, durations_ms, paths, trim, scale, palette, dither = task
+    frames = _prepare([_FRAMES[i] for i in slots], trim, scale)
+    images = None
+    for fmt, path in paths:
+        if fmt == "spritesheet":
+            # One row per tag
+            Image.fromarray(np.concatenate(frames, axis=1), "RGBA").save(path, format="PNG")
+            continue
+        if images is None:
+            images = [Image.fromarray(f, "RGBA") for f in frames]
+        if fmt == "gif":
+            save_gif(images, durations_ms, path, palette, dither)
+        else:
+            images[0].save(
+                path, format="PNG", save_all=True, append_images=images[1:], duration=durations_ms, loop=0
+            )
+    return paths
+
+
+def _prepare(frames: List["np.ndarray"], trim: bool, scale: int) -> List["np.ndarray"]:
+    """Crop all frames to their common used rect and scale them up (nearest)."""
+    if trim:
+        boxes = [trim_box(f) for f in frames if f[..., 3].any()]
+        if boxes:
+            x0 = min(b[0] for b in boxes)
+            y0 = min(b[1] for b in boxes)
+            x1 = max(b[2] for b in boxes)
+            y1 = max(b[3] for b in boxes)
+            frames = [f[y0:y1, x0:x1] for f in frames]
+    if scale > 1:
+        frames = [f.repeat(scale, axis=0).repeat(scale, axis=1) for f in frames]
+    return frames
+
+
+def _safe_name(name: str) -> str:
+    safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in name.strip())
+    return safe or "tag"
@@ -0,0 +1,218 @@
+import base64
+import io
+from typing import Any, Dict, List, Tuple
+
+from .image_utils import load_image
+from .tiling import PIPELINE_WINDOW
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None  # Pillow optional; handle_tilemap_from_image will fail gracefully
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # NumPy optional; handle_tilemap_from_image will fail gracefully
+
+# Limits per bridge request, so no single line gets huge on large levels
+_ATLAS_CHUNK_TILES = 1024
+_CELLS_PER_CHUNK = 65536
+
+# Cell flag bits, as used by tilemap.cells.set_region
+FLIP_H = 1
+FLIP_V = 2
+TRANSPOSE = 4
+
+
+def handle_tilemap_from_image(args: Dict[str, Any], bridge) -> Dict[str, Any]:
+    """Turn an image into a tileset of unique tiles plus a tilemap layer.
+
+    The image is sliced into tile-sized NumPy views and deduplicated by
+    content, so only unique tiles are uploaded (as PNG atlases) and the map
+    itself is sent as packed cell arrays.
+    """
+    if Image is None:
+        raise RuntimeError("Pillow is required: pip install Pillow")
+    if np is None:
+        raise RuntimeError("NumPy is required: pip install numpy")
+
+    tile_w, tile_h = _parse_tile_size(args.get("tile_size", 16))
+    match_flips = bool(args.get("match_flips", False))
+    img = load_image(args).convert("RGBA")
+    grid = slice_tiles(np.asarray(img), tile_w, tile_h)
+    rows, cols = grid.shape[:2]
+    tiles, cell_tiles, cell_flags = dedupe_tiles(grid, match_flips)
+
+    if args.get("new_project", True):
+        bridge.call(
+            "project.create",
+            {
+                "name": args.get("project_name", "tilemap"),
+                "width": cols * tile_w,
+                "height": rows * tile_h,
+            },
+        )
+    info = bridge.call("project.info", {})
+    frame = int(args.get("frame", info["current_frame"]))
+    layer = info["layers"]  # the tilemap layer is appended on top
+    bridge.call(
+        "layer.add",
+        {
+            "above": layer - 1,
+            "type": "tilemap",
+            "name": args.get("layer_name", "Tilemap"),
+            "tile_size": [tile_w, tile_h],
+            "tileset_name": args.get("tileset_name", ""),
+        },
+    )
+    tileset_index = len(bridge.call("tilemap.tileset.list", {})["tilesets"]) - 1
+
+    first_index = upload_tiles(bridge, tileset_index, tiles, tile_w, tile_h)
+    # Cell index 0 is the tileset's empty tile; unique tiles follow it
+    indices = np.where(cell_tiles < 0, 0, cell_tiles + first_index).astype("<i4")
+    write_cells(bridge, frame, layer, indices, cell_flags)
+
+    return {
+        "ok": True,
+        "layer": layer,
+        "tileset_index": tileset_index,
+        "tile_size": [tile_w, tile_h],
+        "cells": [cols, rows],
+        "unique_tiles": len(tiles),
+        "empty_cells": int((cell_tiles < 0).sum()),
+    }
+
+
+def slice_tiles(pixels: "np.ndarray", tile_w: int, tile_h: int) -> "np.ndarray":
+    """Return a (rows, cols, tile_h, tile_w, 4) view of an (h, w, 4) image.
+
+    Images that are not a multiple of the tile size are padded with
+    transparent pixels first.
+    """
+    h, w, _ = pixels.shape
+    pad_h = -h % tile_h
+    pad_w = -w % tile_w
+    if pad_h or pad_w:
+        pixels = np.pad(pixels, ((0, pad_h), (0, pad_w), (0, 0)))
+    rows = pixels.shape[0] // tile_h
+    cols = pixels.shape[1] // tile_w
+    return pixels.reshape(rows, tile_h, cols, tile_w, 4).swapaxes(1, 2)
+
+
+def dedupe_tiles(grid: "np.ndarray", match_flips: bool = False) -> Tuple[List["np.ndarray"], "np.ndarray", "np.ndarray"]:
+    """Find unique tiles in a tile grid.
+
+    Returns (unique tiles, per-cell tile number, per-cell flags). Fully
+    transparent cells get tile number -1. With match_flips, flipped (and,
+    for square tiles, transposed) variants share one tile and the cell
+    flags say how to display it.
+    """
+    rows, cols, tile_h, tile_w, _ = grid.shape
+    flat = np.ascontiguousarray(grid).reshape(rows * cols, tile_h * tile_w * 4)
+    keys = flat.view(np.dtype((np.void, flat.shape[1]))).ravel()
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    inverse = inverse.ravel()
+
+    variants = [0, FLIP_H, FLIP_V, FLIP_H | FLIP_V]
+    if tile_w == tile_h:
+        variants += [v | TRANSPOSE for v in variants]
+
+    tiles: List[np.ndarray] = []
+    canonical: Dict[bytes, int] = {}
+    unique_tile = np.empty(len(first), dtype=np.int32)
+    unique_flags = np.zeros(len(first), dtype=np.uint8)
+    for u, src in enumerate(first):
+        tile = flat[src].reshape(tile_h, tile_w, 4)
+        if not tile[..., 3].any():
+            unique_tile[u] = -1
+            continue
+        if not match_flips:
+            unique_tile[u] = len(tiles)
+            tiles.append(tile)
+            continue
+        base = min((transform_tile(tile, v) for v in variants), key=lambda t: t.tobytes())
+        key = base.tobytes()
+        if key not in canonical:
+            canonical[key] = len(tiles)
+            tiles.append(np.ascontiguousarray(base))
+        unique_tile[u] = canonical[key]
+        unique_flags[u] = next(v for v in variants if np.array_equal(transform_tile(base, v), tile))
+
+    cell_tiles = unique_tile[inverse].reshape(rows, cols)
+    cell_flags = unique_flags[inverse].reshape(rows, cols)
+    return tiles, cell_tiles, cell_flags
+
+
+def transform_tile(tile: "np.ndarray", flags: int) -> "np.ndarray":
+    """How a cell displays its tile: transpose first, then flip h / flip v."""
+    if flags & TRANSPOSE:
+        tile = tile.transpose(1, 0, 2)
+    if flags & FLIP_H:
+        tile = tile[:, ::-1]
+    if flags & FLIP_V:
+        tile = tile[::-1]
+    return tile
+
+
+def upload_tiles(bridge, tileset_index: int, tiles: List["np.ndarray"], tile_w: int, tile_h: int) -> int:
+    """Add tiles to a tileset as PNG atlases; returns the first new index."""
+    if not tiles:
+        return 0
+
+    def calls():
+        for start in range(0, len(tiles), _ATLAS_CHUNK_TILES):
+            chunk = tiles[start : start + _ATLAS_CHUNK_TILES]
+            yield "tilemap.tileset.add_tiles", {
+                "tileset_index": tileset_index,
+                "data": _encode_atlas(chunk, tile_w, tile_h),
+                "format": "png",
+                "tile_count": len(chunk),
+            }
+
+    results = list(bridge.call_stream(calls(), PIPELINE_WINDOW))
+    return int(results[0]["first_index"])
+
+
+def _encode_atlas(tiles: List["np.ndarray"], tile_w: int, tile_h: int) -> str:
+    columns = max(1, int(np.ceil(np.sqrt(len(tiles)))))
+    rows = -(-len(tiles) // columns)
+    atlas = np.zeros((rows * columns, tile_h, tile_w, 4), dtype=np.uint8)
+    atlas[: len(tiles)] = tiles
+    atlas = atlas.reshape(rows, columns, tile_h, tile_w, 4).swapaxes(1, 2)
+    img = Image.fromarray(atlas.reshape(rows * tile_h, columns * tile_w, 4), "RGBA")
+    out = io.BytesIO()
+    img.save(out, format="PNG")
+    return base64.b64encode(out.getvalue()).decode("ascii")
+
+
+def write_cells(bridge, frame: int, layer: int, indices: "np.ndarray", flags: "np.ndarray") -> int:
+    """Write (rows, cols) cell arrays with pipelined tilemap.cells.set_region calls."""
+    rows, cols = indices.shape
+    step = max(1, _CELLS_PER_CHUNK // cols)
+
+    def calls():
+        for y in range(0, rows, step):
+            block = slice(y, min(rows, y + step))
+            yield "tilemap.cells.set_region", {
+                "frame": frame,
+                "layer": layer,
+                "cell_x": 0,
+                "cell_y": y,
+                "width": cols,
+                "height": block.stop - y,
+                "indices": base64.b64encode(np.ascontiguousarray(indices[block], dtype="<i4")).decode("ascii"),
+                "flags": base64.b64encode(np.ascontiguousarray(flags[block], dtype=np.uint8)).decode("ascii"),
+            }
+
+    return sum(int(r.get("changed", 0)) for r in bridge.call_stream(calls(), PIPELINE_WINDOW))
+
+
+def _parse_tile_size(value: Any) -> Tuple[int, int]:
+    if isinstance(value, (list, tuple)) and len(value) >= 2:
+        w, h = int(value[0]), int(value[1])
+    else:
+        w = h = int(value)
+    if w <= 0 or h <= 0:
+        raise RuntimeError("tile_size must be > 0")
+    return w, h
@@ -0,0 +1,183 @@
+import base64
+import io
+import os
+from typing import Any, Dict, Iterator, Tuple
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None  # Pillow optional; PNG regions fall back to a single bridge call
+
+# Regions larger than TILE_SIZE x TILE_SIZE are transferred as a stream of
+# raw RGBA tiles instead of one base64 line, so the bridge never encodes more
+# than one tile per request and the client never buffers more than one line.
+TILE_SIZE = int(os.environ.get("PIXELORAMA_TILE_SIZE", "256"))
+PIPELINE_WINDOW = int(os.environ.get("PIXELORAMA_PIPELINE_WINDOW", "4"))
+
+_CEL_KEYS = ("frame", "layer")
+
+
+def iter_tiles(x: int, y: int, width: int, height: int, tile_size: int) -> Iterator[Tuple[int, int, int, int]]:
+    """Yield (x, y, w, h) tiles covering the region in row-major order."""
+    for ty in range(y, y + height, tile_size):
+        th = min(tile_size, y + height - ty)
+        for tx in range(x, x + width, tile_size):
+            tw = min(tile_size, x + width - tx)
+            yield tx, ty, tw, th
+
+
+def _tile_size(args: Dict[str, Any]) -> int:
+    return max(16, int(args.get("tile_size") or TILE_SIZE))
+
+
+def _cel_params(args: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: args[k] for k in _CEL_KEYS if k in args}
+
+
+def handle_get_region(args: Dict[str, Any], bridge) -> Dict[str, Any]:
+    """pixel.get_region, streamed as raw tiles when the region is large."""
+    tile_size = _tile_size(args)
+    params = {k: v for k, v in args.items() if k != "tile_size"}
+    width = int(args.get("width", 0))
+    height = int(args.get("height", 0))
+    fmt = str(args.get("format", "png")).lower()
+    if width * height <= tile_size * tile_size or (fmt != "raw" and Image is None):
+        return bridge.call("pixel.get_region", params)
+
+    x = int(args.get("x", 0))
+    y = int(args.get("y", 0))
+    buf = read_region(bridge, x, y, width, height, _cel_params(args), tile_size)
+    if fmt == "raw":
+        return {
+            "format": "raw",
+            "width": width,
+            "height": height,
+            "image_format": 5,  # Image.FORMAT_RGBA8 on the bridge side
+            "data": base64.b64encode(buf).decode("ascii"),
+        }
+    img = Image.frombuffer("RGBA", (width, height), bytes(buf), "raw", "RGBA", 0, 1)
+    out = io.BytesIO()
+    img.save(out, format="PNG")
+    return {
+        "format": "png",
+        "width": width,
+        "height": height,
+        "data": base64.b64encode(out.getvalue()).decode("ascii"),
+    }
+
+
+def read_region(
+    bridge,
+    x: int,
+    y: int,
+    width: int,
+    height: int,
+    cel: Dict[str, Any],
+    tile_size: int = TILE_SIZE,
+) -> bytearray:
+    """Fetch a region tile by tile into a preallocated RGBA8 buffer."""
+    buf = bytearray(width * height * 4)
+    tiles = list(iter_tiles(x, y, width, height, tile_size))
+    calls = (
+        ("pixel.get_region", dict(cel, x=tx, y=ty, width=tw, height=th, format="raw"))
+        for tx, ty, tw, th in tiles
+    )
+    stride = width * 4
+    for (tx, ty, tw, th), result in zip(tiles, bridge.call_stream(calls, PIPELINE_WINDOW)):
+        raw = base64.b64decode(result["data"])
+        row_bytes = tw * 4
+        dst = (ty - y) * stride + (tx - x) * 4
+        for row in range(th):
+            src = row * row_bytes
+            buf[dst : dst + row_bytes] = raw[src : src + row_bytes]
+            dst += stride
+    return buf
+
+
+def handle_set_region(args: Dict[str, Any], bridge) -> Dict[str, Any]:
+    """pixel.set_region, streamed as raw tiles when the image is large."""
+    tile_size = _tile_size(args)
+    params = {k: v for k, v in args.items() if k != "tile_size"}
+    fmt = str(args.get("format", "png")).lower()
+    data = args.get("data", "")
+    if not data:
+        return bridge.call("pixel.set_region", params)
+
+    if fmt == "raw":
+        width = int(args.get("width", 0))
+        height = int(args.get("height", 0))
+        if width * height <= tile_size * tile_size:
+            return bridge.call("pixel.set_region", params)
+        raw = base64.b64decode(data)
+        if len(raw) != width * height * 4:
+            raise RuntimeError("raw data size does not match width/height")
+    else:
+        if Image is None:
+            return bridge.call("pixel.set_region", params)
+        img = Image.open(io.BytesIO(base64.b64decode(data)))
+        width, height = img.size
+        if width * height <= tile_size * tile_size:
+            return bridge.call("pixel.set_region", params)
+        raw = img.convert("RGBA").tobytes()
+
+    cel = _cel_params(args)
+    x = int(args.get("x", 0))
+    y = int(args.get("y", 0))
+    if str(args.get("mode", "blit")).lower() == "replace":
+        bridge.call("canvas.clear", cel)
+        x = 0
+        y = 0
+    count = write_region(bridge, x, y, width, height, raw, cel, tile_size)
+    return {"ok": True, "width": width, "height": height, "tiles": count}
+
+
+def write_region(
+    bridge,
+    x: int,
+    y: int,
+    width: int,
+    height: int,
+    raw: bytes,
+    cel: Dict[str, Any],
+    tile_size: int = TILE_SIZE,
+) -> int:
+    """Blit an RGBA8 buffer into a cel as pipelined raw tiles."""
+    count = 0
+    for _ in bridge.call_stream(region_calls(x, y, width, height, raw, cel, tile_size), PIPELINE_WINDOW):
+        count += 1
+    return count
+
+
+def region_calls(
+    x: int,
+    y: int,
+    width: int,
+    height: int,
+    raw: bytes,
+    cel: Dict[str, Any],
+    tile_size: int = TILE_SIZE,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield the pixel.set_region calls that blit an RGBA8 buffer as raw tiles.
+
+    Tiles are sliced and encoded lazily, so a consumer such as
+    BridgeClient.call_stream only keeps one window of them in memory.
+    """
+    view = memoryview(raw)
+    stride = width * 4
+    for tx, ty, tw, th in iter_tiles(0, 0, width, height, tile_size):
+        row_bytes = tw * 4
+        tile = bytearray(row_bytes * th)
+        src = ty * stride + tx * 4
+        for row in range(th):
+            tile[row * row_bytes : (row + 1) * row_bytes] = view[src : src + row_bytes]
+            src += stride
+        yield "pixel.set_region", dict(
+            cel,
+            x=x + tx,
+            y=y + ty,
+            width=tw,
+            height=th,
+            format="raw",
+            mode="blit",
+            data=base64.b64encode(tile).decode("ascii"),
+        )
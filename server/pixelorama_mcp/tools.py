@@ -1,3 +1,22 @@
+def _list_schema(fields):
+    """inputSchema of a *.list tool: offset/limit paging and field projection."""
+    return {
+        "type": "object",
+        "properties": {
+            "offset": {"type": "integer", "minimum": 0, "default": 0, "description": "Index of the first item"},
+            "limit": {"type": "integer", "minimum": 0, "description": "Max items to return (default: all)"},
+            "fields": {"type": "array", "items": {"type": "string", "enum": fields}, "description": "Item fields to return (default: all)"},
+            "format": {
+                "type": "string",
+                "enum": ["rows", "columns"],
+                "default": "rows",
+                "description": "rows: list of objects; columns: {field: [values]}",
+            },
+        },
+        "additionalProperties": False,
+    }
+
+
 TOOLS = [
     {
         "name": "bridge.ping",
@@ -14,6 +33,31 @@ TOOLS = [
         "description": "Get bridge protocol and extension info.",
         "inputSchema": {"type": "object", "properties": {}, "additionalProperties": False},
     },
+    {
+        "name": "server.stats",
+        "description": "MCP server metrics: per-tool and per-bridge-method latency (count, mean, p50/p90/p99, max), bytes sent/received, bridge-side execution time, connects/reconnects/retries and metadata cache hits.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "format": {"type": "string", "enum": ["json", "openmetrics"], "default": "json"},
+                "reset": {"type": "boolean", "default": False, "description": "Clear the counters after reading"},
+            },
+            "additionalProperties": False,
+        },
+    },
+    {
+        "name": "server.profile",
+        "description": "Control profiling: record per-phase spans of every tool call (validate, bridge round-trips, bridge-reported queue/exec time, image work, encode) to a Chrome trace file, and/or write cProfile stats for calls slower than profile_ms. Returns the current settings.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "trace_file": {"type": "string", "description": "Chrome trace (JSON) path to append to; empty string stops tracing"},
+                "profile_ms": {"type": "number", "minimum": 0, "description": "cProfile calls slower than this (0 = off)"},
+                "profile_dir": {"type": "string", "description": "Directory for .prof files"},
+            },
+            "additionalProperties": False,
+        },
+    },
     {
         "name": "project.create",
         "description": "Create a new project and make it current.",
@@ -64,6 +108,7 @@ TOOLS = [
                 "trim": {"type": "boolean"},
                 "scale": {"type": "integer"},
                 "interpolation": {"type": "string"},
+                "cache": {"type": "boolean", "default": True, "description": "Reuse the PNG from the export cache if the frame is unchanged"},
             },
             "required": ["path"],
             "additionalProperties": False,
@@ -95,18 +140,21 @@ TOOLS = [
     },
     {
         "name": "layer.list",
-        "description": "List layers.",
-        "inputSchema": {"type": "object", "properties": {}, "additionalProperties": False},
+        "description": "List layers; supports offset/limit paging, fields and columnar format.",
+        "inputSchema": _list_schema(["index", "name", "type"]),
     },
     {
         "name": "layer.add",
-        "description": "Add a layer above a given index.",
+        "description": "Add a layer above a given index. Tilemap layers use tileset_index, or a new tileset of tile_size named tileset_name.",
         "inputSchema": {
             "type": "object",
             "properties": {
                 "above": {"type": "integer"},
                 "name": {"type": "string"},
                 "type": {"type": ["string", "integer"]},
+                "tileset_index": {"type": "integer"},
+                "tile_size": {"type": "array", "items": {"type": "integer"}, "minItems": 2},
+                "tileset_name": {"type": "string"},
             },
             "additionalProperties": False,
         },
@@ -143,15 +191,15 @@ TOOLS = [
     },
     {
         "name": "frame.list",
-        "description": "List frames.",
-        "inputSchema": {"type": "object", "properties": {}, "additionalProperties": False},
+        "description": "List frames; supports offset/limit paging, fields and columnar format.",
+        "inputSchema": _list_schema(["index", "duration"]),
     },
     {
         "name": "frame.add",
-        "description": "Add a new frame after index.",
+        "description": "Add new frame(s) after index.",
         "inputSchema": {
             "type": "object",
-            "properties": {"after": {"type": "integer"}},
+            "properties": {"after": {"type": "integer"}, "count": {"type": "integer", "minimum": 1}},
             "additionalProperties": False,
         },
     },
@@ -184,6 +232,15 @@ TOOLS = [
             "additionalProperties": False,
         },
     },
+    {
+        "name": "frame.snapshot",
+        "description": "Get a frame with all layers blended (PNG image, or raw RGBA8 base64).",
+        "inputSchema": {
+            "type": "object",
+            "properties": {"frame": {"type": "integer"}, "format": {"type": "string", "enum": ["raw", "png"], "default": "png"}},
+            "additionalProperties": False,
+        },
+    },
     {
         "name": "pixel.get",
         "description": "Get a pixel color from a Pixel layer.",
@@ -289,8 +346,17 @@ TOOLS = [
     },
     {
         "name": "palette.list",
-        "description": "List palettes.",
-        "inputSchema": {"type": "object", "properties": {}, "additionalProperties": False},
+        "description": "List palettes; supports offset/limit paging, fields and columnar format.",
+        "inputSchema": _list_schema(["name", "scope"]),
+    },
+    {
+        "name": "palette.get",
+        "description": "Get the colors of a palette (current palette if name is omitted).",
+        "inputSchema": {
+            "type": "object",
+            "properties": {"name": {"type": "string"}},
+            "additionalProperties": False,
+        },
     },
     {
         "name": "palette.select",
@@ -420,6 +486,33 @@ TOOLS = [
             "additionalProperties": False,
         },
     },
+    {
+        "name": "pixel.replace_colors",
+        "description": (
+            "Replace many colors at once across frames and layers (palette swap). "
+            "Runs server-side on whole cels; only changed regions are uploaded."
+        ),
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "mapping": {
+                    "description": "Array of {from, to} colors or [from, to] pairs.",
+                    "type": "array",
+                },
+                "frames": {
+                    "description": "Frame index, list of indices/'a-b' ranges, or 'all'. Default: current frame.",
+                    "type": ["integer", "array", "string"],
+                },
+                "layers": {
+                    "description": "Layer index, list of indices/'a-b' ranges, or 'all'. Default: current layer.",
+                    "type": ["integer", "array", "string"],
+                },
+                "tolerance": {"type": "number"},
+            },
+            "required": ["mapping"],
+            "additionalProperties": False,
+        },
+    },
     {
         "name": "selection.clear",
         "description": "Clear selection.",
@@ -519,17 +612,78 @@ TOOLS = [
             "additionalProperties": False,
         },
     },
+    {
+        "name": "project.export.all_tags",
+        "description": "Export every animation tag to its own GIF/APNG/spritesheet row. Each frame is rendered once and shared between tags; outputs are encoded in parallel.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "dir": {"type": "string", "description": "Output directory"},
+                "formats": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": ["gif", "apng", "spritesheet"]},
+                    "description": "Outputs per tag: <tag>.gif, <tag>.png (APNG), <tag>_sheet.png (default: gif)",
+                },
+                "tags": {"type": "array", "items": {"type": "string"}, "description": "Tag names (default: all)"},
+                "direction": {"type": "string", "enum": ["forward", "backwards", "ping_pong"]},
+                "trim": {"type": "boolean", "default": False},
+                "scale": {"type": "integer", "default": 1, "minimum": 1},
+                "palette": {"type": ["string", "array"], "description": "GIF palette: palette name, 'current', or list of colors"},
+                "dither": {"type": ["boolean", "string"]},
+                "name_template": {"type": "string", "description": "File name without extension, '{tag}' is replaced (default: '{tag}'); duplicate names get a _2, _3... suffix"},
+            },
+            "required": ["dir"],
+            "additionalProperties": False,
+        },
+    },
+    {
+        "name": "project.export.atlas",
+        "description": "Export frames as a packed texture atlas: each frame trimmed to its used rect, identical frames stored once, skyline-packed PNG plus Aseprite-style JSON (rects, offsets, durations, tags). Assembled server-side.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "path": {"type": "string", "description": "Output PNG path"},
+                "json_path": {"type": "string", "description": "Output JSON path (default: path with .json)"},
+                "frames": {"type": "array", "items": {"type": "integer"}, "description": "Frame indices (default: all)"},
+                "trim": {"type": "boolean", "default": True},
+                "dedupe": {"type": "boolean", "default": True},
+                "padding": {"type": "integer", "default": 1, "minimum": 0},
+                "scale": {"type": "integer", "default": 1, "minimum": 1},
+                "max_width": {"type": "integer", "description": "Fixed sheet width (default: smallest of several tried)"},
+                "power_of_two": {"type": "boolean", "default": False},
+                "name": {"type": "string", "description": "Frame name prefix in the JSON (default: project name)"},
+            },
+            "required": ["path"],
+            "additionalProperties": False,
+        },
+    },
     {
         "name": "project.import.sequence",
-        "description": "Import an image sequence as frames.",
+        "description": "Import an image sequence as frames. Files are decoded in parallel on the server and streamed to Pixelorama.",
         "inputSchema": {
             "type": "object",
             "properties": {
                 "paths": {"type": "array"},
-                "mode": {"type": "string"},
+                "mode": {"type": "string", "enum": ["new_project", "append_frames"]},
+                "name": {"type": "string", "description": "Project name for new_project (default: first file name)"},
                 "layer": {"type": "integer"},
                 "fps": {"type": "number"},
                 "durations_ms": {"type": "array"},
+                "width": {"type": "integer", "description": "Resize frames (nearest) to this width"},
+                "height": {"type": "integer", "description": "Resize frames (nearest) to this height"},
+                "keep_aspect": {"type": "boolean", "default": True},
+                "trim": {"type": "boolean", "default": False, "description": "Crop all frames to the common bounding box of their opaque pixels"},
+                "validate": {"type": "boolean", "default": False, "description": "Decode every file before creating frames"},
+                "dedupe": {"type": "boolean", "default": True, "description": "Upload identical frames once and link their cels"},
+                "palette": {
+                    "type": ["string", "array"],
+                    "description": "Map frames onto a palette while decoding: palette name ('current' for the selected one) or list of colors",
+                },
+                "dither": {
+                    "type": ["boolean", "string"],
+                    "default": False,
+                    "description": "Dithering for palette mapping: true/floyd_steinberg, or ordered bayer2/bayer4/bayer8/blue_noise",
+                },
             },
             "required": ["paths"],
             "additionalProperties": False,
@@ -548,11 +702,52 @@ TOOLS = [
                 "name": {"type": "string"},
                 "start_frame": {"type": "integer"},
                 "detect_empty": {"type": "boolean"},
+                "dedupe": {"type": "boolean", "default": True, "description": "Link identical and empty frames' cels"},
             },
             "required": ["path"],
             "additionalProperties": False,
         },
     },
+    {
+        "name": "project.compact",
+        "description": "Link identical or fully transparent cels within each layer so they share one image. Reports bytes reclaimed.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "layers": {"type": "array", "items": {"type": "integer"}, "description": "Layer indices (default: all)"},
+                "include_empty": {"type": "boolean", "default": True},
+                "dry_run": {"type": "boolean", "default": False},
+            },
+            "additionalProperties": False,
+        },
+    },
+    {
+        "name": "project.memory_stats",
+        "description": "Memory profile of the current project: bytes per cel/layer/frame, empty and duplicate cels, effects, undo step count, brushes, tilesets and export buffers, with a summary sorted by cost.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "hash": {"type": "boolean", "default": True, "description": "Hash cel images to find duplicates"},
+                "top": {"type": "integer", "default": 10, "minimum": 1},
+                "cels": {"type": "boolean", "default": False, "description": "Include the per-cel list"},
+                "frames": {"type": "boolean", "default": False, "description": "Include the per-frame list"},
+            },
+            "additionalProperties": False,
+        },
+    },
+    {
+        "name": "cel.link",
+        "description": "Link cels of one layer across frames; they share the first frame's image.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "layer": {"type": "integer"},
+                "frames": {"type": "array", "items": {"type": "integer"}, "minItems": 2},
+            },
+            "required": ["frames"],
+            "additionalProperties": False,
+        },
+    },
     {
         "name": "pixel.set_many",
         "description": "Set multiple pixels in one call.",
@@ -570,7 +765,7 @@ TOOLS = [
     },
     {
         "name": "pixel.get_region",
-        "description": "Get a region as PNG image (returned as viewable image content). Single layer only.",
+        "description": "Get a region as PNG image (returned as viewable image content). Single layer only. Large regions are streamed as tiles.",
         "inputSchema": {
             "type": "object",
             "properties": {
@@ -581,6 +776,7 @@ TOOLS = [
                 "format": {"type": "string"},
                 "frame": {"type": "integer"},
                 "layer": {"type": "integer"},
+                "tile_size": {"type": "integer", "minimum": 16},
             },
             "required": ["x", "y", "width", "height"],
             "additionalProperties": False,
@@ -588,7 +784,7 @@ TOOLS = [
     },
     {
         "name": "pixel.set_region",
-        "description": "Blit a PNG/raw base64 image into a cel.",
+        "description": "Blit a PNG/raw base64 image into a cel. Large images are streamed as tiles.",
         "inputSchema": {
             "type": "object",
             "properties": {
@@ -601,6 +797,7 @@ TOOLS = [
                 "mode": {"type": "string"},
                 "frame": {"type": "integer"},
                 "layer": {"type": "integer"},
+                "tile_size": {"type": "integer", "minimum": 16},
             },
             "required": ["data"],
             "additionalProperties": False,
@@ -608,8 +805,8 @@ TOOLS = [
     },
     {
         "name": "animation.tags.list",
-        "description": "List animation tags.",
-        "inputSchema": {"type": "object", "properties": {}, "additionalProperties": False},
+        "description": "List animation tags; supports offset/limit paging, fields and columnar format.",
+        "inputSchema": _list_schema(["index", "name", "color", "from", "to", "user_data"]),
     },
     {
         "name": "animation.tags.add",
@@ -664,8 +861,8 @@ TOOLS = [
     },
     {
         "name": "tilemap.tileset.list",
-        "description": "List tilesets.",
-        "inputSchema": {"type": "object", "properties": {}, "additionalProperties": False},
+        "description": "List tilesets; supports offset/limit paging, fields and columnar format.",
+        "inputSchema": _list_schema(["index", "name", "tile_size", "tile_shape", "tile_count"]),
     },
     {
         "name": "tilemap.tileset.create",
@@ -818,6 +1015,65 @@ TOOLS = [
             "additionalProperties": False,
         },
     },
+    {
+        "name": "tilemap.cells.get_region",
+        "description": "Get tilemap cells in a rect as packed arrays (row-major). format packed: base64 int32 LE indices + base64 uint8 flags (bit0 flip_h, bit1 flip_v, bit2 transpose); format list: JSON arrays.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "layer": {"type": "integer"},
+                "frame": {"type": "integer"},
+                "cell_x": {"type": "integer"},
+                "cell_y": {"type": "integer"},
+                "width": {"type": "integer"},
+                "height": {"type": "integer"},
+                "format": {"type": "string"},
+            },
+            "required": ["cell_x", "cell_y", "width", "height"],
+            "additionalProperties": False,
+        },
+    },
+    {
+        "name": "tilemap.cells.set_region",
+        "description": "Set tilemap cells in a rect from packed arrays (same layout as tilemap.cells.get_region) in one pass. Index -1 leaves a cell unchanged; flags are optional.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "layer": {"type": "integer"},
+                "frame": {"type": "integer"},
+                "cell_x": {"type": "integer"},
+                "cell_y": {"type": "integer"},
+                "width": {"type": "integer"},
+                "height": {"type": "integer"},
+                "indices": {"type": ["string", "array"]},
+                "flags": {"type": ["string", "array"]},
+            },
+            "required": ["cell_x", "cell_y", "width", "height", "indices"],
+            "additionalProperties": False,
+        },
+    },
+    {
+        "name": "tilemap.from_image",
+        "description": (
+            "Convert an image into a tileset of unique tiles plus a tilemap layer. "
+            "Identical tiles are stored once; with match_flips, flipped/transposed variants are reused via cell flags."
+        ),
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "image_data": {"type": "string", "description": "Base64-encoded image (PNG/JPEG)"},
+                "image_path": {"type": "string", "description": "Path to image file (alternative to image_data)"},
+                "tile_size": {"type": ["integer", "array"], "default": 16, "description": "Tile size as N or [w, h]"},
+                "match_flips": {"type": "boolean", "default": False, "description": "Reuse flipped/transposed tiles"},
+                "new_project": {"type": "boolean", "default": True, "description": "Create a project sized to the image"},
+                "project_name": {"type": "string", "default": "tilemap"},
+                "layer_name": {"type": "string", "default": "Tilemap"},
+                "tileset_name": {"type": "string"},
+                "frame": {"type": "integer"},
+            },
+            "additionalProperties": False,
+        },
+    },
     {
         "name": "effect.layer.list",
         "description": "List layer effects.",
@@ -1015,6 +1271,15 @@ TOOLS = [
                 "interpolation": {"type": "string"},
                 "split_layers": {"type": "boolean"},
                 "erase_unselected_area": {"type": "boolean"},
+                "palette": {
+                    "type": ["string", "array"],
+                    "description": "GIF only: palette name ('current' for the selected one) or list of colors (max 255)",
+                },
+                "dither": {
+                    "type": ["boolean", "string"],
+                    "description": "GIF only: false/none, true/floyd_steinberg, or ordered bayer2/bayer4/bayer8/blue_noise (flicker-free)",
+                },
+                "cache": {"type": "boolean", "default": True, "description": "Reuse unchanged frames from the on-disk export cache"},
             },
             "required": ["path"],
             "additionalProperties": False,
@@ -1235,8 +1500,8 @@ TOOLS = [
     },
     {
         "name": "brush.list",
-        "description": "List project brushes.",
-        "inputSchema": {"type": "object", "properties": {}, "additionalProperties": False},
+        "description": "List project brushes; supports offset/limit paging, fields and columnar format.",
+        "inputSchema": _list_schema(["index", "size"]),
     },
     {
         "name": "brush.add",
@@ -1340,7 +1605,8 @@ TOOLS = [
         "name": "image.to_pixelart",
         "description": (
             "Convert a photo/image to pixel art. Accepts base64 image or file path, "
-            "resizes to pixel art dimensions, reduces colors, and imports into Pixelorama."
+            "resizes to pixel art dimensions, reduces colors, and imports into Pixelorama. "
+            "Animated inputs become one project frame per source frame."
         ),
         "inputSchema": {
             "type": "object",
@@ -1350,9 +1616,27 @@ TOOLS = [
                 "width": {"type": "integer", "default": 64, "description": "Target width in pixels"},
                 "height": {"type": "integer", "default": 64, "description": "Target height in pixels"},
                 "colors": {"type": "integer", "default": 0, "description": "Max colors (0 = no limit)"},
-                "dither": {"type": "boolean", "default": False, "description": "Apply dithering during color reduction"},
+                "dither": {
+                    "type": ["boolean", "string"],
+                    "default": False,
+                    "description": "Dithering during color reduction: true/floyd_steinberg, or ordered bayer2/bayer4/bayer8/blue_noise",
+                },
                 "project_name": {"type": "string", "default": "pixelart", "description": "Name for the new project"},
                 "keep_aspect": {"type": "boolean", "default": True, "description": "Preserve aspect ratio (fit within width x height)"},
+                "resample": {
+                    "type": "string",
+                    "default": "nearest",
+                    "description": "Downscale method: nearest, mode (majority color per block), median, mean (alpha-aware)",
+                },
+                "palette": {
+                    "type": ["string", "array"],
+                    "description": "Map onto a palette instead of adaptive colors: palette name ('current' for the selected one) or list of colors",
+                },
+                "animated": {
+                    "type": "boolean",
+                    "default": True,
+                    "description": "Convert every frame of GIF/APNG/WebP inputs into project frames (shared palette, original durations)",
+                },
             },
             "additionalProperties": False,
         },
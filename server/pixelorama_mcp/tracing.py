@@ -0,0 +1,185 @@
+import contextlib
+import itertools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+# Chrome trace (chrome://tracing, Perfetto) of every tool call's phases;
+# empty disables tracing. Can also be switched at runtime (server.profile).
+TRACE_FILE = os.environ.get("PIXELORAMA_TRACE_FILE", "")
+# With a threshold, every tool call runs under cProfile and the stats of
+# calls slower than this many ms are written to PROFILE_DIR; 0 disables it.
+PROFILE_MS = float(os.environ.get("PIXELORAMA_PROFILE_MS", "0"))
+PROFILE_DIR = os.environ.get(
+    "PIXELORAMA_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "pixelorama-mcp-profiles")
+)
+
+# Trace "threads": the server's own phases, and the bridge-side timing the
+# bridge reports back (queued_us/elapsed_us), drawn as a separate track.
+SERVER_TID = 1
+BRIDGE_TID = 2
+
+
+def _log(msg: str) -> None:
+    print(f"[pixelorama-mcp] {msg}", file=sys.stderr, flush=True)
+
+
+class Tracer:
+    """Records phase spans as Chrome trace events and optional cProfile dumps.
+
+    Events are appended to the trace file as they complete, one per line,
+    in the JSON array format whose closing bracket is optional, so the file
+    is readable even if the server is killed. When tracing is off, span()
+    returns a shared no-op context and costs one attribute check.
+    """
+
+    def __init__(self, trace_file: str = TRACE_FILE, profile_ms: float = PROFILE_MS, profile_dir: str = PROFILE_DIR):
+        self._lock = threading.Lock()
+        self._fh = None
+        self.trace_file = ""
+        self.events = 0
+        self.profile_ms = profile_ms
+        self.profile_dir = profile_dir
+        self.profiles = 0
+        self._profile_seq = itertools.count(1)
+        if trace_file:
+            self.start_trace(trace_file)
+
+    @property
+    def enabled(self) -> bool:
+        return self._fh is not None
+
+    def start_trace(self, path: str) -> None:
+        self.stop_trace()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._fh = open(path, "a", encoding="utf-8")
+        self.trace_file = path
+        if new:
+            self._fh.write("[\n")
+        # Track names for this process (each server run has its own pid)
+        pid = os.getpid()
+        for tid, name in ((SERVER_TID, "mcp server"), (BRIDGE_TID, "bridge (reported)")):
+            self._write({"ph": "M", "pid": pid, "tid": tid, "name": "thread_name", "args": {"name": name}})
+        self._fh.flush()
+
+    def stop_trace(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+                self.trace_file = ""
+
+    def _write(self, event: Dict[str, Any]) -> None:
+        self._fh.write(json.dumps(event, separators=(",", ":")) + ",\n")
+        self.events += 1
+
+    def add(
+        self,
+        name: str,
+        start: float,
+        end: float,
+        cat: str = "server",
+        tid: int = SERVER_TID,
+        args: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Record a complete span; start/end are time.perf_counter() values."""
+        if self._fh is None:
+            return
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": round(start * 1e6, 1),
+            "dur": round((end - start) * 1e6, 1),
+            "pid": os.getpid(),
+            "tid": tid,
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            if self._fh is not None:
+                self._write(event)
+
+    def span(self, name: str, cat: str = "server", **args: Any):
+        """Context manager recording the enclosed block as a span."""
+        if self._fh is None:
+            return _NULL_SPAN
+        return self._span(name, cat, args)
+
+    @contextlib.contextmanager
+    def _span(self, name: str, cat: str, args: Dict[str, Any]) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter(), cat, args=args or None)
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.flush()
+
+    def start_profile(self):
+        """A running cProfile.Profile when profiling is on, else None."""
+        if self.profile_ms <= 0:
+            return None
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def finish_profile(self, profiler, name: str, elapsed: float) -> Optional[str]:
+        """Stop the profiler; keep its stats only if the call was slow.
+
+        A failed dump is logged and never fails the tool call itself.
+        """
+        if profiler is None:
+            return None
+        profiler.disable()
+        if elapsed * 1000 < self.profile_ms:
+            return None
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        # Sequence number: slow calls within the same second stay apart
+        name = f"{stamp}-{os.getpid()}-{next(self._profile_seq)}-{int(elapsed * 1000)}ms-{_safe(name)}.prof"
+        path = os.path.join(self.profile_dir, name)
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            profiler.dump_stats(path)
+        except OSError as exc:
+            _log(f"cannot write profile {path}: {exc}")
+            return None
+        self.profiles += 1
+        return path
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "trace_file": self.trace_file,
+            "trace_events": self.events,
+            "profile_ms": self.profile_ms,
+            "profile_dir": self.profile_dir,
+            "profiles_written": self.profiles,
+        }
+
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+def _safe(name: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in name) or "call"
+
+
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
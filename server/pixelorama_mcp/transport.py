@@ -1,6 +1,9 @@
 import json
 import sys
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Union
+
+from .metrics import get_metrics
+from .tracing import get_tracer
 
 
 class StdioTransport:
@@ -8,6 +11,8 @@ class StdioTransport:
         self._stdin = sys.stdin.buffer
         self._stdout = sys.stdout.buffer
         self._mode = None  # "lsp" or "line"
+        self._metrics = get_metrics()
+        self._tracer = get_tracer()
 
     def read_message(self) -> Optional[Dict[str, Any]]:
         if self._mode == "line":
@@ -17,7 +22,9 @@ class StdioTransport:
             line = line.strip()
             if not line:
                 return None
-            return json.loads(line.decode("utf-8"))
+            self._metrics.inc("mcp_bytes", "in", len(line))
+            with self._tracer.span("decode", bytes=len(line)):
+                return json.loads(line.decode("utf-8"))
 
         if self._mode == "lsp":
             return self._read_lsp_message()
@@ -31,6 +38,7 @@ class StdioTransport:
         stripped = line.lstrip()
         if stripped.startswith(b"{"):
             self._mode = "line"
+            self._metrics.inc("mcp_bytes", "in", len(stripped))
             return json.loads(stripped.decode("utf-8"))
 
         self._mode = "lsp"
@@ -55,15 +63,25 @@ class StdioTransport:
         body = self._stdin.read(length)
         if not body:
             return None
-        return json.loads(body.decode("utf-8"))
+        self._metrics.inc("mcp_bytes", "in", len(body))
+        with self._tracer.span("decode", bytes=len(body)):
+            return json.loads(body.decode("utf-8"))
+
+    def send_message(self, payload: Union[Dict[str, Any], bytes]) -> None:
+        """Send a message; ``payload`` may already be encoded JSON bytes."""
+        with self._tracer.span("encode+write"):
+            self._send(payload)
 
-    def send_message(self, payload: Dict[str, Any]) -> None:
+    def _send(self, payload: Union[Dict[str, Any], bytes]) -> None:
+        if isinstance(payload, bytes):
+            body = payload
+        else:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self._metrics.inc("mcp_bytes", "out", len(body))
         if self._mode == "line":
-            body = json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n"
-            self._stdout.write(body)
+            self._stdout.write(body + b"\n")
             self._stdout.flush()
             return
-        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
         header = f"Content-Length: {len(body)}\r\n\r\n".encode("utf-8")
         self._stdout.write(header + body)
         self._stdout.flush()
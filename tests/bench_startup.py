@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""MCP server startup benchmark.
+
+Measures, over several fresh processes, the time from spawn to the
+`initialize` response and to the `tools/list` response, then prints the
+slowest imports reported by `python -X importtime`. No running bridge
+is needed.
+
+    python3 tests/bench_startup.py [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SERVER_CWD = os.environ.get(
+    "PIXELORAMA_MCP_SERVER_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"),
+)
+PYTHON = os.environ.get("PIXELORAMA_MCP_PYTHON", sys.executable)
+TOP_IMPORTS = 15
+
+
+def _request(proc, msg_id, method, params=None):
+    line = json.dumps({"jsonrpc": "2.0", "id": msg_id, "method": method, "params": params or {}})
+    proc.stdin.write(line.encode("utf-8") + b"\n")
+    proc.stdin.flush()
+    resp = proc.stdout.readline()
+    if not resp:
+        raise RuntimeError(f"server exited before answering {method}")
+    return json.loads(resp)
+
+
+def measure_once():
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [PYTHON, "-m", "pixelorama_mcp"],
+        cwd=SERVER_CWD,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _request(proc, 1, "initialize")
+        t_init = time.perf_counter() - start
+        tools = _request(proc, 2, "tools/list")["result"]["tools"]
+        t_list = time.perf_counter() - start
+    finally:
+        proc.stdin.close()
+        proc.wait(timeout=10)
+    return t_init, t_list, len(tools)
+
+
+def import_breakdown():
+    """(cumulative_us, self_us, module) for the slowest imports."""
+    out = subprocess.run(
+        [PYTHON, "-X", "importtime", "-c", "import pixelorama_mcp.mcp_server"],
+        cwd=SERVER_CWD,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    rows = []
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cumulative), int(self_us), name.rstrip()))
+    rows.sort(reverse=True)
+    return rows[:TOP_IMPORTS]
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    measure_once()  # warm the OS file cache and .pyc files
+    samples = [measure_once() for _ in range(runs)]
+    inits = [s[0] * 1000 for s in samples]
+    lists = [s[1] * 1000 for s in samples]
+    print(f"runs: {runs}, tools: {samples[0][2]}")
+    print(f"initialize: median {statistics.median(inits):.1f} ms, min {min(inits):.1f} ms")
+    print(f"tools/list: median {statistics.median(lists):.1f} ms, min {min(lists):.1f} ms")
+    print()
+    print(f"{'cumulative ms':>13} {'self ms':>8}  module")
+    for cumulative, self_us, name in import_breakdown():
+        print(f"{cumulative / 1000:13.1f} {self_us / 1000:8.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
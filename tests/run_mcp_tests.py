@@ -20,6 +20,9 @@ TMP_GIF = "/tmp/pixelorama_mcp_test.gif"
 TMP_APNG = "/tmp/pixelorama_mcp_test.apng"
 TMP_SPRITESHEET = "/tmp/pixelorama_mcp_spritesheet.png"
 TMP_PALETTE = "/tmp/pixelorama_mcp_palette.gpl"
+TMP_ATLAS = "/tmp/pixelorama_mcp_atlas.png"
+TMP_TAGS_DIR = "/tmp/pixelorama_mcp_tags"
+TMP_TRACE = "/tmp/pixelorama_mcp_trace.json"
 
 
 class StdioClient:
@@ -132,19 +135,19 @@ def main():
     client = StdioClient(proc)
 
     try:
-        print("[1/16] initialize")
+        print("[1/26] initialize")
         client.send({"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}})
         _require_result(client.recv(), "initialize")
 
-        print("[2/16] tools/list")
+        print("[2/26] tools/list")
         client.send({"jsonrpc": "2.0", "id": 2, "method": "tools/list", "params": {}})
         _require_result(client.recv(), "tools/list")
 
-        print("[3/16] bridge")
+        print("[3/26] bridge")
         _require_result(_call_tool(client, "bridge.ping", {}, msg_id=3), "bridge.ping")
         _require_result(_call_tool(client, "bridge.version", {}, msg_id=4), "bridge.version")
 
-        print("[4/16] project + draw basics")
+        print("[4/26] project + draw basics")
         _require_result(
             _call_tool(client, "project.create", {"name": "test", "width": 16, "height": 16}, msg_id=5),
             "project.create",
@@ -177,7 +180,7 @@ def main():
             "draw.ellipse",
         )
 
-        print("[5/16] text + gradient")
+        print("[5/26] text + gradient")
         _require_result(
             _call_tool(
                 client,
@@ -197,7 +200,7 @@ def main():
             "draw.gradient",
         )
 
-        print("[6/16] layer props + group")
+        print("[6/26] layer props + group")
         props = _require_result(_call_tool(client, "layer.get_props", {}, msg_id=11), "layer.get_props")
         _require_result(
             _call_tool(
@@ -226,7 +229,7 @@ def main():
         if int(parent_props.get("parent", -1)) < 0:
             raise AssertionError("layer parent set failed")
 
-        print("[7/16] pixel + replace")
+        print("[7/26] pixel + replace")
         result = _require_result(_call_tool(client, "pixel.get", {"x": 3, "y": 0}, msg_id=15), "pixel.get")
         color = result.get("color")
         if not isinstance(color, list) or len(color) != 4:
@@ -243,7 +246,7 @@ def main():
             "pixel.replace_color",
         )
 
-        print("[8/16] pixel batch + region + batch.exec")
+        print("[8/26] pixel batch + region + batch.exec")
         _require_result(
             _call_tool(
                 client,
@@ -289,7 +292,7 @@ def main():
             "pixel.set_region",
         )
 
-        print("[9/16] selection")
+        print("[9/26] selection")
         _require_result(
             _call_tool(
                 client,
@@ -307,7 +310,7 @@ def main():
         if not os.path.exists(TMP_MASK) or os.path.getsize(TMP_MASK) == 0:
             raise AssertionError("selection.export_mask file missing")
 
-        print("[10/16] animation control")
+        print("[10/26] animation control")
         _require_result(_call_tool(client, "animation.fps.get", {}, msg_id=24), "animation.fps.get")
         _require_result(_call_tool(client, "animation.fps.set", {"fps": 12}, msg_id=25), "animation.fps.set")
         _require_result(_call_tool(client, "frame.add", {"after": 0}, msg_id=26), "frame.add")
@@ -328,7 +331,7 @@ def main():
         )
         _require_result(_call_tool(client, "animation.loop.set", {"mode": "pingpong"}, msg_id=31), "animation.loop.set")
 
-        print("[11/16] animation tags + effects + shader")
+        print("[11/26] animation tags + effects + shader")
         _require_result(
             _call_tool(
                 client,
@@ -383,7 +386,7 @@ def main():
             "effect.shader.schema",
         )
 
-        print("[12/16] brush + palette")
+        print("[12/26] brush + palette")
         palettes = _require_result(_call_tool(client, "palette.list", {}, msg_id=40), "palette.list")
         palette_name = None
         for item in palettes.get("palettes", []):
@@ -438,7 +441,7 @@ def main():
         _require_result(_call_tool(client, "brush.remove", {"index": brush_index}, msg_id=48), "brush.remove")
         _require_result(_call_tool(client, "brush.clear", {}, msg_id=49), "brush.clear")
 
-        print("[13/16] save + export")
+        print("[13/26] save + export")
         _require_result(_call_tool(client, "project.save", {"path": TMP_PXO}, msg_id=50), "project.save")
         _require_result(
             _call_tool(
@@ -492,7 +495,7 @@ def main():
             if not os.path.exists(path) or os.path.getsize(path) == 0:
                 raise AssertionError(f"export file missing: {path}")
 
-        print("[14/16] tilemap")
+        print("[14/26] tilemap")
         layers = _require_result(
             _call_tool(client, "layer.add", {"above": 0, "name": "Tilemap", "type": "tilemap"}, msg_id=56),
             "layer.add",
@@ -583,13 +586,13 @@ def main():
             "tilemap.random_fill",
         )
 
-        print("[15/16] symmetry")
+        print("[15/26] symmetry")
         _require_result(
             _call_tool(client, "symmetry.set", {"show_x": True, "show_y": True}, msg_id=66),
             "symmetry.set",
         )
 
-        print("[16/16] import spritesheet + sequence")
+        print("[16/26] import spritesheet + sequence")
         _require_result(
             _call_tool(
                 client,
@@ -612,6 +615,114 @@ def main():
             "project.import.sequence",
         )
 
+        print("[17/26] pixel.replace_colors")
+        recolor = _require_result(
+            _call_tool(
+                client,
+                "pixel.replace_colors",
+                {
+                    "mapping": [[[255, 255, 255, 255], [10, 10, 10, 255]], {"from": [0, 0, 0, 255], "to": [20, 20, 20, 255]}],
+                    "frames": "all",
+                    "layers": "all",
+                },
+                msg_id=69,
+            ),
+            "pixel.replace_colors",
+        )
+        if recolor.get("cels_scanned", 0) < 1:
+            raise AssertionError(f"pixel.replace_colors scanned nothing: {recolor}")
+
+        print("[18/26] tilemap.from_image")
+        tilemap = _require_result(
+            _call_tool(client, "tilemap.from_image", {"image_path": TMP_PNG, "tile_size": 8, "match_flips": True}, msg_id=70),
+            "tilemap.from_image",
+        )
+        if tilemap.get("unique_tiles", 0) < 1:
+            raise AssertionError(f"tilemap.from_image found no tiles: {tilemap}")
+
+        print("[19/26] cel.link + project.compact")
+        linked = _require_result(_call_tool(client, "cel.link", {"layer": 0, "frames": [0, 1]}, msg_id=71), "cel.link")
+        if "linked" not in linked:
+            raise AssertionError(f"cel.link mismatch: {linked}")
+        dry = _require_result(_call_tool(client, "project.compact", {"dry_run": True}, msg_id=72), "project.compact")
+        if dry.get("dry_run") is not True:
+            raise AssertionError("project.compact ignored dry_run")
+        _require_result(_call_tool(client, "project.compact", {}, msg_id=73), "project.compact")
+
+        print("[20/26] project.memory_stats")
+        stats = _require_result(_call_tool(client, "project.memory_stats", {}, msg_id=74), "project.memory_stats")
+        if "summary" not in stats or "undo_steps" not in stats["summary"]:
+            raise AssertionError("project.memory_stats summary missing")
+
+        print("[21/26] project.export.atlas")
+        atlas = _require_result(_call_tool(client, "project.export.atlas", {"path": TMP_ATLAS}, msg_id=75), "project.export.atlas")
+        for path in (TMP_ATLAS, atlas.get("json_path", "")):
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                raise AssertionError(f"atlas file missing: {path}")
+
+        print("[22/26] project.export.all_tags")
+        _require_result(
+            _call_tool(client, "animation.tags.add", {"name": "all", "from": 1, "to": 2}, msg_id=76),
+            "animation.tags.add",
+        )
+        tag_exports = _require_result(
+            _call_tool(client, "project.export.all_tags", {"dir": TMP_TAGS_DIR, "formats": ["gif", "spritesheet"]}, msg_id=77),
+            "project.export.all_tags",
+        )
+        if not tag_exports.get("outputs"):
+            raise AssertionError("project.export.all_tags wrote nothing")
+        for item in tag_exports["outputs"]:
+            if not os.path.exists(item["path"]) or os.path.getsize(item["path"]) == 0:
+                raise AssertionError(f"all_tags output missing: {item['path']}")
+
+        print("[23/26] frame.hashes")
+        _require_result(
+            _call_tool(
+                client,
+                "batch.exec",
+                {"calls": [{"method": "frame.hashes", "params": {"frames": [0, 1]}}]},
+                msg_id=78,
+            ),
+            "frame.hashes",
+        )
+
+        print("[24/26] list paging + field projection")
+        page = _require_result(_call_tool(client, "frame.list", {"limit": 1}, msg_id=79), "frame.list")
+        if len(page.get("frames", [])) != 1 or page.get("total", 0) < 2 or page.get("next_offset") != 1:
+            raise AssertionError(f"frame.list paging mismatch: {page}")
+        columns = _require_result(
+            _call_tool(client, "layer.list", {"fields": ["index", "name"], "format": "columns"}, msg_id=80),
+            "layer.list",
+        )
+        if not isinstance(columns.get("layers"), dict) or sorted(columns["layers"]) != ["index", "name"]:
+            raise AssertionError(f"layer.list columns format mismatch: {columns}")
+
+        print("[25/26] server.stats")
+        stats = _require_result(_call_tool(client, "server.stats", {}, msg_id=81), "server.stats")
+        if "bridge.ping" not in stats.get("tools", {}):
+            raise AssertionError("server.stats missing bridge.ping")
+        metrics = _require_result(
+            _call_tool(client, "server.stats", {"format": "openmetrics", "reset": True}, msg_id=82),
+            "server.stats",
+        )
+        if not str(metrics.get("openmetrics", "")).endswith("# EOF\n"):
+            raise AssertionError("server.stats openmetrics output malformed")
+
+        print("[26/26] server.profile")
+        if os.path.exists(TMP_TRACE):
+            os.remove(TMP_TRACE)  # traces are appended to; start from a fresh file
+        _require_result(
+            _call_tool(client, "server.profile", {"trace_file": TMP_TRACE, "profile_ms": 0}, msg_id=83),
+            "server.profile",
+        )
+        _require_result(_call_tool(client, "bridge.ping", {}, msg_id=84), "bridge.ping")
+        _require_result(_call_tool(client, "server.profile", {"trace_file": ""}, msg_id=85), "server.profile")
+        with open(TMP_TRACE, encoding="utf-8") as fh:
+            # The trace is a JSON array left open for appending
+            events = json.loads(fh.read().rstrip().rstrip(",") + "]")
+        if not any(e.get("ph") == "X" and e.get("name") == "tool bridge.ping" for e in events):
+            raise AssertionError("server.profile trace lacks the bridge.ping tool span")
+
         print("MCP tests passed")
     except Exception as exc:
         try:
@@ -0,0 +1,654 @@
+#!/usr/bin/env python3
+"""Offline checks of the server-side logic; no running bridge is needed.
+
+Bridge traffic, where a check needs it, goes to a minimal fake bridge on a
+local port.
+
+    python3 tests/run_mcp_tests_offline.py
+"""
+import base64
+import json
+import os
+import pickle
+import re
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+SERVER_CWD = os.environ.get(
+    "PIXELORAMA_MCP_SERVER_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"),
+)
+sys.path.insert(0, os.path.abspath(SERVER_CWD))
+# Keep a running Pixelorama's discovery file out of the checks
+os.environ["PIXELORAMA_BRIDGE_DISCOVERY"] = os.path.join(tempfile.mkdtemp(), "bridge.json")
+
+from pixelorama_mcp.atlas import pack_skyline, trim_box  # noqa: E402
+from pixelorama_mcp.bridge_client import BridgeClient  # noqa: E402
+from pixelorama_mcp.dither import bayer_matrix, blue_noise_ranks, parse_dither, quantize_pixels, threshold_matrix  # noqa: E402
+from pixelorama_mcp.downscale import block_reduce  # noqa: E402
+from pixelorama_mcp.export_cache import ExportCache  # noqa: E402
+from pixelorama_mcp.image_utils import _quantize_frame, _quantize_frames  # noqa: E402
+from pixelorama_mcp.mcp_server import _BRIDGE_NAME_MAP, MCPServer  # noqa: E402
+from pixelorama_mcp.memory_stats import format_bytes, summarize  # noqa: E402
+from pixelorama_mcp.metadata_cache import MetadataCache, invalidated_domains  # noqa: E402
+from pixelorama_mcp.quantize import PaletteLUT, adaptive_palette, get_palette_lut, resolve_palette  # noqa: E402
+from pixelorama_mcp.recolor import parse_index_selection, parse_mapping, remap_colors  # noqa: E402
+from pixelorama_mcp.schema import SchemaError, compile_schema  # noqa: E402
+from pixelorama_mcp.tag_export import output_names  # noqa: E402
+from pixelorama_mcp.tilemap_import import FLIP_H, FLIP_V, TRANSPOSE, dedupe_tiles, slice_tiles, transform_tile  # noqa: E402
+from pixelorama_mcp.tiling import iter_tiles, read_region, region_calls  # noqa: E402
+from pixelorama_mcp.tools import TOOLS  # noqa: E402
+
+SCHEMAS = {tool["name"]: tool["inputSchema"] for tool in TOOLS}
+BRIDGE_GD = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..",
+    "extension",
+    "PixeloramaMCP",
+    "src",
+    "Extensions",
+    "PixeloramaMCP",
+    "bridge.gd",
+)
+PNG_B64 = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=="
+
+
+def _validate(tool_name, arguments):
+    return compile_schema(SCHEMAS[tool_name])(arguments, tool_name)
+
+
+def _expect_error(tool_name, arguments, fragment):
+    try:
+        _validate(tool_name, arguments)
+    except SchemaError as exc:
+        if fragment not in str(exc):
+            raise AssertionError(f"{tool_name}: expected '{fragment}' in '{exc}'")
+        return
+    raise AssertionError(f"{tool_name}: {arguments} was accepted")
+
+
+def _expect(actual, expected, label):
+    if actual != expected:
+        raise AssertionError(f"{label}: expected {expected!r}, got {actual!r}")
+
+
+def check_schema():
+    # JSON-encoded arrays/objects/strings are decoded where the schema allows them
+    args = _validate("pixel.set", {"x": 1, "y": 2, "color": "[255, 0, 0, 255]"})
+    _expect(args["color"], [255, 0, 0, 255], "array string")
+    args = _validate("pixel.set", {"x": 1, "y": 2, "color": '{"r": 1}'})
+    _expect(args["color"], {"r": 1}, "object string")
+    args = _validate("pixel.set", {"x": 1, "y": 2, "color": '"#ff0000"'})
+    _expect(args["color"], "#ff0000", "quoted string")
+    args = _validate("pixel.set", {"x": 1, "y": 2, "color": "#ff0000"})
+    _expect(args["color"], "#ff0000", "plain string")
+
+    # Scalar strings are coerced only where "string" is not an allowed type
+    args = _validate("pixel.set", {"x": "3", "y": "-4", "color": [0, 0, 0, 255]})
+    _expect((args["x"], args["y"]), (3, -4), "integer strings")
+    args = _validate("draw.rect", {"x": 0, "y": 0, "width": 2, "height": 2, "color": [0, 0, 0, 255], "fill": "true"})
+    _expect(args["fill"], True, "boolean string")
+    args = _validate("layer.add", {"type": "3"})
+    _expect(args["type"], "3", "string kept where string is allowed")
+    args = _validate("layer.add", {"name": "[draft]"})
+    _expect(args["name"], "[draft]", "bracketed string in a string-only field")
+    _expect_error("pixel.set", {"x": "1.5", "y": 0, "color": "red"}, "pixel.set.x: expected integer")
+
+    # Integral floats narrow to int; others are rejected
+    args = _validate("pixel.set", {"x": 3.0, "y": 1, "color": "red"})
+    _expect((args["x"], type(args["x"])), (3, int), "float narrowing")
+    _expect_error("pixel.set", {"x": 3.5, "y": 1, "color": "red"}, "pixel.set.x: expected integer, got number")
+
+    # enum, minimum, required and closed objects
+    _expect_error("frame.snapshot", {"format": "jpeg"}, "frame.snapshot.format: must be one of: raw, png")
+    _expect_error("server.profile", {"profile_ms": -1}, "server.profile.profile_ms: must be >= 0")
+    _expect_error("pixel.set", {"x": 1, "y": 1}, "pixel.set: missing required property 'color'")
+    _expect_error("pixel.set", {"x": 1, "y": 1, "color": "red", "z": 1}, "pixel.set: unknown property 'z'")
+
+    # Base64 image data is passed through untouched
+    args = _validate("image.to_pixelart", {"image_data": PNG_B64})
+    _expect(args["image_data"], PNG_B64, "base64 passthrough")
+
+    # Through the server: invalid_params with the argument path, before any bridge traffic
+    server = MCPServer()
+    resp = server._handle_message(
+        {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "tools/call",
+            "params": {"name": "pixel.set", "arguments": {"x": "left", "y": 0, "color": "red"}},
+        }
+    )
+    err = resp.get("error") or {}
+    _expect(err.get("code"), "invalid_params", "tools/call error code")
+    if "pixel.set.x" not in err.get("message", ""):
+        raise AssertionError(f"invalid_params message lacks the path: {err}")
+
+
+class FakeBridge:
+    """Line-delimited JSON bridge on 127.0.0.1 answering a few methods."""
+
+    def __init__(self):
+        self.calls = []
+        self.revision = 0
+        self.frames = 3
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen()
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            conn, _ = self.sock.accept()
+            for line in conn.makefile("rb"):
+                req = json.loads(line)
+                method = req["method"]
+                self.calls.append(method)
+                if method == "bridge.revision":
+                    result = {"revision": str(self.revision)}
+                elif method == "frame.list":
+                    result = {"frames": [{"index": i} for i in range(self.frames)]}
+                elif method == "frame.add":
+                    self.frames += 1
+                    self.revision += 1
+                    result = {}
+                else:
+                    result = {}
+                payload = {"id": req["id"], "ok": True, "result": result, "revision": str(self.revision)}
+                conn.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+
+    def count(self, method):
+        return self.calls.count(method)
+
+
+def check_invalidation():
+    everything = {"project", "layer", "frame", "current", "tag", "animation", "brush"}
+    _expect(set(invalidated_domains("layer.add", {})), {"layer", "current"}, "layer.add")
+    _expect(set(invalidated_domains("layer.remove", {"index": 1})), {"layer", "current"}, "layer.remove")
+    for method in ("pixel.set", "pixel.set_region", "draw.line", "draw.rect"):
+        _expect(invalidated_domains(method, {}), (), method)
+    _expect(invalidated_domains("project.set_active", {}), (), "project.set_active {}")
+    _expect(set(invalidated_domains("project.set_active", {"frame": 2})), {"current"}, "project.set_active frame")
+    for method in ("history.undo", "project.open", "batch.exec", "some.future_method"):
+        _expect(set(invalidated_domains(method, {})), everything, method)
+    for method in ("frame.list", "project.info", "pixel.get", "bridge.revision"):
+        _expect(invalidated_domains(method, {}), (), method)
+
+    cache = MetadataCache(ttl=60)
+    fetched = []
+
+    def fetch(method, params):
+        fetched.append(method)
+        return {"method": method}, "r0"
+
+    def read_all():
+        for method in ("layer.list", "project.info", "animation.tags.list"):
+            cache.get(method, {}, fetch, lambda: "r0")
+
+    read_all()
+    read_all()
+    _expect(len(fetched), 3, "reads are cached")
+    cache.invalidate("layer.add", {})
+    read_all()
+    _expect(fetched[3:], ["layer.list", "project.info"], "layer.* drops layer.list and project.info")
+    for method in ("pixel.set", "draw.line", "project.set_active"):
+        cache.invalidate(method, {})
+    read_all()
+    _expect(len(fetched), 5, "pixel.*/draw.*/set_active {} keep cached reads")
+    cache.invalidate("project.set_active", {"frame": 1})
+    read_all()
+    _expect(len(fetched), 7, "project.set_active with a frame drops current-frame reads")
+    cache.invalidate("history.undo", {})
+    read_all()
+    _expect(len(fetched), 10, "unknown methods clear everything")
+
+    # Without a revision in the response (older bridges) an expired entry is
+    # refetched, never revalidated
+    cache = MetadataCache(ttl=0.05)
+    revisions = []
+
+    def revision():
+        revisions.append(1)
+        return "r0"
+
+    cache.get("frame.list", {}, lambda method, params: ({}, None), revision)
+    time.sleep(0.06)
+    cache.get("frame.list", {}, lambda method, params: ({}, None), revision)
+    _expect((cache.misses, len(revisions)), (2, 0), "no stored revision means a refetch")
+
+
+def check_bridge_cache():
+    bridge = FakeBridge()
+    client = BridgeClient(port=bridge.port, timeout=5.0, metadata=MetadataCache(ttl=0.1))
+    try:
+        frames = lambda: len(client.call("frame.list", {})["frames"])  # noqa: E731
+        _expect((frames(), frames()), (3, 3), "frame.list")
+        _expect(bridge.count("frame.list"), 1, "second frame.list is a hit")
+        _expect(bridge.count("bridge.revision"), 0, "a miss takes the revision from its response")
+
+        # Past the TTL the entry is revalidated with bridge.revision, not refetched
+        time.sleep(0.15)
+        revisions = bridge.count("bridge.revision")
+        _expect(frames(), 3, "revalidated frame.list")
+        _expect(bridge.count("frame.list"), 1, "unchanged revision keeps the entry")
+        _expect(bridge.count("bridge.revision"), revisions + 1, "TTL expiry asks bridge.revision")
+
+        # A change made outside the server (Pixelorama UI) shows up after the TTL
+        bridge.frames = 5
+        bridge.revision += 1
+        time.sleep(0.15)
+        _expect(frames(), 5, "frame.list after a UI edit")
+
+        # Pipelined calls invalidate as well
+        for _ in client.call_stream([("frame.add", {}), ("frame.add", {})], 2):
+            pass
+        _expect(frames(), 7, "frame.list after call_stream frame.add")
+    finally:
+        client.close()
+
+
+class RegionBridge:
+    """In-memory cel answering raw pixel.get_region/set_region tiles."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.pixels = bytearray((i * 7 + i // 4) % 251 for i in range(width * height * 4))
+
+    def call_stream(self, calls, window=4):
+        for method, params in calls:
+            x, y, w, h = params["x"], params["y"], params["width"], params["height"]
+            if method == "pixel.get_region":
+                rows = [self.pixels[((y + r) * self.width + x) * 4 : ((y + r) * self.width + x + w) * 4] for r in range(h)]
+                yield {"data": base64.b64encode(b"".join(rows)).decode("ascii")}
+            else:
+                data = base64.b64decode(params["data"])
+                for r in range(h):
+                    start = ((y + r) * self.width + x) * 4
+                    self.pixels[start : start + w * 4] = data[r * w * 4 : (r + 1) * w * 4]
+                yield {}
+
+
+def check_tiling():
+    tiles = list(iter_tiles(3, 5, 40, 20, 16))
+    _expect(len(tiles), 6, "tile count")
+    _expect(tiles[0], (3, 5, 16, 16), "first tile")
+    _expect(tiles[-1], (35, 21, 8, 4), "last (partial) tile")
+    _expect(sum(w * h for _, _, w, h in tiles), 40 * 20, "tiles cover the region once")
+    _expect(list(iter_tiles(0, 0, 0, 10, 16)), [], "empty region")
+
+    # Tiles are assembled into the right rows/columns of the output buffer
+    bridge = RegionBridge(50, 40)
+    buf = read_region(bridge, 3, 5, 40, 30, {"frame": 0}, tile_size=16)
+    expected = b"".join(bridge.pixels[((5 + r) * 50 + 3) * 4 : ((5 + r) * 50 + 43) * 4] for r in range(30))
+    _expect(bytes(buf) == expected, True, "read_region assembly")
+
+    # ... and region_calls slices them back out the same way
+    target = RegionBridge(50, 40)
+    target.pixels = bytearray(len(target.pixels))
+    for _ in target.call_stream(region_calls(3, 5, 40, 30, bytes(buf), {"frame": 0}, tile_size=16)):
+        pass
+    _expect(bytes(read_region(target, 3, 5, 40, 30, {}, tile_size=7)) == expected, True, "region_calls round trip")
+
+
+def _expect_raises(fn, fragment, label):
+    try:
+        fn()
+    except RuntimeError as exc:
+        if fragment not in str(exc):
+            raise AssertionError(f"{label}: expected '{fragment}' in '{exc}'")
+        return
+    raise AssertionError(f"{label}: no error")
+
+
+def check_recolor():
+    import numpy as np
+
+    _expect(parse_index_selection(None, 10, 4), [4], "default is the current index")
+    _expect(parse_index_selection("all", 3, 0), [0, 1, 2], "all")
+    _expect(parse_index_selection([7, "2-4", 3], 10, 0), [2, 3, 4, 7], "mixed list")
+    _expect(parse_index_selection("5-9", 10, 0), [5, 6, 7, 8, 9], "range to the last index")
+    _expect_raises(lambda: parse_index_selection(10, 10, 0), "index out of range", "single index")
+    _expect_raises(lambda: parse_index_selection("5-200", 10, 0), "range out of range", "range past the end")
+    _expect_raises(lambda: parse_index_selection("9-3", 10, 0), "reversed range", "reversed range")
+    _expect_raises(lambda: parse_index_selection("a-b", 10, 0), "invalid range", "non-numeric range")
+
+    pairs = parse_mapping([{"from": "#ff0000", "to": "#00ff00"}, [[0, 0, 255, 255], [255, 255, 255, 255]]])
+    _expect(pairs[0], ((255, 0, 0, 255), (0, 255, 0, 255)), "mapping from a dict")
+    _expect(pairs[1], ((0, 0, 255, 255), (255, 255, 255, 255)), "mapping from a pair")
+    _expect_raises(lambda: parse_mapping([]), "non-empty", "empty mapping")
+
+    pixels = np.array([[[255, 0, 0, 255], [0, 0, 255, 255], [1, 2, 3, 4]]], dtype=np.uint8)
+    # Exact: all entries at once, the first of duplicated "from" colors wins
+    out, changed = remap_colors(pixels, pairs + [((255, 0, 0, 255), (9, 9, 9, 255))])
+    _expect(out.tolist(), [[[0, 255, 0, 255], [255, 255, 255, 255], [1, 2, 3, 4]]], "exact remap")
+    _expect(changed.tolist(), [[True, True, False]], "exact changed mask")
+    # A chain (red -> blue, blue -> white) must not be applied twice
+    out, _ = remap_colors(pixels, [((255, 0, 0, 255), (0, 0, 255, 255)), ((0, 0, 255, 255), (255, 255, 255, 255))])
+    _expect(out[0, 0].tolist(), [0, 0, 255, 255], "no chained remap")
+    # Tolerance: in order, first matching entry wins
+    near = np.array([[[250, 5, 0, 255]]], dtype=np.uint8)
+    out, changed = remap_colors(near, [((255, 0, 0, 255), (0, 0, 0, 255)), ((250, 5, 0, 255), (7, 7, 7, 255))], 0.05)
+    _expect(out[0, 0].tolist(), [0, 0, 0, 255], "tolerance remap")
+    out, changed = remap_colors(near, [((255, 0, 0, 255), (0, 0, 0, 255))], 0.01)
+    _expect(bool(changed.any()), False, "outside the tolerance")
+
+
+def check_tile_dedupe():
+    import numpy as np
+
+    tile = np.zeros((2, 2, 4), dtype=np.uint8)
+    tile[0, 0] = (255, 0, 0, 255)
+    tile[0, 1] = (0, 255, 0, 255)
+    tile[1, 1] = (0, 0, 255, 255)
+    _expect(transform_tile(tile, FLIP_H)[0, 0].tolist(), [0, 255, 0, 255], "flip h")
+    _expect(transform_tile(tile, FLIP_V)[0, 1].tolist(), [0, 0, 255, 255], "flip v")
+    _expect(transform_tile(tile, TRANSPOSE)[1, 0].tolist(), [0, 255, 0, 255], "transpose")
+    for flags in (FLIP_H, FLIP_V, FLIP_H | FLIP_V, TRANSPOSE):
+        back = transform_tile(transform_tile(tile, flags), flags)
+        _expect(np.array_equal(back, tile), True, f"flags {flags} applied twice")
+
+    # 3x2 grid: tile, its h-flip, blank, tile again, its transpose, a new tile
+    other = np.full((2, 2, 4), 200, dtype=np.uint8)
+    cells = [tile, transform_tile(tile, FLIP_H), np.zeros_like(tile), tile, transform_tile(tile, TRANSPOSE), other]
+    image = np.concatenate([np.concatenate(cells[r * 3 : r * 3 + 3], axis=1) for r in range(2)], axis=0)
+    grid = slice_tiles(image, 2, 2)
+    _expect(grid.shape, (2, 3, 2, 2, 4), "slice_tiles shape")
+
+    tiles, indices, _ = dedupe_tiles(grid)
+    _expect(len(tiles), 4, "exact dedupe")
+    _expect(int(indices[0, 2]), -1, "blank cell")
+    _expect(int(indices[0, 0]) == int(indices[1, 0]), True, "repeated tile shares an index")
+
+    tiles, indices, flags = dedupe_tiles(grid, match_flips=True)
+    _expect(len(tiles), 2, "dedupe with flips")
+    for r, c in ((0, 0), (0, 1), (1, 0), (1, 1), (1, 2)):
+        shown = transform_tile(tiles[indices[r, c]], int(flags[r, c]))
+        _expect(np.array_equal(shown, grid[r, c]), True, f"cell {r},{c} displays its source")
+
+    # Sizes that are not a multiple of the tile are padded with transparency
+    _expect(slice_tiles(np.ones((3, 5, 4), dtype=np.uint8), 2, 2).shape, (2, 3, 2, 2, 4), "padded slice")
+
+
+def check_block_reduce():
+    import numpy as np
+
+    red, blue, clear = (255, 0, 0, 255), (0, 0, 255, 255), (0, 0, 0, 0)
+    # One 2x2 block: three red, one blue
+    block = np.array([[red, red], [red, blue]], dtype=np.uint8)
+    _expect(block_reduce(block, 1, 1, "mode")[0, 0].tolist(), list(red), "mode")
+    _expect(block_reduce(block, 1, 1, "median")[0, 0].tolist(), list(red), "median")
+    _expect(block_reduce(block, 1, 1, "mean")[0, 0].tolist(), [191, 0, 64, 255], "mean")
+
+    # Transparent pixels of any color count as one color for mode, and do
+    # not darken the mean color
+    edge = np.array([[red, (9, 9, 9, 0)], [(1, 2, 3, 0), clear]], dtype=np.uint8)
+    _expect(int(block_reduce(edge, 1, 1, "mode")[0, 0, 3]), 0, "mode of mostly transparent block")
+    _expect(block_reduce(edge, 1, 1, "mean")[0, 0].tolist(), [255, 0, 0, 64], "alpha-weighted mean")
+
+    # Every output pixel summarizes its own block
+    image = np.zeros((4, 6, 4), dtype=np.uint8)
+    image[:2, :3] = red
+    image[2:, 3:] = blue
+    out = block_reduce(image, 2, 2, "mode")
+    _expect(out[:, :, :3].tolist(), [[[255, 0, 0], [0, 0, 0]], [[0, 0, 0], [0, 0, 255]]], "block layout")
+    # Non-multiple sizes and 1:1 still give the target shape
+    _expect(block_reduce(np.zeros((7, 5, 4), np.uint8), 3, 2, "mean").shape, (2, 3, 4), "non-multiple size")
+    _expect(np.array_equal(block_reduce(image, 6, 4, "median"), image), True, "1:1 is unchanged")
+    _expect_raises(lambda: block_reduce(image, 2, 2, "nearest"), "unknown block method", "nearest")
+
+
+def check_palette_lut():
+    import numpy as np
+
+    palette = ((0, 0, 0), (255, 255, 255), (255, 0, 0), (0, 128, 0))
+    lut = PaletteLUT(palette, bits=5)
+    _expect(lut.table.shape, (32, 32, 32), "table size")
+    exact = np.array([[c + (255,) for c in palette]], dtype=np.uint8)
+    _expect(lut.apply(exact).tolist(), exact.tolist(), "palette colors map to themselves")
+    near = np.array([[[250, 10, 5, 255], [20, 20, 20, 255], [240, 240, 250, 255], [10, 120, 5, 100]]], dtype=np.uint8)
+    out = lut.apply(near)
+    _expect(out[0, :3, :3].tolist(), [[255, 0, 0], [0, 0, 0], [255, 255, 255]], "nearest colors")
+    _expect(out[0, 3].tolist(), [0, 0, 0, 0], "transparent stays transparent")
+    _expect(get_palette_lut(palette, 5) is get_palette_lut(palette, 5), True, "LUT is memoized per palette")
+
+    # Explicit palettes: duplicates and fully transparent entries are dropped
+    colors = resolve_palette(["#ff0000", [255, 0, 0, 255], [0, 0, 255, 0], "#00ff00"], None)
+    _expect(colors, ((255, 0, 0), (0, 255, 0)), "resolve_palette list")
+    _expect(resolve_palette(None, None), None, "no palette")
+    _expect_raises(lambda: resolve_palette([[0, 0, 0, 0]], None), "no opaque colors", "transparent palette")
+    named = resolve_palette("current", lambda method, params: {"colors": [{"color": "#123456"}]})
+    _expect(named, ((0x12, 0x34, 0x56),), "palette by name")
+
+    frame = np.zeros((8, 8, 4), dtype=np.uint8)
+    frame[..., 3] = 255
+    frame[:4, :, 0] = 255
+    frame[4:, :, 2] = 200
+    adaptive = adaptive_palette([frame], 4)
+    if not 1 <= len(adaptive) <= 4:
+        raise AssertionError(f"adaptive palette size: {len(adaptive)}")
+
+
+def check_dither():
+    import numpy as np
+
+    _expect(bayer_matrix(2).tolist(), [[0, 2], [3, 1]], "bayer2")
+    for n in (4, 8):
+        _expect(sorted(bayer_matrix(n).ravel().tolist()), list(range(n * n)), f"bayer{n} is a permutation")
+    ranks = blue_noise_ranks(16)
+    _expect(sorted(ranks.ravel().tolist()), list(range(256)), "blue noise ranks are a permutation")
+    _expect(np.array_equal(ranks, blue_noise_ranks(16, 1.5, 0)), True, "blue noise is deterministic")
+    for mode in ("bayer4", "blue_noise"):
+        matrix = threshold_matrix(mode)
+        if not (matrix.min() >= -0.5 and matrix.max() < 0.5):
+            raise AssertionError(f"{mode} thresholds out of [-0.5, 0.5)")
+
+    _expect(parse_dither(True), "floyd_steinberg", "dither true")
+    _expect(parse_dither(False), "none", "dither false")
+    _expect(parse_dither("Floyd"), "floyd_steinberg", "dither alias")
+    _expect_raises(lambda: parse_dither("noise"), "dither must be", "unknown dither")
+
+    # Mid gray between black and white: ordered dithering mixes both, the
+    # same way every time (no flicker between frames); no dithering picks one
+    palette = ((0, 0, 0), (255, 255, 255))
+    gray = np.full((8, 8, 4), 128, dtype=np.uint8)
+    gray[..., 3] = 255
+    indices, opaque = quantize_pixels(gray, palette, "bayer4")
+    _expect(sorted(set(indices.ravel().tolist())), [0, 1], "bayer4 mixes both colors")
+    _expect(bool(opaque.all()), True, "opaque mask")
+    _expect(np.array_equal(indices, quantize_pixels(gray, palette, "bayer4")[0]), True, "ordered dither is stable")
+    _expect(len(set(quantize_pixels(gray, palette, "none")[0].ravel().tolist())), 1, "no dithering")
+
+
+def check_frame_quantize():
+    import numpy as np
+
+    # Workers get frames in chunks plus the parent's LUT, pickled; the
+    # result must match quantizing each frame with the cached LUT
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (16, 16, 4), dtype=np.uint8) for _ in range(3)]
+    palette = adaptive_palette(frames, 8)
+    lut = pickle.loads(pickle.dumps(get_palette_lut(palette)))
+    for dither in ("none", "bayer4"):
+        chunked = _quantize_frames((frames, palette, dither, lut))
+        single = [_quantize_frame((frame, palette, dither)) for frame in frames]
+        _expect(all(np.array_equal(a, b) for a, b in zip(chunked, single)), True, f"chunked quantize ({dither})")
+        _expect(len(chunked), 3, "one result per frame")
+
+
+def check_memory_summary():
+    _expect(format_bytes(512), "512 B", "bytes")
+    _expect(format_bytes(1536), "1.5 KB", "kilobytes")
+    _expect(format_bytes(3 * 1024**3), "3.0 GB", "gigabytes")
+    _expect(format_bytes(5 * 1024**4), "5120.0 GB", "GB is the largest unit")
+
+    stats = {
+        "totals": {"cel_bytes": 4096, "texture_bytes": 4096, "reclaimable_bytes": 1024, "duplicate_cels": 1, "empty_cels": 0},
+        "layers": [
+            {"index": 0, "name": "bg", "bytes": 3072},
+            {"index": 1, "name": "fg", "bytes": 1024},
+            {"index": 2, "name": "empty", "bytes": 0},
+        ],
+        "tilesets": [{"index": 0, "bytes": 8192}],
+        "brushes": {"bytes": 0},
+        "export_cache": {"bytes": 2048},
+        "undo": {"history_count": 150},
+    }
+    summary = summarize(stats, top=1)
+    # Textures duplicate the cel bytes, so they stay out of the total
+    _expect(summary["total_bytes"], 4096 + 8192 + 2048, "total")
+    _expect([c["name"] for c in summary["categories"]], ["tilesets", "cels", "export_cache", "brushes"], "categories by cost")
+    _expect([layer["name"] for layer in summary["top_layers"]], ["bg"], "top layers")
+    _expect(summary["undo_steps"], 150, "undo step count")
+    text = " ".join(summary["suggestions"])
+    for fragment in ("project.compact", "PIXELORAMA_EXPORT_CACHE_MB", "150 undo steps", "layer 0 (bg)"):
+        if fragment not in text:
+            raise AssertionError(f"suggestions missing {fragment!r}: {text}")
+
+
+def check_atlas_packing():
+    import random
+
+    import numpy as np
+
+    rng = random.Random(0)
+    sizes = [(rng.randint(1, 40), rng.randint(1, 40)) for _ in range(60)]
+    for max_width, pow2 in ((0, False), (64, False), (0, True)):
+        width, height, positions = pack_skyline(sizes, max_width, pow2)
+        sheet = np.zeros((height, width), dtype=np.int32)
+        for (x, y), (w, h) in zip(positions, sizes):
+            if x < 0 or y < 0 or x + w > width or y + h > height:
+                raise AssertionError(f"rect {(x, y, w, h)} outside {width}x{height}")
+            sheet[y : y + h, x : x + w] += 1
+        _expect(int(sheet.max()), 1, f"no overlaps (max_width={max_width}, pow2={pow2})")
+        if max_width:
+            _expect(width <= max_width, True, "max_width respected")
+        if pow2:
+            _expect((width & (width - 1), height & (height - 1)), (0, 0), "power of two sheet")
+    _expect(pack_skyline([]), (1, 1, []), "empty atlas")
+    _expect(pack_skyline([(5, 3)], 2)[:2], (5, 3), "max_width narrower than the widest rect")
+
+    frame = np.zeros((8, 8, 4), dtype=np.uint8)
+    _expect(trim_box(frame), (0, 0, 1, 1), "transparent frame keeps one pixel")
+    frame[2:5, 3:7, 3] = 255
+    _expect(trim_box(frame), (3, 2, 7, 5), "trim to opaque bounds")
+
+
+def check_tag_names():
+    out_dir = tempfile.mkdtemp()
+    tags = [{"name": "Walk"}, {"name": "walk"}, {"name": "run/fast"}, {"name": "  "}]
+    _expect(output_names(tags, "{tag}", out_dir), ["Walk", "walk_2", "run_fast", "tag"], "unique safe names")
+    _expect(output_names(tags[:1], "hero_{tag}_anim", out_dir), ["hero_Walk_anim"], "template text")
+    _expect_raises(lambda: output_names(tags, "{name}", out_dir), "only use the {tag} field", "unknown field")
+    _expect_raises(lambda: output_names(tags, "{tag", out_dir), "invalid name_template", "malformed template")
+    _expect_raises(lambda: output_names(tags, "../{tag}", out_dir), "outside dir", "escaping template")
+    _expect_raises(lambda: output_names([{"name": ".."}], "{tag}", out_dir), "outside dir", "escaping tag name")
+
+
+def check_export_cache():
+    from pixelorama_mcp import export_cache
+
+    cache = ExportCache(tempfile.mkdtemp(), max_bytes=1000)
+    _expect(ExportCache.key("", "png"), None, "unhashable frame")
+    key = ExportCache.key("abc", "png", scale=2)
+    _expect(key, ExportCache.key("abc", "png", scale=2), "stable key")
+    _expect(key == ExportCache.key("abc", "png", scale=3), False, "params in key")
+
+    _expect(cache.get(key), None, "miss")
+    cache.put(key, b"x" * 100)
+    _expect(cache.get(key), b"x" * 100, "hit")
+    cache.put(key, b"y" * 40)
+    _expect(cache.get(key), b"y" * 40, "overwrite")
+    _expect(cache._size, cache._scan_size(), "size after overwrite")
+
+    # Past the limit the oldest entries go, down to 90% of it
+    for n in range(8):
+        cache.put(ExportCache.key(f"frame{n}", "png"), bytes(200))
+        _expect(cache._size, cache._scan_size(), f"size after put {n}")
+        if cache._size > cache.max_bytes:
+            raise AssertionError(f"cache over its limit: {cache._size} bytes")
+    _expect(cache.get(ExportCache.key("frame7", "png")), bytes(200), "newest entry kept")
+    cache.put(ExportCache.key("big", "png"), bytes(2000))
+    _expect(cache.get(ExportCache.key("big", "png")), None, "entry larger than the cache")
+
+    # A failed rename must not leave the temp file behind
+    real_replace = export_cache.os.replace
+
+    def failing_replace(src, dst):
+        raise OSError("disk full")
+
+    export_cache.os.replace = failing_replace
+    try:
+        cache.put(ExportCache.key("fail", "png"), b"z")
+    finally:
+        export_cache.os.replace = real_replace
+    names = [name for _, _, files in os.walk(cache.root) for name in files]
+    _expect(all(len(name) == 64 for name in names), True, "no temp files left")
+
+    size = cache._size
+    _expect(cache.clear(), size, "clear frees everything")
+    _expect(cache._scan_size(), 0, "empty after clear")
+    disabled = ExportCache(tempfile.mkdtemp(), max_bytes=0)
+    disabled.put(key, b"x")
+    _expect(disabled.get(key), None, "disabled cache")
+
+
+def check_schema_vs_bridge():
+    # A closed schema must declare every parameter its bridge handler reads,
+    # or callers can never pass it
+    with open(BRIDGE_GD, encoding="utf-8") as fh:
+        src = fh.read()
+    handlers = dict(re.findall(r'^\t\t"([\w.]+)": (_handle_\w+),', src, re.M))
+    reads = {}
+    for m in re.finditer(r"^func (_handle_\w+)\(_?params[^)]*\)[^:]*:\n((?:\t.*\n|\n)*)", src, re.M):
+        # params.get("x", ...), params.has("x") and params["x"], but not assignments
+        reads[m.group(1)] = set(re.findall(r'params(?:\.get\(|\.has\(|\[)"(\w+)"(?!\]\s*=[^=])', m.group(2)))
+    checked = 0
+    for tool in TOOLS:
+        schema = tool["inputSchema"]
+        handler = handlers.get(_BRIDGE_NAME_MAP.get(tool["name"], tool["name"]))
+        if schema.get("additionalProperties") is not False or handler is None:
+            continue  # open schema, or a server-side tool
+        missing = reads.get(handler, set()) - set(schema.get("properties", {}))
+        if missing:
+            raise AssertionError(f"{tool['name']} schema lacks {sorted(missing)} read by {handler}")
+        checked += 1
+    if checked < 50:
+        raise AssertionError(f"only {checked} bridge handlers matched; is the dispatch table parsed?")
+
+
+CHECKS = [
+    ("schema validation", check_schema),
+    ("closed schemas match bridge handlers", check_schema_vs_bridge),
+    ("metadata cache invalidation", check_invalidation),
+    ("metadata cache through the bridge client", check_bridge_cache),
+    ("region tiling", check_tiling),
+    ("bulk color replacement", check_recolor),
+    ("tile deduplication", check_tile_dedupe),
+    ("block downscaling", check_block_reduce),
+    ("palette LUT", check_palette_lut),
+    ("ordered dithering", check_dither),
+    ("animated frame quantization", check_frame_quantize),
+    ("memory summary", check_memory_summary),
+    ("atlas packing", check_atlas_packing),
+    ("tag export file names", check_tag_names),
+    ("export cache", check_export_cache),
+]
+
+
+def main():
+    try:
+        for n, (label, check) in enumerate(CHECKS, 1):
+            print(f"[{n}/{len(CHECKS)}] {label}")
+            check()
+        print("offline tests passed")
+    except Exception as exc:
+        print(f"offline tests failed: {exc}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()